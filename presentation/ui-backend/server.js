@@ -115,6 +115,46 @@ app.get('/api/movies', async (req, res) => {
   }
 });
 
+// Word timings are stored in a columnar sidecar (transcription.words_uri) written
+// by the transcription service; older assets keep them inline in the document.
+const msToDuration = (ms) => ({ seconds: Math.floor(ms / 1000), nanos: (ms % 1000) * 1e6 });
+
+app.get('/api/movies/:id/transcript-words', async (req, res) => {
+  try {
+    const collectionName = process.env.FIRESTORE_COLLECTION || 'media_assets';
+    const doc = await db.collection(collectionName).doc(req.params.id).get();
+    if (!doc.exists) {
+      return res.status(404).json({ error: 'Asset not found' });
+    }
+    const transcription = doc.data().transcription || {};
+
+    if (!transcription.words_uri) {
+      return res.json(Array.isArray(transcription.words) ? transcription.words : []);
+    }
+
+    // Optional time range in seconds.
+    const start = req.query.start !== undefined ? Number(req.query.start) * 1000 : -Infinity;
+    const end = req.query.end !== undefined ? Number(req.query.end) * 1000 : Infinity;
+
+    const [bucketName, ...pathParts] = transcription.words_uri.replace('gs://', '').split('/');
+    const [contents] = await storage.bucket(bucketName).file(pathParts.join('/')).download();
+    const columns = JSON.parse(contents.toString());
+    const words = [];
+    for (let i = 0; i < columns.words.length; i++) {
+      if (columns.end_ms[i] <= start || columns.start_ms[i] >= end) continue;
+      words.push({
+        word: columns.words[i],
+        start_time: msToDuration(columns.start_ms[i]),
+        end_time: msToDuration(columns.end_ms[i]),
+      });
+    }
+    res.json(words);
+  } catch (error) {
+    logger.error('Error fetching transcript words:', error);
+    res.status(500).json({ error: 'Failed to fetch transcript words' });
+  }
+});
+
 // Upload endpoints
 const GCS_UPLOAD_BUCKET = process.env.GCS_UPLOAD_BUCKET || 'poc-metadata-gen2-input';
 const PUBSUB_INGESTION_TOPIC = process.env.PUBSUB_INGESTION_TOPIC || 'central-ingestion-topic';
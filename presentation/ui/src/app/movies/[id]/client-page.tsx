@@ -25,6 +25,7 @@ import { MovieChat } from '@/components/movie-chat';
 import { YouTubePlayerWrapper } from '@/components/youtube-player-wrapper';
 import { MetadataViewer } from '@/components/metadata-viewer';
 import { getYouTubeId } from '@/lib/utils';
+import { getTranscriptWords } from '@/lib/api';
 
 const CategorySection = ({ title, items, icon }: { title: string; items: (string | Person)[] | undefined; icon: React.ReactNode }) => {
     if (!items || items.length === 0) return null;
@@ -232,9 +233,23 @@ const ChapterTable = ({ sections, onSeek }: { sections: Section[] | undefined, o
     );
 };
 
-const TranscriptionView = ({ words, onSeek }: { words: TranscriptionWord[] | undefined; onSeek: (time: number, displayTime: string, segment: number) => void }) => {
+const TranscriptionView = ({ movieId, transcription, onSeek }: { movieId: string; transcription: Movie['transcription']; onSeek: (time: number, displayTime: string, segment: number) => void }) => {
     const [searchQuery, setSearchQuery] = useState('');
     const [isExpanded, setIsExpanded] = useState(false);
+    const [loadedWords, setLoadedWords] = useState<TranscriptionWord[] | undefined>(undefined);
+    const wordsUri = transcription?.words_uri;
+
+    // Word timings live in a sidecar file; only older assets carry them inline.
+    useEffect(() => {
+        if (!wordsUri) return;
+        let cancelled = false;
+        getTranscriptWords(movieId)
+            .then((result: TranscriptionWord[]) => { if (!cancelled) setLoadedWords(result); })
+            .catch(() => { if (!cancelled) setLoadedWords([]); });
+        return () => { cancelled = true; };
+    }, [movieId, wordsUri]);
+
+    const words = wordsUri ? loadedWords : transcription?.words;
 
     const highlightedWords = useMemo(() => {
         if (!words) return [];
@@ -512,7 +527,7 @@ export function MovieClientPage({ movie }: { movie: Movie }) {
                     <ChapterTable sections={movie.summary.sections} onSeek={handleSeekTo} />
                 </TabsContent>
                 <TabsContent value="transcription">
-                    <TranscriptionView words={movie.transcription?.words} onSeek={handleSeekTo} />
+                    <TranscriptionView movieId={movie.id} transcription={movie.transcription} onSeek={handleSeekTo} />
                 </TabsContent>
                 <TabsContent value="categorization">
                     <h2 className="text-3xl font-bold tracking-tight mb-6">Details</h2>
@@ -51,7 +51,7 @@ function getUploadTime(movie: Movie): number {
 
 // Helper to check processing status
 function getProcessingStatus(movie: Movie): 'complete' | 'processing' | 'pending' {
-  const hasTranscription = movie.transcription?.words && movie.transcription.words.length > 0;
+  const hasTranscription = (movie.transcription?.word_count ?? movie.transcription?.words?.length ?? 0) > 0;
   const hasSummary = movie.summary?.summary;
   const hasPreviews = movie.previews?.clips && movie.previews.clips.length > 0;
 
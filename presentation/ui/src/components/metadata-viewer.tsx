@@ -152,6 +152,9 @@ function renderValue(value: unknown): React.ReactNode {
 function CategorizedView({ data }: { data: Record<string, unknown> }) {
   const summary = data.summary as Record<string, unknown> | undefined;
   const transcription = data.transcription as Record<string, unknown> | undefined;
+  const wordCount = Number(
+    transcription?.word_count ?? (Array.isArray(transcription?.words) ? transcription.words.length : 0)
+  );
   const previews = data.previews as Record<string, unknown> | undefined;
 
   return (
@@ -245,12 +248,12 @@ function CategorizedView({ data }: { data: Record<string, unknown> }) {
             <CardTitle className="text-lg">Transcription</CardTitle>
           </CardHeader>
           <CardContent>
-            {Array.isArray(transcription?.words) && transcription.words.length > 0 ? (
+            {transcription && wordCount > 0 ? (
               <div className="space-y-2">
                 <div className="flex items-center gap-2">
                   <Badge variant="default">Available</Badge>
                   <span className="text-sm text-muted-foreground">
-                    {transcription.words.length} words transcribed
+                    {wordCount} words transcribed
                   </span>
                 </div>
                 {Boolean(transcription.status) && (
@@ -328,8 +331,8 @@ function CategorizedView({ data }: { data: Record<string, unknown> }) {
               </div>
               <div className="text-center p-3 rounded-lg bg-muted/50">
                 <p className="text-sm font-medium text-muted-foreground mb-1">Transcription</p>
-                <Badge variant={transcription?.words ? 'default' : 'secondary'}>
-                  {transcription?.words ? 'Complete' : 'Pending'}
+                <Badge variant={wordCount > 0 ? 'default' : 'secondary'}>
+                  {wordCount > 0 ? 'Complete' : 'Pending'}
                 </Badge>
               </div>
               <div className="text-center p-3 rounded-lg bg-muted/50">
@@ -62,6 +62,11 @@ export async function getMovies() {
   return fetchApi('/api/movies');
 }
 
+export async function getTranscriptWords(movieId: string) {
+  logger.log(`getTranscriptWords: ${movieId}`);
+  return fetchApi(`/api/movies/${encodeURIComponent(movieId)}/transcript-words`);
+}
+
 export async function getSignedUploadUrl(fileName: string, contentType: string) {
   logger.log(`getSignedUploadUrl: ${fileName}`);
   return fetchApi('/api/upload/signed-url', {
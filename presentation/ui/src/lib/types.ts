@@ -55,7 +55,10 @@ export interface Transcription {
     error_message?: string;
     utterances?: Utterance[]; // Keep for backwards compatibility if some data uses it
     text?: string;
-    words?: TranscriptionWord[];
+    words?: TranscriptionWord[]; // Inline word list of assets transcribed before words_uri
+    words_uri?: string;
+    word_count?: number;
+    duration_seconds?: number;
 }
 
 
@@ -15,9 +15,11 @@ import logging
 
 from common.logging_config import configure_logger
 from common.media_asset_manager import MediaAssetManager
+from common.media_probe import probe_gcs_media
 
 from flask import Flask, request
 from google.cloud import pubsub_v1
+from google.cloud import storage
 
 
 # Logging setup
@@ -32,6 +34,10 @@ project_id = os.environ.get("GOOGLE_CLOUD_PROJECT")
 SUMMARIES_TOPIC = os.environ.get("PUBSUB_TOPIC_SUMMARIES")
 TRANSCRIPTION_TOPIC = os.environ.get("PUBSUB_TOPIC_TRANSCRIPTION")
 PREVIEWS_TOPIC = os.environ.get("PUBSUB_TOPIC_PREVIEWS")
+# Probe uploaded media with ffprobe and store its properties in video_details.
+MEDIA_PROBE = os.environ.get("MEDIA_PROBE", "true").lower() == "true"
+# Seconds before a probe is abandoned and the asset is dispatched without them.
+MEDIA_PROBE_TIMEOUT_SECONDS = float(os.environ.get("MEDIA_PROBE_TIMEOUT_SECONDS", "60"))
 
 # --- Configuration Validation ---
 # Ensure all required environment variables are set. This prevents the service
@@ -65,6 +71,7 @@ logger.info(
 publisher = pubsub_v1.PublisherClient()
 # MediaAssetManager setup
 asset_manager = MediaAssetManager(project_id=project_id)
+storage_client = storage.Client() if MEDIA_PROBE else None
 # Pre-format the full topic paths for efficiency
 TOPIC_PATHS = {
     "summary": (
@@ -87,10 +94,39 @@ CATEGORY_TASK_MAP = {
     "document": ["summary"],
 }
 
+# File categories whose media properties are probed before dispatching.
+PROBED_CATEGORIES = {"video", "audio"}
+
 
 app = Flask(__name__)
 
 
+def store_media_details(asset_id: str, file_location: str, log_extra: dict):
+    """
+    Probes the media file and stores its properties in the asset's video_details.
+
+    The properties are stored before any task is dispatched, so downstream services
+    read them from the asset instead of probing or downloading the file. A failed
+    probe is logged and leaves video_details empty; dispatching continues.
+
+    Args:
+        asset_id (str): The ID of the asset.
+        file_location (str): GCS URI of the media file.
+        log_extra (dict): Structured logging fields of the asset.
+    """
+    try:
+        details = probe_gcs_media(storage_client, file_location, MEDIA_PROBE_TIMEOUT_SECONDS).to_details()
+    except Exception:
+        logger.warning("Could not probe media for asset_id: %s", asset_id, exc_info=True, extra=log_extra)
+        return
+    asset_manager.update_asset_metadata(asset_id, "video_details", details)
+    logger.info(
+        "Stored media details for asset_id: %s",
+        asset_id,
+        extra={"extra_fields": {**log_extra["extra_fields"], "video_details": details}},
+    )
+
+
 def process_file_event(event_data):
     """
     Processes a file event, creates a Firestore record, and dispatches tasks.
@@ -154,6 +190,10 @@ def process_file_event(event_data):
         )
         return
 
+    # Store duration, resolution and codecs once for every downstream service.
+    if MEDIA_PROBE and file_location.startswith("gs://") and file_category in PROBED_CATEGORIES:
+        store_media_details(asset_id, file_location, log_extra)
+
     # 2. Determine which tasks to dispatch based on file category.
     tasks_to_dispatch = CATEGORY_TASK_MAP.get(file_category, [])
 
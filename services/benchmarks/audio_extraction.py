@@ -0,0 +1,142 @@
+"""
+Benchmark of the transcription service's audio extraction paths.
+
+`download` reproduces the original path: the video is copied to /tmp, ffmpeg writes
+the FLAC to /tmp and the FLAC is uploaded. `stream` runs common.gcs_media's
+ffmpeg_gcs_to_gcs, which pipes the source through ffmpeg and streams the output.
+
+By default both paths run against synthetic videos generated with ffmpeg, with
+local files standing in for GCS objects. Each run happens in a fresh subprocess so
+its peak RSS (Python and ffmpeg) is measured in isolation. On Cloud Run files in
+/tmp count against instance memory too, so the peak /tmp usage is reported and
+added to the effective peak.
+
+Usage (from the services/ directory, ffmpeg on PATH):
+    python -m benchmarks.audio_extraction --durations 60 600 --video-bitrate 8M
+"""
+
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+
+class LocalBlob:
+    """Stands in for a google.cloud.storage Blob backed by a local file."""
+
+    class _Bucket:
+        name = "local"
+
+    bucket = _Bucket()
+
+    def __init__(self, path: str):
+        self.name = path
+
+    def generate_signed_url(self, **kwargs):
+        # No URL can be signed locally, so ffmpeg is fed through stdin.
+        return None
+
+    def open(self, mode: str, chunk_size: int = None, content_type: str = None):
+        return open(self.name, mode)
+
+
+def make_video(path: str, duration: int, video_bitrate: str):
+    """Generates a synthetic H.264/AAC video of the given duration."""
+    subprocess.run(
+        [
+            "ffmpeg", "-y", "-loglevel", "error",
+            "-f", "lavfi", "-i", f"testsrc2=size=1920x1080:rate=25:duration={duration}",
+            "-f", "lavfi", "-i", f"sine=frequency=440:sample_rate=48000:duration={duration}",
+            "-c:v", "libx264", "-preset", "ultrafast", "-b:v", video_bitrate,
+            "-c:a", "aac", "-movflags", "+faststart", path,
+        ],
+        check=True,
+    )
+
+
+def run_download(video_path: str, work_dir: str) -> int:
+    """Original path; returns the peak bytes held in the temporary directory."""
+    local_video = os.path.join(work_dir, "video" + os.path.splitext(video_path)[1])
+    local_audio = os.path.join(work_dir, "audio.flac")
+    shutil.copyfile(video_path, local_video)
+    subprocess.run(
+        ["ffmpeg", "-y", "-loglevel", "error", "-i", local_video, "-vn", "-acodec", "flac", "-ar", "16000", local_audio],
+        check=True,
+    )
+    tmp_bytes = os.path.getsize(local_video) + os.path.getsize(local_audio)
+    # The upload reads the file back.
+    with open(local_audio, "rb") as f:
+        while f.read(8 * 1024 * 1024):
+            pass
+    return tmp_bytes
+
+
+def run_stream(video_path: str, work_dir: str) -> int:
+    """Streaming path; the output file stands in for the GCS upload."""
+    from common.gcs_media import ffmpeg_gcs_to_gcs
+
+    ffmpeg_gcs_to_gcs(
+        LocalBlob(video_path),
+        LocalBlob(os.path.join(work_dir, "audio.flac")),
+        "audio/flac",
+        format="flac",
+        acodec="flac",
+        ar="16000",
+        vn=None,
+    )
+    return 0
+
+
+def run_single(mode: str, video_path: str):
+    """Runs one path and prints its measurements as JSON (subprocess entry point)."""
+    with tempfile.TemporaryDirectory() as work_dir:
+        started = time.monotonic()
+        tmp_bytes = (run_download if mode == "download" else run_stream)(video_path, work_dir)
+        wall_seconds = time.monotonic() - started
+    # ru_maxrss is reported in KiB on Linux.
+    print(json.dumps({
+        "wall_seconds": round(wall_seconds, 2),
+        "python_rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "ffmpeg_rss_mib": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+        "tmp_mib": tmp_bytes / 1024 / 1024,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--durations", type=int, nargs="+", default=[60, 600])
+    parser.add_argument("--video-bitrate", default="8M")
+    parser.add_argument("--single", nargs=2, metavar=("MODE", "VIDEO"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        run_single(*args.single)
+        return
+
+    print(f"{'duration':>8} {'size_mib':>9} {'mode':<9} {'wall_s':>7} {'py_rss':>7} "
+          f"{'ff_rss':>7} {'tmp':>8} {'effective':>9}")
+    with tempfile.TemporaryDirectory() as videos_dir:
+        for duration in args.durations:
+            video_path = os.path.join(videos_dir, f"synthetic_{duration}s.mp4")
+            make_video(video_path, duration, args.video_bitrate)
+            size_mib = os.path.getsize(video_path) / 1024 / 1024
+            for mode in ("download", "stream"):
+                output = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.audio_extraction", "--single", mode, video_path],
+                    check=True,
+                    capture_output=True,
+                    text=True,
+                ).stdout
+                m = json.loads(output.strip().splitlines()[-1])
+                effective = max(m["python_rss_mib"], m["ffmpeg_rss_mib"]) + m["tmp_mib"]
+                print(f"{duration:>8} {size_mib:>9.1f} {mode:<9} {m['wall_seconds']:>7.2f} "
+                      f"{m['python_rss_mib']:>7.1f} {m['ffmpeg_rss_mib']:>7.1f} {m['tmp_mib']:>8.1f} {effective:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Microbenchmark of the per-call overhead of building a genai client versus
+reusing the shared client from common.genai_client.
+
+Each worker thread performs `--calls` iterations, mirroring gunicorn's threaded
+workers. By default an iteration only obtains a client (auth discovery and client
+construction); with `--request` it also issues a cheap count_tokens call, so
+connection setup and reuse are included in the measurement.
+
+Usage (from the services/ directory):
+    python -m benchmarks.genai_client_overhead --project my-project --threads 8 --calls 20 --request
+"""
+
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from google import genai
+
+from common.genai_client import get_genai_client
+
+
+def _per_call_client(project_id: str, location: str):
+    return genai.Client(vertexai=True, project=project_id, location=location)
+
+
+def _run(strategy, args) -> list:
+    """Runs the workload with the given client strategy and returns per-call latencies."""
+
+    def worker(_):
+        latencies = []
+        for _ in range(args.calls):
+            started = time.perf_counter()
+            client = strategy(args.project, args.location)
+            if args.request:
+                client.models.count_tokens(model=args.model, contents="ping")
+            latencies.append(time.perf_counter() - started)
+        return latencies
+
+    with ThreadPoolExecutor(max_workers=args.threads) as executor:
+        return [latency for result in executor.map(worker, range(args.threads)) for latency in result]
+
+
+def _report(name: str, latencies: list):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(
+        f"{name:<10} calls={len(latencies):>5} mean={statistics.mean(latencies) * 1000:8.2f}ms "
+        f"p50={statistics.median(latencies) * 1000:8.2f}ms p95={p95 * 1000:8.2f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--project", required=True)
+    parser.add_argument("--location", default="global")
+    parser.add_argument("--model", default="gemini-2.5-flash")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--calls", type=int, default=20)
+    parser.add_argument("--request", action="store_true", help="Issue a count_tokens call per iteration.")
+    args = parser.parse_args()
+
+    per_call = _run(_per_call_client, args)
+    shared = _run(get_genai_client, args)
+    _report("per-call", per_call)
+    _report("shared", shared)
+    saved = statistics.mean(per_call) - statistics.mean(shared)
+    print(f"overhead saved per call: {saved * 1000:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
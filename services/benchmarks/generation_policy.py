@@ -0,0 +1,174 @@
+"""
+Offline evaluation of generation policies (common/generation_policy.json).
+
+`workload` exports the duration and genre of existing assets from Firestore as a
+JSONL file. `compare` replays that workload through two or more policy files and
+prints, per policy, which rules fired, the model mix and an estimate of cost and
+latency, so a policy change can be judged before it is deployed.
+
+The estimates use a simple cost model: input tokens grow with the media duration,
+the sampled frame rate and the tokens per frame at the chosen media resolution,
+output tokens are the typical output of each task capped by max_output_tokens and
+thinking tokens are the thinking budget (or an estimate for dynamic thinking).
+Override the defaults below with --cost-model path/to/model.json, using the same
+keys as DEFAULT_COST_MODEL.
+
+Usage (from the services/ directory):
+    python -m benchmarks.generation_policy workload --project my-project --out workload.jsonl
+    python -m benchmarks.generation_policy compare workload.jsonl common/generation_policy.json new_policy.json
+"""
+
+import argparse
+import json
+from collections import Counter
+
+from common.generation_policy import GenerationPolicy, asset_duration_seconds
+
+TASKS = ("classification", "summary", "key_sections", "categorization", "previews")
+
+DEFAULT_COST_MODEL = {
+    # Tokens per sampled frame by media_resolution ("default" when unset), and audio tokens per second.
+    "frame_tokens": {"default": 258, "low": 66, "medium": 258, "high": 258},
+    "audio_tokens_per_second": 32,
+    # Frames per second sampled when the policy does not set fps.
+    "default_fps": 1,
+    # Typical visible output per task, before the max_output_tokens cap.
+    "typical_output_tokens": {
+        "classification": 2,
+        "summary": 3000,
+        "key_sections": 8000,
+        "categorization": 2500,
+        "fused": 13000,
+        "previews": 4000,
+    },
+    # Thinking tokens assumed when the budget is dynamic (-1).
+    "dynamic_thinking_tokens": 6000,
+    # USD per million tokens; thinking tokens are billed as output.
+    "prices": {
+        "gemini-2.5-flash": {"input": 0.30, "output": 2.50},
+        "gemini-2.5-flash-lite": {"input": 0.10, "output": 0.40},
+        "gemini-2.5-pro": {"input": 1.25, "output": 10.00},
+    },
+    # Generated tokens per second and fixed time to first token, per model.
+    "output_tokens_per_second": {
+        "gemini-2.5-flash": 200,
+        "gemini-2.5-flash-lite": 300,
+        "gemini-2.5-pro": 80,
+    },
+    "time_to_first_token_seconds": 5,
+}
+
+
+def export_workload(project: str, out_path: str, limit: int = None):
+    """Writes one {"asset_id", "duration_seconds", "genre"} line per media asset."""
+    # Imported lazily so `compare` works without cloud credentials.
+    from google.cloud import firestore
+
+    query = firestore.Client(project=project).collection("media_assets")
+    if limit:
+        query = query.limit(limit)
+    count = 0
+    with open(out_path, "w", encoding="utf-8") as f:
+        for doc in query.stream():
+            asset_data = doc.to_dict() or {}
+            f.write(json.dumps({
+                "asset_id": doc.id,
+                "duration_seconds": asset_duration_seconds(asset_data),
+                "genre": (asset_data.get("video_details") or {}).get("content_genre"),
+            }) + "\n")
+            count += 1
+    print(f"Exported {count} assets to {out_path}")
+
+
+def estimate_call(decision: dict, task: str, duration_seconds, cost_model: dict) -> tuple:
+    """Returns (estimated USD cost, estimated seconds) of one call under a decision."""
+    model = decision["model"]
+    frame_tokens = cost_model["frame_tokens"][decision.get("media_resolution") or "default"]
+    fps = decision.get("fps") or cost_model["default_fps"]
+    input_tokens = (duration_seconds or 0) * (frame_tokens * fps + cost_model["audio_tokens_per_second"])
+    output_tokens = min(
+        cost_model["typical_output_tokens"].get(task, 0), decision["max_output_tokens"]
+    )
+    budget = decision["thinking_budget"]
+    thinking_tokens = cost_model["dynamic_thinking_tokens"] if budget < 0 else budget
+
+    price = cost_model["prices"].get(model)
+    cost = 0.0
+    if price:
+        cost = (input_tokens * price["input"] + (output_tokens + thinking_tokens) * price["output"]) / 1e6
+    speed = cost_model["output_tokens_per_second"].get(model, 100)
+    seconds = cost_model["time_to_first_token_seconds"] + (output_tokens + thinking_tokens) / speed
+    return cost, seconds
+
+
+def compare(workload_path: str, policy_paths: list, default_model: str, cost_model: dict):
+    """Prints the decisions and estimated cost and latency of each policy on the workload."""
+    with open(workload_path, encoding="utf-8") as f:
+        assets = [json.loads(line) for line in f if line.strip()]
+    unknown = sum(1 for asset in assets if asset.get("duration_seconds") is None)
+    print(f"{len(assets)} assets, {unknown} without a known duration")
+
+    decisions_by_policy = {}
+    for path in policy_paths:
+        policy = GenerationPolicy.from_file(path)
+        rules = Counter()
+        models = Counter()
+        total_cost = 0.0
+        total_seconds = 0.0
+        decisions = []
+        for asset in assets:
+            for task in TASKS:
+                decision = policy.decide(
+                    task, default_model, asset.get("duration_seconds"), asset.get("genre")
+                )
+                rules.update(decision["rules"])
+                models[decision["model"]] += 1
+                cost, seconds = estimate_call(decision, task, asset.get("duration_seconds"), cost_model)
+                total_cost += cost
+                total_seconds += seconds
+                decisions.append({k: v for k, v in decision.items() if k != "rules"})
+        decisions_by_policy[path] = decisions
+
+        print(f"\n{path} (version {policy.config.get('version')})")
+        print(f"  estimated cost:       ${total_cost:.2f}")
+        print(f"  estimated model time: {total_seconds / 3600:.1f}h "
+              f"({total_seconds / max(len(assets), 1):.0f}s per asset)")
+        print("  models: " + ", ".join(f"{model}={n}" for model, n in models.most_common()))
+        print("  rules:  " + (", ".join(f"{rule}={n}" for rule, n in rules.most_common()) or "none"))
+
+    baseline_path = policy_paths[0]
+    for path in policy_paths[1:]:
+        changed = sum(
+            1 for old, new in zip(decisions_by_policy[baseline_path], decisions_by_policy[path]) if old != new
+        )
+        print(f"\n{path}: {changed} of {len(decisions_by_policy[path])} calls decided differently than {baseline_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    workload_parser = subparsers.add_parser("workload", help="Export asset durations and genres.")
+    workload_parser.add_argument("--project", default=None)
+    workload_parser.add_argument("--out", required=True)
+    workload_parser.add_argument("--limit", type=int, default=None)
+
+    compare_parser = subparsers.add_parser("compare", help="Compare policies on a workload.")
+    compare_parser.add_argument("workload")
+    compare_parser.add_argument("policies", nargs="+")
+    compare_parser.add_argument("--default-model", default="gemini-2.5-flash")
+    compare_parser.add_argument("--cost-model", default=None)
+
+    args = parser.parse_args()
+    if args.command == "workload":
+        export_workload(args.project, args.out, args.limit)
+    else:
+        cost_model = dict(DEFAULT_COST_MODEL)
+        if args.cost_model:
+            with open(args.cost_model, encoding="utf-8") as f:
+                cost_model.update(json.load(f))
+        compare(args.workload, args.policies, args.default_model, cost_model)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Benchmark of highlight reel cutting in the previews service.
+
+`moviepy` reproduces the original path: every segment is cut with
+`subclipped(...).write_videofile(libx264, aac)` and the clips are encoded again by
+`concatenate_videoclips`. `copy` and `smart` run previews_generator.clip_cutter,
+which stream-copies keyframe-aligned segments (`smart` re-encodes only the part
+before the first keyframe of each segment) and joins them with the concat demuxer.
+
+The source is a synthetic video generated with ffmpeg, with a keyframe every
+`--gop` seconds. Segment starts fall between keyframes, so `copy` reels start early
+by up to one GOP per segment; the report shows the resulting reel duration next to
+the requested one. A `--video-codec vp9` source cannot be stream-copied, so every
+segment is encoded, which makes the render stage CPU-bound.
+
+With `--workers`, the ffmpeg modes run again with each number of concurrent cuts
+and the speedup over the first count is reported next to the available CPUs.
+
+Usage (from the services/ directory, ffmpeg and moviepy installed):
+    python -m benchmarks.highlight_cutting --duration 1200 --segments 8 --segment-seconds 12
+    python -m benchmarks.highlight_cutting --video-codec vp9 --modes smart --workers 1 2 4 8
+"""
+
+import argparse
+import os
+import subprocess
+import tempfile
+import time
+
+
+def make_video(path: str, duration: int, size: str, gop_seconds: int, video_codec: str):
+    """Generates a synthetic H.264/AAC MP4 or VP9/Opus WebM with a fixed keyframe interval."""
+    rate = 25
+    if video_codec == "vp9":
+        codec_args = ["-c:v", "libvpx-vp9", "-deadline", "realtime", "-cpu-used", "8", "-b:v", "2M", "-c:a", "libopus"]
+    else:
+        codec_args = ["-c:v", "libx264", "-preset", "veryfast", "-sc_threshold", "0", "-c:a", "aac",
+                      "-movflags", "+faststart"]
+    subprocess.run(
+        [
+            "ffmpeg", "-y", "-loglevel", "error",
+            "-f", "lavfi", "-i", f"testsrc2=size={size}:rate={rate}:duration={duration}",
+            "-f", "lavfi", "-i", f"sine=frequency=440:sample_rate=48000:duration={duration}",
+            "-g", str(gop_seconds * rate), "-keyint_min", str(gop_seconds * rate),
+            *codec_args, path,
+        ],
+        check=True,
+    )
+
+
+def plan_segments(duration: int, count: int, seconds: float, gop_seconds: int) -> list:
+    """Spreads segments over the video, starting mid-GOP like model-picked timestamps."""
+    spacing = duration / count
+    segments = []
+    for i in range(count):
+        start = i * spacing + gop_seconds * 0.6
+        segments.append((round(start, 2), round(min(start + seconds, duration), 2)))
+    return segments
+
+
+def media_duration(path: str) -> float:
+    output = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", path],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return float(output.strip())
+
+
+def run_moviepy(video_path: str, segments: list, work_dir: str) -> str:
+    """Original path: one encode per segment, then a second encode of the reel."""
+    from moviepy import VideoFileClip, concatenate_videoclips
+
+    clip_paths = []
+    with VideoFileClip(video_path) as video:
+        for i, (start, end) in enumerate(segments):
+            clip_path = os.path.join(work_dir, f"segment_{i + 1}.mp4")
+            video.subclipped(start, end).write_videofile(clip_path, codec="libx264", audio_codec="aac", logger=None)
+            clip_paths.append(clip_path)
+    clips = [VideoFileClip(path) for path in clip_paths]
+    output_path = os.path.join(work_dir, "reel.mp4")
+    concatenate_videoclips(clips, method="chain").write_videofile(
+        output_path, codec="libx264", audio_codec="aac", logger=None
+    )
+    for clip in clips:
+        clip.close()
+    return output_path
+
+
+def run_cutter(mode: str, workers: int = None):
+    def run(video_path: str, segments: list, work_dir: str) -> str:
+        from previews_generator.clip_cutter import concat_pieces, cut_segments
+
+        pieces = cut_segments(video_path, segments, work_dir, mode, workers=workers)
+        return concat_pieces(pieces, os.path.join(work_dir, "reel.mp4"))
+
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=int, default=1200)
+    parser.add_argument("--size", default="1280x720")
+    parser.add_argument("--gop", type=int, default=4, help="Keyframe interval in seconds")
+    parser.add_argument("--segments", type=int, default=8)
+    parser.add_argument("--segment-seconds", type=float, default=12)
+    parser.add_argument("--video-codec", choices=["h264", "vp9"], default="h264")
+    parser.add_argument("--modes", nargs="+", default=["moviepy", "copy", "smart"])
+    parser.add_argument("--workers", type=int, nargs="+", help="Concurrent cuts to compare")
+    args = parser.parse_args()
+
+    runners = {"moviepy": run_moviepy, "copy": run_cutter("copy"), "smart": run_cutter("smart")}
+    with tempfile.TemporaryDirectory() as videos_dir:
+        extension = "webm" if args.video_codec == "vp9" else "mp4"
+        video_path = os.path.join(videos_dir, f"synthetic_{args.duration}s.{extension}")
+        make_video(video_path, args.duration, args.size, args.gop, args.video_codec)
+        segments = plan_segments(args.duration, args.segments, args.segment_seconds, args.gop)
+        requested = sum(end - start for start, end in segments)
+
+        print(f"{'mode':<8} {'wall_s':>7} {'reel_s':>7} {'requested_s':>11}")
+        for mode in args.modes:
+            with tempfile.TemporaryDirectory() as work_dir:
+                started = time.monotonic()
+                output_path = runners[mode](video_path, segments, work_dir)
+                wall_seconds = time.monotonic() - started
+                print(f"{mode:<8} {wall_seconds:>7.2f} {media_duration(output_path):>7.2f} {requested:>11.2f}")
+
+        if not args.workers:
+            return
+        from previews_generator.clip_cutter import available_cpus
+
+        print(f"\navailable CPUs: {available_cpus()}")
+        print(f"{'mode':<8} {'workers':>7} {'wall_s':>7} {'speedup':>7}")
+        for mode in (m for m in args.modes if m != "moviepy"):
+            baseline = None
+            for workers in args.workers:
+                with tempfile.TemporaryDirectory() as work_dir:
+                    started = time.monotonic()
+                    run_cutter(mode, workers)(video_path, segments, work_dir)
+                    wall_seconds = time.monotonic() - started
+                baseline = baseline or wall_seconds
+                print(f"{mode:<8} {workers:>7} {wall_seconds:>7.2f} {baseline / wall_seconds:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
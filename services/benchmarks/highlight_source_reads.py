@@ -0,0 +1,174 @@
+"""
+Benchmark of how the previews service reads the source video of a highlight reel.
+
+`download` reproduces the original path: the whole object is fetched to a temporary
+directory and the segments are cut from the local copy. `range` gives ffmpeg the
+object's URL, so it reads the container index and seeks to each segment with HTTP
+range requests, as it does with a signed GCS URL.
+
+A local HTTP server with range support stands in for GCS and counts the bytes it
+sends. For each path the benchmark reports the time until the first segment is cut
+(including the download for `download`) and the bytes transferred for the whole
+reel. `--no-faststart` puts the MP4 index at the end of the file, which costs
+`range` one extra seek.
+
+Usage (from the services/ directory, ffmpeg on PATH):
+    python -m benchmarks.highlight_source_reads --duration 3600 --segments 8 --segment-seconds 12
+"""
+
+import argparse
+import http.server
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import urllib.request
+
+from benchmarks.highlight_cutting import make_video, plan_segments
+
+_RANGE = re.compile(r"bytes=(\d*)-(\d*)")
+
+
+class CountingRangeServer(http.server.ThreadingHTTPServer):
+    """Serves one file with HTTP range support and counts the bytes sent."""
+
+    def __init__(self, file_path: str):
+        super().__init__(("127.0.0.1", 0), _RangeHandler)
+        self.file_path = file_path
+        self.bytes_sent = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/{os.path.basename(self.file_path)}"
+
+    def count(self, sent: int = 0, request: bool = False):
+        with self._lock:
+            self.bytes_sent += sent
+            self.requests += int(request)
+
+    def reset(self):
+        with self._lock:
+            self.bytes_sent = 0
+            self.requests = 0
+
+
+class _RangeHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _send_headers(self):
+        size = os.path.getsize(self.server.file_path)
+        start, end = 0, size - 1
+        match = _RANGE.fullmatch(self.headers.get("Range", ""))
+        if match and (match.group(1) or match.group(2)):
+            if match.group(1):
+                start = int(match.group(1))
+                end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+            else:
+                start = max(0, size - int(match.group(2)))
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        else:
+            self.send_response(200)
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+        return start, end
+
+    def do_HEAD(self):
+        self._send_headers()
+
+    def do_GET(self):
+        self.server.count(request=True)
+        start, end = self._send_headers()
+        remaining = end - start + 1
+        try:
+            with open(self.server.file_path, "rb") as f:
+                f.seek(start)
+                while remaining > 0:
+                    chunk = f.read(min(64 * 1024, remaining))
+                    if not chunk:
+                        break
+                    self.wfile.write(chunk)
+                    self.server.count(sent=len(chunk))
+                    remaining -= len(chunk)
+        except (BrokenPipeError, ConnectionResetError):
+            # ffmpeg closes the connection once it has read what it needs.
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+def cut(source: str, segments: list, work_dir: str, mode: str):
+    from previews_generator.clip_cutter import cut_segments
+
+    return cut_segments(source, segments, work_dir, mode)
+
+
+def run_download(server: CountingRangeServer, segments: list, work_dir: str, mode: str) -> float:
+    """Original path; returns the seconds until the first segment is cut."""
+    started = time.monotonic()
+    local_path = os.path.join(work_dir, "source.mp4")
+    with urllib.request.urlopen(server.url) as response, open(local_path, "wb") as f:
+        shutil.copyfileobj(response, f, 8 * 1024 * 1024)
+    cut(local_path, segments[:1], work_dir, mode)
+    first_segment = time.monotonic() - started
+    cut(local_path, segments[1:], work_dir, mode)
+    return first_segment
+
+
+def run_range(server: CountingRangeServer, segments: list, work_dir: str, mode: str) -> float:
+    """Range path; returns the seconds until the first segment is cut."""
+    started = time.monotonic()
+    cut(server.url, segments[:1], work_dir, mode)
+    first_segment = time.monotonic() - started
+    cut(server.url, segments[1:], work_dir, mode)
+    return first_segment
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=int, default=3600)
+    parser.add_argument("--size", default="1280x720")
+    parser.add_argument("--gop", type=int, default=4, help="Keyframe interval in seconds")
+    parser.add_argument("--segments", type=int, default=8)
+    parser.add_argument("--segment-seconds", type=float, default=12)
+    parser.add_argument("--mode", choices=["copy", "smart"], default="copy")
+    parser.add_argument("--no-faststart", action="store_true", help="Keep the MP4 index at the end of the file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as videos_dir:
+        video_path = os.path.join(videos_dir, f"synthetic_{args.duration}s.mp4")
+        make_video(video_path, args.duration, args.size, args.gop, "h264")
+        if args.no_faststart:
+            moved = video_path + ".tail.mp4"
+            subprocess.run(["ffmpeg", "-y", "-loglevel", "error", "-i", video_path, "-c", "copy", moved], check=True)
+            os.replace(moved, video_path)
+        segments = plan_segments(args.duration, args.segments, args.segment_seconds, args.gop)
+        size_mib = os.path.getsize(video_path) / 1024 / 1024
+
+        server = CountingRangeServer(video_path)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            print(f"source: {size_mib:.1f} MiB, {args.duration}s; reel: {len(segments)} x {args.segment_seconds}s")
+            print(f"{'path':<9} {'first_segment_s':>15} {'total_s':>8} {'transferred_mib':>15} {'requests':>8}")
+            for name, run in (("download", run_download), ("range", run_range)):
+                server.reset()
+                with tempfile.TemporaryDirectory() as work_dir:
+                    started = time.monotonic()
+                    first_segment = run(server, segments, work_dir, args.mode)
+                    total = time.monotonic() - started
+                print(f"{name:<9} {first_segment:>15.2f} {total:>8.2f} "
+                      f"{server.bytes_sent / 1024 / 1024:>15.1f} {server.requests:>8}")
+        finally:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark harness comparing the split and fused summaries generation modes.
+
+`record` runs one mode against real videos and stores the token usage and latency
+of every Gemini call as a JSON fixture. `compare` reads recorded fixtures and
+prints per-mode totals, so both modes can be compared offline and re-compared
+without paying for the calls again.
+
+Usage (from the services/ directory, with the summaries service environment set):
+    python -m benchmarks.summaries_modes record --mode split --out fixtures gs://bucket/video.mp4
+    python -m benchmarks.summaries_modes record --mode fused --out fixtures gs://bucket/video.mp4
+    python -m benchmarks.summaries_modes compare fixtures
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import time
+from collections import defaultdict
+
+TOKEN_FIELDS = ("prompt_tokens", "cached_tokens", "output_tokens", "thinking_tokens", "total_tokens")
+
+
+def record(mode: str, video_uris: list, out_dir: str, source: str = "GCS"):
+    """Runs the given mode for each video and writes one fixture file per run."""
+    # Imported lazily so `compare` works without cloud credentials.
+    from common.content_classifier import DEFAULT_GENRE, classify_content
+    from common.llm_usage import capture_usage
+    from summaries_generator import main as summaries
+
+    os.makedirs(out_dir, exist_ok=True)
+    for video_uri in video_uris:
+        with capture_usage() as calls:
+            started = time.monotonic()
+            if mode == "fused":
+                summaries.split_fused_response(
+                    summaries.generate_fused("benchmark", video_uri, source)
+                )
+            else:
+                genre = classify_content(
+                    video_uri, source, summaries.project_id, summaries.llm_model
+                ) or DEFAULT_GENRE
+                summaries.run_summary_stages("benchmark", video_uri, source, genre)
+            wall_seconds = round(time.monotonic() - started, 3)
+
+        fixture = {
+            "mode": mode,
+            "video_uri": video_uri,
+            "model": summaries.llm_model,
+            "wall_seconds": wall_seconds,
+            "calls": list(calls),
+        }
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", os.path.basename(video_uri)).strip("_")
+        path = os.path.join(out_dir, f"{slug}.{mode}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(fixture, f, indent=2)
+        print(f"Recorded {mode} run for {video_uri} -> {path}")
+
+
+def compare(fixtures_dir: str):
+    """Prints token usage and latency per video and mode from recorded fixtures."""
+    runs = defaultdict(dict)
+    for path in sorted(glob.glob(os.path.join(fixtures_dir, "*.json"))):
+        with open(path, encoding="utf-8") as f:
+            fixture = json.load(f)
+        runs[fixture["video_uri"]][fixture["mode"]] = fixture
+
+    header = f"{'mode':<6} {'calls':>5} " + " ".join(f"{field:>16}" for field in TOKEN_FIELDS)
+    header += f" {'wall_s':>9}"
+    for video_uri, modes in runs.items():
+        print(f"\n{video_uri}")
+        print(header)
+        totals = {}
+        for mode in ("split", "fused"):
+            fixture = modes.get(mode)
+            if not fixture:
+                continue
+            total = {field: sum(call.get(field, 0) for call in fixture["calls"]) for field in TOKEN_FIELDS}
+            totals[mode] = (total, fixture["wall_seconds"])
+            row = f"{mode:<6} {len(fixture['calls']):>5} "
+            row += " ".join(f"{total[field]:>16}" for field in TOKEN_FIELDS)
+            print(row + f" {fixture['wall_seconds']:>9.2f}")
+        if len(totals) == 2 and totals["split"][0]["total_tokens"]:
+            token_ratio = totals["fused"][0]["total_tokens"] / totals["split"][0]["total_tokens"]
+            latency_ratio = totals["fused"][1] / totals["split"][1]
+            print(f"fused/split: tokens x{token_ratio:.2f}, wall time x{latency_ratio:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = subparsers.add_parser("record", help="Run a mode against videos and record fixtures.")
+    record_parser.add_argument("--mode", choices=["split", "fused"], required=True)
+    record_parser.add_argument("--out", default="fixtures")
+    record_parser.add_argument("--source", default="GCS")
+    record_parser.add_argument("video_uris", nargs="+")
+
+    compare_parser = subparsers.add_parser("compare", help="Compare recorded fixtures.")
+    compare_parser.add_argument("fixtures_dir")
+
+    args = parser.parse_args()
+    if args.command == "record":
+        record(args.mode, args.video_uris, args.out, args.source)
+    else:
+        compare(args.fixtures_dir)
+
+
+if __name__ == "__main__":
+    main()
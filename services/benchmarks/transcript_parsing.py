@@ -0,0 +1,158 @@
+"""
+Benchmark of Speech-to-Text result parsing in the transcription service.
+
+`legacy` reproduces the original parser: the whole result is read as text, decoded
+with json.loads, the transcript is built with repeated string concatenation and
+every word becomes a dict with string offsets, which are then converted into the
+stored columnar form. `stream` runs
+transcription_generator.result_parser, which reads the file incrementally and
+fills columnar arrays with millisecond offsets. Both read from a local file
+standing in for the GCS object.
+
+Each run happens in a fresh subprocess; parse time, the tracemalloc peak of Python
+allocations (measured in a separate pass) and the process peak RSS are reported.
+
+Usage (from the services/ directory):
+    python -m benchmarks.transcript_parsing --hours 1 4 8
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Spoken words per hour and words per result segment in typical Chirp output.
+WORDS_PER_HOUR = 9000
+WORDS_PER_RESULT = 40
+VOCABULARY = ["the", "match", "goal", "minute", "player", "second", "half", "ball", "pass", "shot",
+              "keeper", "corner", "referee", "crowd", "season", "league", "coach", "wing", "cross", "header"]
+
+
+def make_result_file(path: str, hours: float, seed: int = 0):
+    """Writes a synthetic batch_recognize result file in the Speech-to-Text JSON format."""
+    rng = random.Random(seed)
+    total_words = int(hours * WORDS_PER_HOUR)
+    seconds_per_word = 3600 / WORDS_PER_HOUR
+    position = 0.0
+    with open(path, "w") as f:
+        f.write('{"results":[')
+        for first in range(0, total_words, WORDS_PER_RESULT):
+            words = []
+            for _ in range(min(WORDS_PER_RESULT, total_words - first)):
+                start = position
+                position += seconds_per_word * rng.uniform(0.6, 1.4)
+                words.append({
+                    "startOffset": f"{start:.3f}s",
+                    "endOffset": f"{position:.3f}s",
+                    "word": rng.choice(VOCABULARY),
+                })
+            result = {
+                "alternatives": [{
+                    "transcript": " ".join(w["word"] for w in words),
+                    "confidence": 0.9,
+                    "words": words,
+                }],
+                "resultEndOffset": f"{position:.3f}s",
+                "languageCode": "en-us",
+            }
+            if first:
+                f.write(",")
+            f.write(json.dumps(result))
+        f.write("]}")
+
+
+def parse_legacy(path: str):
+    """The original parse_transcript_result, minus the GCS download, plus the conversion for storage."""
+    from common.transcript_store import TranscriptWords
+
+    with open(path) as f:
+        transcript_data = json.loads(f.read())
+    full_transcript = ""
+    words = []
+    for result in transcript_data.get("results", []):
+        alternative = result.get("alternatives", [{}])[0]
+        full_transcript += alternative.get("transcript", "") + " "
+        for word_info in alternative.get("words", []):
+            words.append(
+                {
+                    "word": word_info.get("word"),
+                    "start_time": word_info.get("startOffset"),
+                    "end_time": word_info.get("endOffset"),
+                }
+            )
+    return full_transcript.strip(), TranscriptWords.from_word_dicts(words)
+
+
+def parse_stream(path: str):
+    from transcription_generator.result_parser import parse_recognition_results
+
+    with open(path, "rb") as f:
+        text, words, _ = parse_recognition_results(f)
+    return text, words
+
+
+def run_single(mode: str, path: str):
+    """Runs one parser and prints its measurements as JSON (subprocess entry point)."""
+    parser = parse_legacy if mode == "legacy" else parse_stream
+    # Import outside the measurement.
+    import common.transcript_store  # noqa: F401
+    import transcription_generator.result_parser  # noqa: F401
+    started = time.monotonic()
+    text, words = parser(path)
+    parse_seconds = time.monotonic() - started
+    del text, words
+    # tracemalloc slows allocations down, so the peak is measured in a second run.
+    tracemalloc.start()
+    text, words = parser(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(json.dumps({
+        "parse_seconds": round(parse_seconds, 3),
+        "words": len(words),
+        "py_peak_mib": peak / 1024 / 1024,
+        # ru_maxrss is reported in KiB on Linux.
+        "rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hours", type=float, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--single", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        run_single(*args.single)
+        return
+
+    try:
+        import ijson  # noqa: F401
+    except ImportError:
+        print("ijson is not installed; the stream parser falls back to json.load\n")
+
+    print(f"{'hours':>6} {'file_mib':>9} {'words':>8} {'mode':<7} {'parse_s':>8} {'py_peak':>8} {'rss':>7}")
+    with tempfile.TemporaryDirectory() as work_dir:
+        for hours in args.hours:
+            path = os.path.join(work_dir, f"result_{hours}h.json")
+            make_result_file(path, hours)
+            file_mib = os.path.getsize(path) / 1024 / 1024
+            for mode in ("legacy", "stream"):
+                output = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.transcript_parsing", "--single", mode, path],
+                    check=True,
+                    capture_output=True,
+                    text=True,
+                ).stdout
+                m = json.loads(output.strip().splitlines()[-1])
+                print(f"{hours:>6} {file_mib:>9.1f} {m['words']:>8} {mode:<7} {m['parse_seconds']:>8.3f} "
+                      f"{m['py_peak_mib']:>8.1f} {m['rss_mib']:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
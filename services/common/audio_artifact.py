@@ -0,0 +1,91 @@
+"""Extracted audio of an asset, shared by every service that needs it.
+
+The transcription service extracts the audio track of a media file once, as a
+16 kHz FLAC at `{asset_id}/audio.flac` in the source bucket, and records it in the
+asset's `audio_artifact` field. The object carries the generation of the source it
+was extracted from, so a retry or reprocess of the same source reuses it, while a
+re-uploaded source (new generation) or a change of the extraction settings
+(AUDIO_ARTIFACT_VERSION) produces a new one.
+
+Consumers read `asset["audio_artifact"]["uri"]` instead of extracting again.
+"""
+
+from typing import Optional
+
+# Bump when the extraction settings below change, so existing artifacts are redone.
+AUDIO_ARTIFACT_VERSION = "1"
+AUDIO_CODEC = "flac"
+AUDIO_SAMPLE_RATE = 16000
+AUDIO_CONTENT_TYPE = "audio/flac"
+
+
+def audio_artifact_name(asset_id: str) -> str:
+    """Returns the object name of an asset's audio artifact."""
+    return f"{asset_id}/audio.flac"
+
+
+def audio_artifact_metadata(source_blob, duration_seconds: Optional[float] = None) -> dict:
+    """
+    Returns the custom object metadata identifying an artifact's source.
+
+    Args:
+        source_blob: The source media Blob, with its generation loaded.
+        duration_seconds (Optional[float]): Duration of the extracted audio.
+
+    Returns:
+        dict: String metadata to set on the artifact object.
+    """
+    metadata = {
+        "source_uri": f"gs://{source_blob.bucket.name}/{source_blob.name}",
+        "source_generation": str(source_blob.generation),
+        "artifact_version": AUDIO_ARTIFACT_VERSION,
+        "codec": AUDIO_CODEC,
+        "sample_rate": str(AUDIO_SAMPLE_RATE),
+    }
+    if duration_seconds is not None:
+        metadata["duration_seconds"] = f"{duration_seconds:.3f}"
+    return metadata
+
+
+def is_current_audio_artifact(audio_blob, source_blob) -> bool:
+    """
+    Checks whether an existing artifact was extracted from this source generation
+    with the current settings.
+
+    Args:
+        audio_blob: The artifact Blob as returned by bucket.get_blob, or None.
+        source_blob: The source media Blob, with its generation loaded.
+
+    Returns:
+        bool: True if the artifact can be reused.
+    """
+    if audio_blob is None or not audio_blob.size:
+        return False
+    metadata = audio_blob.metadata or {}
+    return (
+        metadata.get("source_generation") == str(source_blob.generation)
+        and metadata.get("artifact_version") == AUDIO_ARTIFACT_VERSION
+    )
+
+
+def describe_audio_artifact(audio_blob) -> dict:
+    """
+    Returns the `audio_artifact` fields recorded on the asset document.
+
+    Args:
+        audio_blob: The artifact Blob with its metadata loaded.
+
+    Returns:
+        dict: URI, codec, sample rate, duration, size and source generation.
+    """
+    metadata = audio_blob.metadata or {}
+    duration = metadata.get("duration_seconds")
+    return {
+        "uri": f"gs://{audio_blob.bucket.name}/{audio_blob.name}",
+        "codec": metadata.get("codec", AUDIO_CODEC),
+        "sample_rate": int(metadata.get("sample_rate", AUDIO_SAMPLE_RATE)),
+        "duration_seconds": float(duration) if duration else None,
+        "size_bytes": audio_blob.size,
+        "source_generation": metadata.get("source_generation"),
+        "version": metadata.get("artifact_version"),
+    }
@@ -0,0 +1,147 @@
+"""Builds WebVTT and SRT captions from word-level transcription timings.
+
+Words are grouped into cues in a single pass:
+
+- a cue holds up to `max_lines` lines of at most `max_line_chars` characters;
+- a cue is closed after sentence-final punctuation, when it would exceed
+  `max_cue_ms`, or when the speaker pauses for longer than `max_gap_ms`;
+- a short cue is kept on screen for up to `min_cue_ms`, but never past the start
+  of the next cue.
+
+Each word is looked at once and only the cue under construction plus the previous
+cue are held, so long transcripts convert in linear time.
+"""
+
+from typing import Iterator, List, NamedTuple
+
+from common.transcript_store import TranscriptWords
+
+SENTENCE_END = (".", "?", "!", "…")
+
+
+class Cue(NamedTuple):
+    """A caption cue; `lines` are shown together from start_ms to end_ms."""
+
+    start_ms: int
+    end_ms: int
+    lines: List[str]
+
+
+def build_cues(
+    words: TranscriptWords,
+    max_line_chars: int = 42,
+    max_lines: int = 2,
+    max_cue_ms: int = 6000,
+    max_gap_ms: int = 1500,
+    min_cue_ms: int = 1000,
+) -> Iterator[Cue]:
+    """
+    Groups words into caption cues.
+
+    Args:
+        words (TranscriptWords): Word timings in time order.
+        max_line_chars (int): Maximum characters per caption line.
+        max_lines (int): Maximum lines per cue.
+        max_cue_ms (int): Maximum cue duration.
+        max_gap_ms (int): A longer pause between words starts a new cue.
+        min_cue_ms (int): Minimum time a cue stays on screen, if the next cue allows.
+
+    Yields:
+        Cue: Cues in time order.
+    """
+    pending = None
+    lines = []
+    start = end = 0
+
+    def close():
+        nonlocal pending, lines
+        cue = None
+        if pending is not None:
+            # Extend the previous cue up to its minimum duration without overlapping.
+            cue = pending._replace(end_ms=min(max(pending.end_ms, pending.start_ms + min_cue_ms), start))
+        pending = Cue(start, end, lines)
+        lines = []
+        return cue
+
+    for word, word_start, word_end in zip(words.words, words.start_ms, words.end_ms):
+        if not word:
+            continue
+        if lines and (
+            word_start - end > max_gap_ms
+            or word_end - start > max_cue_ms
+            or (len(lines) >= max_lines and len(lines[-1]) + 1 + len(word) > max_line_chars)
+        ):
+            previous = close()
+            if previous is not None:
+                yield previous
+
+        if not lines:
+            lines = [word]
+            start = word_start
+        elif len(lines[-1]) + 1 + len(word) <= max_line_chars:
+            lines[-1] = f"{lines[-1]} {word}"
+        else:
+            lines.append(word)
+        end = word_end
+
+        if word.endswith(SENTENCE_END):
+            previous = close()
+            if previous is not None:
+                yield previous
+
+    if lines:
+        previous = close()
+        if previous is not None:
+            yield previous
+    if pending is not None:
+        yield pending._replace(end_ms=max(pending.end_ms, pending.start_ms + min_cue_ms))
+
+
+def _timestamp(ms: int, separator: str) -> str:
+    hours, ms = divmod(ms, 3_600_000)
+    minutes, ms = divmod(ms, 60_000)
+    seconds, ms = divmod(ms, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}{separator}{ms:03d}"
+
+
+def to_webvtt(cues: List[Cue]) -> str:
+    """Formats cues as a WebVTT document."""
+    parts = ["WEBVTT\n"]
+    for cue in cues:
+        timing = f"{_timestamp(cue.start_ms, '.')} --> {_timestamp(cue.end_ms, '.')}"
+        parts.append(f"\n{timing}\n" + "\n".join(cue.lines) + "\n")
+    return "".join(parts)
+
+
+def to_srt(cues: List[Cue]) -> str:
+    """Formats cues as a SubRip (SRT) document."""
+    parts = []
+    for index, cue in enumerate(cues, 1):
+        timing = f"{_timestamp(cue.start_ms, ',')} --> {_timestamp(cue.end_ms, ',')}"
+        parts.append(f"{index}\n{timing}\n" + "\n".join(cue.lines) + "\n\n")
+    return "".join(parts)
+
+
+def write_captions(storage_client, bucket_name: str, prefix: str, words: TranscriptWords, **cue_options) -> dict:
+    """
+    Builds the captions and uploads them as `captions.vtt` and `captions.srt`.
+
+    Args:
+        storage_client: A google.cloud.storage Client.
+        bucket_name (str): Destination bucket.
+        prefix (str): Object name prefix, e.g. "{asset_id}/transcription_results/".
+        words (TranscriptWords): Word timings.
+        **cue_options: Options passed to build_cues.
+
+    Returns:
+        dict: URIs of both files and the number of cues.
+    """
+    cues = list(build_cues(words, **cue_options))
+    bucket = storage_client.bucket(bucket_name)
+    bucket.blob(f"{prefix}captions.vtt").upload_from_string(to_webvtt(cues), content_type="text/vtt")
+    bucket.blob(f"{prefix}captions.srt").upload_from_string(to_srt(cues), content_type="application/x-subrip")
+    return {
+        "vtt_uri": f"gs://{bucket_name}/{prefix}captions.vtt",
+        "srt_uri": f"gs://{bucket_name}/{prefix}captions.srt",
+        "cue_count": len(cues),
+    }
@@ -1,10 +1,23 @@
 """Classifies video content genre using a quick Gemini call."""
 
 import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Optional
 
-from google import genai
 from google.genai import types
 
+from common.context_cache import is_cache_miss
+from common.genai_client import get_genai_client
+from common.llm_usage import log_usage
+from common.result_cache import prompt_fingerprint
+from common.generation_policy import get_generation_policy, asset_duration_seconds
+from common.media_sampling import media_resolution, is_sampled, video_part
+
 logger = logging.getLogger(__name__)
 
 CLASSIFICATION_PROMPT = """Classify this video into exactly one category based on its CONTENT FORMAT:
@@ -17,9 +30,49 @@ CLASSIFICATION_PROMPT = """Classify this video into exactly one category based o
 Respond with ONLY the category name."""
 
 VALID_GENRES = {"sports", "entertainment", "documentary", "other"}
-
-
-def classify_content(video_uri: str, source: str, project_id: str, llm_model: str) -> str:
+# Genre used for prompt selection when an asset could not be classified. It is
+# applied by the callers and never stored as the asset's genre.
+DEFAULT_GENRE = "entertainment"
+
+# Lease used as a single-flight lock so only one service classifies an asset.
+GENRE_LEASE_NAME = "content_genre"
+GENRE_LEASE_TTL_SECONDS = int(os.environ.get("GENRE_LEASE_TTL_SECONDS", "180"))
+GENRE_POLL_INTERVAL_SECONDS = 2
+
+# Identifies this process as a lease owner.
+_LEASE_OWNER = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+# Coalesces concurrent requests for the same asset within this process. Entries are
+# [lock, holders] and are removed when the last holder leaves, so the map only
+# holds assets being classified right now.
+_asset_locks = {}
+_asset_locks_guard = threading.Lock()
+
+
+@contextmanager
+def _asset_lock(asset_id: str):
+    """Holds the in-process lock of an asset, dropping its entry after the last holder."""
+    with _asset_locks_guard:
+        entry = _asset_locks.setdefault(asset_id, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _asset_locks_guard:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del _asset_locks[asset_id]
+
+
+def classify_content(
+    video_uri: str,
+    source: str,
+    project_id: str,
+    llm_model: str,
+    asset_id: Optional[str] = None,
+    context_cache=None,
+    duration_seconds: Optional[float] = None,
+) -> Optional[str]:
     """Classify video content genre via a quick Gemini call.
 
     Args:
@@ -27,38 +80,166 @@ def classify_content(video_uri: str, source: str, project_id: str, llm_model: st
         source: "GCS" or "youtube".
         project_id: GCP project ID.
         llm_model: Gemini model name to use.
+        asset_id: Asset ID, needed to reuse the asset's cached video.
+        context_cache: Optional VideoContextCache shared with the generation calls.
+        duration_seconds: Media duration, if known, for the generation policy.
 
     Returns:
-        One of "sports", "entertainment", "documentary", "other".
-        Defaults to "entertainment" on any error.
+        One of "sports", "entertainment", "documentary", "other", or None if the
+        call failed or returned something else.
     """
     try:
-        client = genai.Client(vertexai=True, project=project_id, location="global")
+        policy = get_generation_policy().decide(
+            "classification", llm_model, duration_seconds, None, asset_id
+        )
+        llm_model = policy["model"]
+        client = get_genai_client(project_id, "global")
 
         mime_type = "video/youtube" if source == "youtube" else "video/*"
-        video_part = types.Part.from_uri(file_uri=video_uri, mime_type=mime_type)
+        sampled_video_part = video_part(video_uri, mime_type, policy.get("fps"))
         text_part = types.Part.from_text(text=CLASSIFICATION_PROMPT)
 
         config = types.GenerateContentConfig(
             temperature=0,
-            max_output_tokens=10,
-            thinking_config=types.ThinkingConfig(thinking_budget=0),
+            max_output_tokens=policy["max_output_tokens"],
+            media_resolution=media_resolution(policy),
+            thinking_config=types.ThinkingConfig(thinking_budget=policy["thinking_budget"]),
         )
 
-        response = client.models.generate_content(
-            model=llm_model,
-            contents=[types.Content(role="user", parts=[text_part, video_part])],
-            config=config,
-        )
+        started = time.monotonic()
+        response = None
+        cache_name = None
+        # The cached video is tokenized at full fidelity, so sampled calls send it inline.
+        if context_cache and asset_id and not is_sampled(policy):
+            cache_name = context_cache.get_handle(asset_id, video_uri, mime_type, llm_model)
+        if cache_name:
+            try:
+                response = context_cache.client.models.generate_content(
+                    model=llm_model,
+                    contents=[types.Content(role="user", parts=[text_part])],
+                    config=config.model_copy(update={"cached_content": cache_name}),
+                )
+            except Exception as e:
+                if not is_cache_miss(e, cache_name):
+                    raise
+                logger.warning("Cached content %s is gone, sending video inline", cache_name, exc_info=True)
+                context_cache.evict(asset_id, llm_model)
+
+        if response is None:
+            response = client.models.generate_content(
+                model=llm_model,
+                contents=[types.Content(role="user", parts=[text_part, sampled_video_part])],
+                config=config,
+            )
+        log_usage("classification", llm_model, response, time.monotonic() - started)
 
         genre = response.text.strip().lower()
         if genre in VALID_GENRES:
             logger.info("Content classified as: %s", genre)
             return genre
 
-        logger.warning("Unexpected classification result: '%s', defaulting to 'entertainment'", genre)
-        return "entertainment"
+        logger.warning("Unexpected classification result: '%s'", genre)
+        return None
 
     except Exception:
-        logger.warning("Content classification failed, defaulting to 'entertainment'", exc_info=True)
-        return "entertainment"
+        logger.warning("Content classification failed", exc_info=True)
+        return None
+
+
+def _stored_genre(asset_data: dict) -> Optional[str]:
+    genre = (asset_data.get("video_details") or {}).get("content_genre")
+    return genre if genre in VALID_GENRES else None
+
+
+def get_or_classify_content(
+    asset_manager,
+    asset_id: str,
+    video_uri: str,
+    source: str,
+    project_id: str,
+    llm_model: str,
+    context_cache=None,
+    result_cache=None,
+    content_hash: Optional[str] = None,
+) -> Optional[str]:
+    """Return the asset's content genre, classifying it at most once per asset.
+
+    The genre stored in `video_details.content_genre` is reused when present.
+    Otherwise the caller takes the asset's genre lease, classifies and stores the
+    result. Callers that find the lease held by another instance wait for the
+    stored genre instead of making their own Gemini call, and only classify
+    themselves if the lease expires without a result.
+
+    A failed classification is neither stored nor cached, so the next request for
+    the asset classifies again. Callers fall back to DEFAULT_GENRE for it.
+
+    Args:
+        asset_manager: MediaAssetManager used to read and write the asset.
+        asset_id: ID of the asset.
+        video_uri: GCS URI or YouTube URL of the video.
+        source: "GCS" or "youtube".
+        project_id: GCP project ID.
+        llm_model: Gemini model name to use.
+        context_cache: Optional VideoContextCache shared with the generation calls.
+        result_cache: Optional ResultCache reused across ingests of the same media.
+        content_hash: Content hash of the media, required by the result cache.
+
+    Returns:
+        One of "sports", "entertainment", "documentary", "other", or None if the
+        asset could not be classified.
+    """
+    log_extra = {"extra_fields": {"asset_id": asset_id}}
+    with _asset_lock(asset_id):
+        deadline = time.monotonic() + GENRE_LEASE_TTL_SECONDS
+        while True:
+            asset_data = asset_manager.get_asset(asset_id) or {}
+            genre = _stored_genre(asset_data)
+            if genre:
+                logger.info("Reusing stored content genre: %s", genre, extra=log_extra)
+                return genre
+
+            if asset_manager.acquire_lease(
+                asset_id, GENRE_LEASE_NAME, _LEASE_OWNER, GENRE_LEASE_TTL_SECONDS
+            ):
+                break
+            if time.monotonic() > deadline:
+                logger.warning(
+                    "Timed out waiting for another instance to classify, classifying here",
+                    extra=log_extra,
+                )
+                break
+            time.sleep(GENRE_POLL_INTERVAL_SECONDS)
+
+        duration_seconds = asset_duration_seconds(asset_data)
+
+        def classify():
+            return classify_content(
+                video_uri, source, project_id, llm_model, asset_id, context_cache, duration_seconds
+            )
+
+        def compute():
+            # Failures are returned as errors so the result cache does not keep them.
+            genre = classify()
+            return {"content_genre": genre} if genre else {"error": "Content classification failed"}
+
+        try:
+            if result_cache:
+                genre = result_cache.get_or_compute(
+                    content_hash,
+                    "content_genre",
+                    prompt_fingerprint(CLASSIFICATION_PROMPT, get_generation_policy().fingerprint),
+                    llm_model,
+                    compute,
+                    asset_id=asset_id,
+                ).get("content_genre")
+            else:
+                genre = classify()
+            if genre not in VALID_GENRES:
+                logger.warning("Content genre unavailable, not storing it", extra=log_extra)
+                return None
+            asset_manager.update_asset_metadata(
+                asset_id, "video_details", {"content_genre": genre}
+            )
+            return genre
+        finally:
+            asset_manager.release_lease(asset_id, GENRE_LEASE_NAME, _LEASE_OWNER)
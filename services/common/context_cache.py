@@ -0,0 +1,282 @@
+"""Shares Vertex AI cached-content handles for a video across services."""
+
+import logging
+import re
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from google.genai import errors, types
+
+logger = logging.getLogger(__name__)
+
+# Tasks whose Gemini calls read an asset's cached video.
+CONSUMER_TASKS = ("summary", "previews")
+# Task statuses meaning the task may still use the cache.
+ACTIVE_STATUSES = {"pending", "dispatched", "processing"}
+
+
+class VideoContextCache:
+    """
+    Creates a Gemini cached-content handle for an asset's video on first use and
+    records it on the asset document, so later calls from any service can reference
+    the already tokenized video instead of sending it again.
+
+    Handles are stored per model under `video_details.context_caches.<model_key>` as
+    {"name", "model", "video_uri", "expire_time"}. Expired handles, or handles close
+    to expiry, are recreated; a call rejected because its handle no longer exists
+    (see `is_cache_miss`) evicts it and falls back to sending the video inline.
+
+    Each consuming service calls `release` after writing its final task status; the
+    handles are deleted once no consumer task is still active, instead of accruing
+    storage cost until their TTL expires.
+
+    Both the genai client and the asset store are injected, so the class can be
+    exercised with in-memory fakes that implement `caches.create/delete` and
+    `get_asset/update_asset_metadata`.
+    """
+
+    def __init__(
+        self,
+        client,
+        asset_manager,
+        ttl_seconds: int = 3600,
+        refresh_margin_seconds: int = 300,
+    ):
+        """
+        Args:
+            client: A genai.Client bound to a regional Vertex AI location.
+            asset_manager: A MediaAssetManager (or compatible fake).
+            ttl_seconds (int): Lifetime of newly created handles.
+            refresh_margin_seconds (int): Handles expiring sooner than this are recreated.
+        """
+        self.client = client
+        self.asset_manager = asset_manager
+        self.ttl_seconds = ttl_seconds
+        self.refresh_margin = timedelta(seconds=refresh_margin_seconds)
+        # Serializes handle creation within this process for the same asset and model.
+        # Entries are [lock, holders] and are removed when the last holder leaves.
+        self._creation_locks = {}
+        self._creation_locks_guard = threading.Lock()
+
+    @staticmethod
+    def _model_key(model_name: str) -> str:
+        """Turns a model name into a Firestore-safe field name."""
+        return re.sub(r"[^A-Za-z0-9_]", "_", model_name)
+
+    @contextmanager
+    def _lock_for(self, asset_id: str, model_name: str):
+        key = (asset_id, model_name)
+        with self._creation_locks_guard:
+            entry = self._creation_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._creation_locks_guard:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._creation_locks[key]
+
+    def _stored_handle(self, asset_id: str, model_name: str) -> Optional[dict]:
+        asset_data = self.asset_manager.get_asset(asset_id) or {}
+        caches = (asset_data.get("video_details") or {}).get("context_caches") or {}
+        return caches.get(self._model_key(model_name))
+
+    def _is_fresh(self, handle: dict, video_uri: str) -> bool:
+        expire_time = handle.get("expire_time")
+        if not handle.get("name") or not expire_time or handle.get("video_uri") != video_uri:
+            return False
+        return expire_time - datetime.now(timezone.utc) > self.refresh_margin
+
+    def get_handle(
+        self, asset_id: str, video_uri: str, mime_type: str, model_name: str
+    ) -> Optional[str]:
+        """
+        Returns the cached-content name for the asset's video, creating it if needed.
+
+        Args:
+            asset_id (str): The ID of the asset.
+            video_uri (str): GCS URI of the video.
+            mime_type (str): MIME type used for the video part.
+            model_name (str): The model the handle will be used with.
+
+        Returns:
+            Optional[str]: The cached-content resource name, or None if caching is not
+                           possible and the caller should send the video inline.
+        """
+        if not video_uri.startswith("gs://"):
+            return None
+        log_extra = {"extra_fields": {"asset_id": asset_id, "model": model_name}}
+
+        handle = self._stored_handle(asset_id, model_name)
+        if handle and self._is_fresh(handle, video_uri):
+            return handle["name"]
+
+        with self._lock_for(asset_id, model_name):
+            # Another thread may have created the handle while we waited.
+            handle = self._stored_handle(asset_id, model_name)
+            if handle and self._is_fresh(handle, video_uri):
+                return handle["name"]
+
+            try:
+                cached_content = self.client.caches.create(
+                    model=model_name,
+                    config=types.CreateCachedContentConfig(
+                        contents=[
+                            types.Content(
+                                role="user",
+                                parts=[types.Part.from_uri(file_uri=video_uri, mime_type=mime_type)],
+                            )
+                        ],
+                        display_name=f"asset-{asset_id}"[:128],
+                        ttl=f"{self.ttl_seconds}s",
+                    ),
+                )
+            except Exception:
+                logger.warning(
+                    "Could not create context cache for asset %s, sending video inline",
+                    asset_id,
+                    exc_info=True,
+                    extra=log_extra,
+                )
+                return None
+
+            expire_time = cached_content.expire_time or (
+                datetime.now(timezone.utc) + timedelta(seconds=self.ttl_seconds)
+            )
+            self.asset_manager.update_asset_metadata(
+                asset_id,
+                "video_details",
+                {
+                    f"context_caches.{self._model_key(model_name)}": {
+                        "name": cached_content.name,
+                        "model": model_name,
+                        "video_uri": video_uri,
+                        "expire_time": expire_time,
+                    }
+                },
+            )
+            logger.info(
+                "Created context cache %s for asset %s (expires %s)",
+                cached_content.name,
+                asset_id,
+                expire_time,
+                extra=log_extra,
+            )
+            return cached_content.name
+
+    def invalidate(self, asset_id: str, model_name: str):
+        """
+        Forgets the stored handle so the next call recreates it.
+
+        Args:
+            asset_id (str): The ID of the asset.
+            model_name (str): The model whose handle should be dropped.
+        """
+        self.asset_manager.update_asset_metadata(
+            asset_id,
+            "video_details",
+            {f"context_caches.{self._model_key(model_name)}": None},
+        )
+
+    def evict(self, asset_id: str, model_name: str):
+        """
+        Deletes the cached content on Vertex AI and forgets the stored handle.
+
+        Args:
+            asset_id (str): The ID of the asset.
+            model_name (str): The model whose handle should be deleted.
+        """
+        handle = self._stored_handle(asset_id, model_name)
+        if handle and handle.get("name"):
+            try:
+                self.client.caches.delete(name=handle["name"])
+            except Exception:
+                # Already expired or deleted; only the stored reference needs clearing.
+                logger.info(
+                    "Context cache %s already gone", handle["name"],
+                    extra={"extra_fields": {"asset_id": asset_id}},
+                )
+        self.invalidate(asset_id, model_name)
+
+    def release(self, asset_id: str, consumers=CONSUMER_TASKS) -> bool:
+        """
+        Deletes all of the asset's handles once none of its consumer tasks is active.
+
+        Consumers call this after storing their final status, so the last one to
+        finish sees every other task finished and evicts. Concurrent evictions are
+        harmless; deleting a handle twice only logs.
+
+        Args:
+            asset_id (str): The ID of the asset.
+            consumers (tuple): Task fields of the asset that use the cached video.
+
+        Returns:
+            bool: True if handles were evicted.
+        """
+        log_extra = {"extra_fields": {"asset_id": asset_id}}
+        try:
+            asset_data = self.asset_manager.get_asset(asset_id) or {}
+            active = [
+                task for task in consumers
+                if (asset_data.get(task) or {}).get("status") in ACTIVE_STATUSES
+            ]
+            if active:
+                logger.debug("Keeping context caches of asset %s for %s", asset_id, active, extra=log_extra)
+                return False
+            caches = (asset_data.get("video_details") or {}).get("context_caches") or {}
+            models = [handle["model"] for handle in caches.values() if handle and handle.get("model")]
+            for model_name in models:
+                self.evict(asset_id, model_name)
+            if models:
+                logger.info("Evicted context caches of asset %s for %s", asset_id, models, extra=log_extra)
+            return bool(models)
+        except Exception:
+            # The TTL still bounds the cost of a handle that could not be deleted.
+            logger.warning("Could not release context caches of asset %s", asset_id, exc_info=True, extra=log_extra)
+            return False
+
+
+def is_cache_miss(error: Exception, cache_name: str) -> bool:
+    """
+    Tells whether a cached request failed because its cached content is gone.
+
+    Expired or deleted cached content is rejected with a 404 or 400 naming the
+    cached content. Timeouts, quota and model errors are not cache misses; retrying
+    them inline would only repeat the whole call.
+
+    Args:
+        error (Exception): The error raised by the cached request.
+        cache_name (str): The cached-content resource name used by the request.
+
+    Returns:
+        bool: True if the caller should evict the handle and send the video inline.
+    """
+    if not isinstance(error, errors.APIError) or error.code not in (400, 404):
+        return False
+    message = f"{error.message or ''} {error.details or ''}"
+    return cache_name in message or "cachedcontent" in re.sub(r"[\s_]", "", message.lower())
+
+
+def build_cached_request(system_instruction_text: str, prompt_text: str) -> list:
+    """
+    Builds the request contents for a call that references a cached video.
+
+    Requests using cached content cannot set their own system instruction, so it is
+    sent as a leading text part instead.
+
+    Args:
+        system_instruction_text (str): The system instruction for the call.
+        prompt_text (str): The prompt for the call.
+
+    Returns:
+        list: The contents to pass to generate_content.
+    """
+    parts = []
+    if system_instruction_text:
+        parts.append(types.Part.from_text(text=system_instruction_text))
+    parts.append(types.Part.from_text(text=prompt_text))
+    return [types.Content(role="user", parts=parts)]
@@ -0,0 +1,80 @@
+"""Coalesces frequent partial updates of an asset into few Firestore writes."""
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class DebouncedAssetUpdater:
+    """
+    Buffers field updates for one metadata section of an asset and writes them at
+    most once per interval. Updates arriving within the interval are merged, and a
+    trailing write is scheduled so the latest values are never held back for longer
+    than the interval. Safe to use from several threads at once.
+    """
+
+    def __init__(self, asset_manager, asset_id: str, metadata_type: str, min_interval_seconds: float = 5.0):
+        """
+        Args:
+            asset_manager: MediaAssetManager used for the writes.
+            asset_id (str): The asset being updated.
+            metadata_type (str): The section to update (e.g., "summary").
+            min_interval_seconds (float): Minimum time between two writes.
+        """
+        self.asset_manager = asset_manager
+        self.asset_id = asset_id
+        self.metadata_type = metadata_type
+        self.min_interval = min_interval_seconds
+        self._pending = {}
+        self._last_write = 0.0
+        self._timer = None
+        self._closed = False
+        self._lock = threading.Lock()
+        self.write_count = 0
+
+    def update(self, fields: dict):
+        """Merges fields into the pending update and writes it if the interval allows."""
+        with self._lock:
+            if self._closed:
+                return
+            self._pending.update(fields)
+            wait = self.min_interval - (time.monotonic() - self._last_write)
+            if wait > 0:
+                if self._timer is None:
+                    self._timer = threading.Timer(wait, self.flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+                return
+        self.flush()
+
+    def flush(self):
+        """Writes all pending fields now."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._pending or self._closed:
+                return
+            fields, self._pending = self._pending, {}
+            self._last_write = time.monotonic()
+            self.write_count += 1
+            # Written under the lock so writes reach Firestore in order.
+            self.asset_manager.update_asset_metadata(self.asset_id, self.metadata_type, fields)
+
+    def close(self):
+        """Drops pending fields and stops further writes, e.g. before the final result is written."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._pending = {}
+            self._closed = True
+        logger.info(
+            "Streamed %d partial '%s' updates for asset %s",
+            self.write_count,
+            self.metadata_type,
+            self.asset_id,
+            extra={"extra_fields": {"asset_id": self.asset_id}},
+        )
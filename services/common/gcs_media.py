@@ -0,0 +1,306 @@
+"""Streams GCS media through ffmpeg without staging the files on local disk.
+
+Cloud Run's /tmp is backed by instance memory, so downloading a multi-GB master
+before running ffmpeg costs as much memory as the file itself. The helpers here let
+ffmpeg read the source directly from GCS and stream its output back to GCS, keeping
+memory bounded by a few buffers regardless of the source size.
+"""
+
+import collections
+import logging
+import re
+import threading
+from datetime import timedelta
+from typing import List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Size of the reads from the ffmpeg pipes and from GCS when feeding stdin.
+PIPE_CHUNK_SIZE = 1024 * 1024
+# Chunk size of resumable uploads; must be a multiple of 256 KiB.
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+# Lines of ffmpeg stderr kept for error messages.
+STDERR_TAIL_LINES = 40
+
+_PROGRESS_TIME = re.compile(r"time=(\d+):(\d+):([\d.]+)")
+
+_credentials = None
+_credentials_lock = threading.Lock()
+
+
+class TranscodeResult(NamedTuple):
+    """Outcome of ffmpeg_gcs_to_gcs."""
+
+    bytes_written: int
+    # Media time ffmpeg reported as processed, i.e. the output duration.
+    duration_seconds: Optional[float]
+
+
+def progress_seconds(lines: List[str]) -> Optional[float]:
+    """
+    Returns the last media time reported in ffmpeg's progress output.
+
+    Args:
+        lines (list): ffmpeg stderr lines; progress reports may be joined by
+            carriage returns.
+
+    Returns:
+        Optional[float]: Seconds of media processed, or None without progress output.
+    """
+    seconds = None
+    for line in lines:
+        for match in _PROGRESS_TIME.finditer(line):
+            hours, minutes, secs = match.groups()
+            seconds = int(hours) * 3600 + int(minutes) * 60 + float(secs)
+    return seconds
+
+
+def parse_gcs_uri(gcs_uri: str) -> Tuple[str, str]:
+    """
+    Splits a GCS URI into bucket and object name.
+
+    Args:
+        gcs_uri (str): A URI such as gs://bucket/path/to/file.mp4.
+
+    Returns:
+        tuple: (bucket_name, blob_name).
+    """
+    if not gcs_uri or not gcs_uri.startswith("gs://"):
+        raise ValueError("Invalid GCS URI provided.")
+    bucket_name, blob_name = gcs_uri.replace("gs://", "").split("/", 1)
+    return bucket_name, blob_name
+
+
+def _refreshed_credentials():
+    """Returns the default credentials with a valid access token, shared by all threads."""
+    global _credentials
+    import google.auth
+    from google.auth.transport import requests as auth_requests
+
+    with _credentials_lock:
+        if _credentials is None:
+            _credentials, _ = google.auth.default()
+        if not _credentials.valid:
+            _credentials.refresh(auth_requests.Request())
+        return _credentials
+
+
+def signed_read_url(blob, expiration_seconds: int = 3600) -> Optional[str]:
+    """
+    Returns a V4 signed URL to read a GCS object, or None if it cannot be signed.
+
+    Service account key files sign locally. On Cloud Run the runtime service account
+    has no private key, so the URL is signed through the IAM signBlob API, which
+    requires the account to hold roles/iam.serviceAccountTokenCreator on itself.
+
+    Args:
+        blob: The google.cloud.storage Blob to read.
+        expiration_seconds (int): Lifetime of the URL.
+    """
+    expiration = timedelta(seconds=expiration_seconds)
+    try:
+        return blob.generate_signed_url(version="v4", expiration=expiration, method="GET")
+    except Exception:
+        pass
+    try:
+        credentials = _refreshed_credentials()
+        return blob.generate_signed_url(
+            version="v4",
+            expiration=expiration,
+            method="GET",
+            service_account_email=getattr(credentials, "service_account_email", None),
+            access_token=credentials.token,
+        )
+    except Exception:
+        logger.warning("Could not sign a read URL for gs://%s/%s", blob.bucket.name, blob.name, exc_info=True)
+        return None
+
+
+def feed_stdin(source_blob, stdin):
+    """Copies the source object into the stdin of an ffmpeg or ffprobe process using ranged GCS reads."""
+    try:
+        with source_blob.open("rb", chunk_size=PIPE_CHUNK_SIZE) as reader:
+            while True:
+                chunk = reader.read(PIPE_CHUNK_SIZE)
+                if not chunk:
+                    break
+                stdin.write(chunk)
+    except BrokenPipeError:
+        # ffmpeg exited early; its exit code and stderr carry the reason.
+        pass
+    except Exception:
+        logger.warning("Feeding gs://%s/%s to ffmpeg failed", source_blob.bucket.name, source_blob.name, exc_info=True)
+    finally:
+        try:
+            stdin.close()
+        except OSError:
+            pass
+
+
+def _drain_stderr(stderr, tail: collections.deque):
+    """Keeps the last lines of ffmpeg's stderr; draining it prevents ffmpeg from blocking."""
+    for line in iter(stderr.readline, b""):
+        # Progress reports are separated by carriage returns; only the latest matters.
+        tail.append(line.decode(errors="replace").rstrip().rsplit("\r", 1)[-1])
+
+
+def _start_ffmpeg(
+    source_blob, build_output, input_kwargs: dict, pipe_stdout: bool, stderr_lines: Optional[int], stats: bool = False
+):
+    """
+    Starts ffmpeg on a GCS object, fed over a signed URL or through stdin.
+
+    Returns:
+        tuple: (process, stderr lines deque, helper threads to join after wait()).
+    """
+    import ffmpeg
+
+    url = signed_read_url(source_blob)
+    if url:
+        stream = ffmpeg.input(url, reconnect=1, reconnect_streamed=1, **input_kwargs)
+    else:
+        stream = ffmpeg.input("pipe:0", **input_kwargs)
+    process = build_output(stream).global_args("-stats" if stats else "-nostats").run_async(
+        pipe_stdin=url is None, pipe_stdout=pipe_stdout, pipe_stderr=True
+    )
+
+    stderr = collections.deque(maxlen=stderr_lines)
+    threads = [threading.Thread(target=_drain_stderr, args=(process.stderr, stderr), daemon=True)]
+    if url is None:
+        threads.append(threading.Thread(target=feed_stdin, args=(source_blob, process.stdin), daemon=True))
+    for thread in threads:
+        thread.start()
+    return process, stderr, threads
+
+
+def ffmpeg_gcs_to_gcs(
+    source_blob, output_blob, content_type: str, input_kwargs: Optional[dict] = None, **output_kwargs
+) -> TranscodeResult:
+    """
+    Runs ffmpeg on a GCS object and uploads its output to another GCS object.
+
+    ffmpeg reads the source over a signed URL, issuing HTTP range requests itself,
+    which also handles containers whose index sits at the end of the file. When no
+    URL can be signed, the object is piped into stdin with ranged reads instead; that
+    requires a streamable container (e.g. MKV, MPEG-TS, fragmented or faststart MP4).
+    The output is written to stdout and streamed into a resumable upload, which is
+    only finalized when ffmpeg succeeds.
+
+    Args:
+        source_blob: The google.cloud.storage Blob to read.
+        output_blob: The Blob to write.
+        content_type (str): Content type of the output object.
+        input_kwargs (Optional[dict]): ffmpeg-python input options (e.g. ss, to).
+        **output_kwargs: ffmpeg-python output options; must include `format`
+            because the output is a pipe.
+
+    Returns:
+        TranscodeResult: Bytes uploaded and the duration of the output.
+
+    Raises:
+        ffmpeg.Error: If ffmpeg exits with a non-zero status.
+    """
+    import ffmpeg
+
+    process, stderr_tail, threads = _start_ffmpeg(
+        source_blob,
+        lambda stream: stream.output("pipe:1", **output_kwargs),
+        input_kwargs or {},
+        pipe_stdout=True,
+        stderr_lines=STDERR_TAIL_LINES,
+        stats=True,
+    )
+
+    writer = output_blob.open("wb", chunk_size=UPLOAD_CHUNK_SIZE, content_type=content_type)
+    written = 0
+    try:
+        while True:
+            chunk = process.stdout.read(PIPE_CHUNK_SIZE)
+            if not chunk:
+                break
+            writer.write(chunk)
+            written += len(chunk)
+    except Exception:
+        # Nobody reads stdout anymore; stop ffmpeg instead of letting it block.
+        process.kill()
+        raise
+    finally:
+        returncode = process.wait()
+        for thread in threads:
+            thread.join()
+
+    if returncode != 0:
+        # The resumable session is left unfinished, so no partial object is created.
+        raise ffmpeg.Error("ffmpeg", None, "\n".join(stderr_tail).encode())
+    writer.close()
+    return TranscodeResult(written, progress_seconds(stderr_tail))
+
+
+def ffmpeg_gcs_to_bytes(source_blob, input_kwargs: Optional[dict] = None, **output_kwargs) -> bytes:
+    """
+    Runs ffmpeg on a GCS object and returns its output in memory.
+
+    Meant for small outputs such as a short audio sample; use ffmpeg_gcs_to_gcs for
+    anything sized like the source.
+
+    Args:
+        source_blob: The google.cloud.storage Blob to read.
+        input_kwargs (Optional[dict]): ffmpeg-python input options (e.g. ss, t).
+        **output_kwargs: ffmpeg-python output options; must include `format`
+            because the output is a pipe.
+
+    Returns:
+        bytes: Everything ffmpeg wrote to stdout.
+
+    Raises:
+        ffmpeg.Error: If ffmpeg exits with a non-zero status.
+    """
+    import ffmpeg
+
+    process, stderr_tail, threads = _start_ffmpeg(
+        source_blob,
+        lambda stream: stream.output("pipe:1", **output_kwargs),
+        input_kwargs or {},
+        pipe_stdout=True,
+        stderr_lines=STDERR_TAIL_LINES,
+    )
+    try:
+        output = process.stdout.read()
+    finally:
+        returncode = process.wait()
+        for thread in threads:
+            thread.join()
+    if returncode != 0:
+        raise ffmpeg.Error("ffmpeg", output, "\n".join(stderr_tail).encode())
+    return output
+
+
+def ffmpeg_gcs_log(source_blob, build_output, input_kwargs: Optional[dict] = None) -> List[str]:
+    """
+    Runs ffmpeg on a GCS object for its log output, e.g. analysis filters such as
+    silencedetect whose results are only reported on stderr.
+
+    Args:
+        source_blob: The google.cloud.storage Blob to read.
+        build_output (callable): Receives the ffmpeg-python input stream and returns
+            the output node, typically ending in `.output("-", format="null")`.
+        input_kwargs (Optional[dict]): ffmpeg-python input options.
+
+    Returns:
+        list: All lines ffmpeg wrote to stderr, including the latest progress
+              report, which ends with the processed time.
+
+    Raises:
+        ffmpeg.Error: If ffmpeg exits with a non-zero status.
+    """
+    import ffmpeg
+
+    process, stderr, threads = _start_ffmpeg(
+        source_blob, build_output, input_kwargs or {}, pipe_stdout=False, stderr_lines=None, stats=True
+    )
+    returncode = process.wait()
+    for thread in threads:
+        thread.join()
+    if returncode != 0:
+        raise ffmpeg.Error("ffmpeg", None, "\n".join(list(stderr)[-STDERR_TAIL_LINES:]).encode())
+    return list(stderr)
@@ -0,0 +1,73 @@
+"""Process-wide registry of genai clients shared by all services."""
+
+import logging
+import os
+import threading
+
+from google import genai
+from google.genai import types
+
+logger = logging.getLogger(__name__)
+
+# Connection pool size of each client. Defaults to the gunicorn thread count used by the services.
+MAX_CONNECTIONS = int(os.environ.get("GENAI_MAX_CONNECTIONS", "8"))
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def _http_client_args() -> dict:
+    """
+    Builds the httpx arguments for pooled, keep-alive connections.
+
+    HTTP/2 is enabled only when the optional `h2` package is installed; otherwise
+    the pool falls back to HTTP/1.1 keep-alive connections.
+    """
+    import httpx
+
+    client_args = {
+        "limits": httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_CONNECTIONS,
+        )
+    }
+    try:
+        import h2  # noqa: F401
+
+        client_args["http2"] = True
+    except ImportError:
+        logger.info("h2 is not installed, genai clients will use HTTP/1.1 keep-alive")
+    return client_args
+
+
+def get_genai_client(project_id: str, location: str = "global") -> genai.Client:
+    """
+    Returns the shared Vertex AI genai client for a project and location.
+
+    The client is built once per (project, location) and reused by every thread of
+    the process, so auth discovery and connection setup are paid only once.
+
+    Args:
+        project_id (str): GCP project ID.
+        location (str): Vertex AI location (e.g. "global", "us-central1").
+
+    Returns:
+        genai.Client: The shared client.
+    """
+    key = (project_id, location)
+    client = _clients.get(key)
+    if client is not None:
+        return client
+
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = genai.Client(
+                vertexai=True,
+                project=project_id,
+                location=location,
+                http_options=types.HttpOptions(client_args=_http_client_args()),
+            )
+            _clients[key] = client
+            logger.info("Initialized shared genai client for %s/%s", project_id, location)
+    return client
@@ -0,0 +1,175 @@
+"""Declarative policy that picks model, thinking budget, output cap and video sampling per Gemini task.
+
+The policy is a JSON document (see generation_policy.json) with `defaults` and an
+ordered list of `rules`. Every rule whose `match` block fits the call is applied in
+order, so later rules override earlier ones. Supported match keys:
+
+- task: list of task names ("classification", "summary", "key_sections",
+  "categorization", "fused", "summary_reduce", "previews")
+- genre: list of content genres
+- min_duration / max_duration: bounds on the media duration in seconds. Rules with
+  duration bounds never match when the duration is unknown.
+
+A `model` of null keeps the model configured for the service. `media_resolution`
+("low", "medium", "high") and `fps` control how densely the video is tokenized;
+null keeps the model defaults (see common/media_sampling.py).
+
+Rules do not match on the model, so a `thinking_budget` is clamped to the range the
+chosen model accepts (e.g. gemini-2.5-pro cannot disable thinking, so 0 becomes its
+minimum of 128, and `max_output_tokens` grows by the added thinking tokens). -1
+(dynamic thinking) is accepted by every model.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POLICY_PATH = os.path.join(os.path.dirname(__file__), "generation_policy.json")
+
+# (model name prefix, minimum, maximum, whether 0 disables thinking), most specific first.
+THINKING_BUDGET_LIMITS = (
+    ("gemini-2.5-flash-lite", 512, 24576, True),
+    ("gemini-2.5-flash", 1, 24576, True),
+    ("gemini-2.5-pro", 128, 32768, False),
+)
+
+
+def clamp_thinking_budget(model: str, budget: Optional[int]) -> Optional[int]:
+    """
+    Returns the thinking budget closest to `budget` that `model` accepts.
+
+    Args:
+        model (str): Model name; a resource path ending in the name also works.
+        budget (Optional[int]): Requested budget; -1 requests dynamic thinking.
+
+    Returns:
+        Optional[int]: The budget to send. Unknown models and -1 are left unchanged.
+    """
+    if budget is None or budget == -1:
+        return budget
+    name = (model or "").rsplit("/", 1)[-1]
+    for prefix, minimum, maximum, can_disable in THINKING_BUDGET_LIMITS:
+        if name.startswith(prefix):
+            if budget == 0 and can_disable:
+                return 0
+            return min(max(budget, minimum), maximum)
+    return budget
+
+
+class GenerationPolicy:
+    """Evaluates a generation policy document for individual Gemini calls."""
+
+    def __init__(self, config: dict):
+        """
+        Args:
+            config (dict): The parsed policy document.
+        """
+        self.config = config
+        self.defaults = config.get("defaults", {})
+        self.rules = config.get("rules", [])
+        # Changes whenever the policy changes; part of result cache keys.
+        self.fingerprint = hashlib.sha256(json.dumps(config, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+    @classmethod
+    def from_file(cls, path: str) -> "GenerationPolicy":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    @staticmethod
+    def _matches(match: dict, task: str, duration_seconds: Optional[float], genre: Optional[str]) -> bool:
+        if "task" in match and task not in match["task"]:
+            return False
+        if "genre" in match and genre not in match["genre"]:
+            return False
+        if "min_duration" in match or "max_duration" in match:
+            if duration_seconds is None:
+                return False
+            if duration_seconds < match.get("min_duration", 0):
+                return False
+            if "max_duration" in match and duration_seconds > match["max_duration"]:
+                return False
+        return True
+
+    def decide(
+        self,
+        task: str,
+        default_model: str,
+        duration_seconds: Optional[float] = None,
+        genre: Optional[str] = None,
+        asset_id: Optional[str] = None,
+    ) -> dict:
+        """
+        Returns the generation settings for a call.
+
+        Args:
+            task (str): The task being run.
+            default_model (str): The service's configured model, used when no rule sets one.
+            duration_seconds (Optional[float]): Media duration, if known.
+            genre (Optional[str]): Content genre, if known.
+            asset_id (Optional[str]): Asset being processed, for logging.
+
+        Returns:
+            dict: The merged settings ("model", "thinking_budget", "max_output_tokens",
+                  "media_resolution", "fps")
+                  and "rules", the names of the rules that were applied.
+        """
+        decision = dict(self.defaults)
+        applied = []
+        for rule in self.rules:
+            if self._matches(rule.get("match", {}), task, duration_seconds, genre):
+                decision.update(rule.get("set", {}))
+                applied.append(rule.get("name", "unnamed"))
+        decision["model"] = decision.get("model") or default_model
+        requested_budget = decision.get("thinking_budget")
+        decision["thinking_budget"] = clamp_thinking_budget(decision["model"], requested_budget)
+        if decision.get("max_output_tokens") and (decision["thinking_budget"] or 0) > max(requested_budget or 0, 0):
+            # Thinking tokens count towards the output cap; keep room for the answer.
+            decision["max_output_tokens"] += decision["thinking_budget"] - max(requested_budget or 0, 0)
+        decision["rules"] = applied
+
+        logger.info(
+            "Generation policy for task '%s': %s",
+            task,
+            decision,
+            extra={
+                "extra_fields": {
+                    "asset_id": asset_id,
+                    "task": task,
+                    "genre": genre,
+                    "duration_seconds": duration_seconds,
+                    "policy_decision": decision,
+                }
+            },
+        )
+        return decision
+
+
+_policy = None
+_policy_lock = threading.Lock()
+
+
+def get_generation_policy() -> GenerationPolicy:
+    """
+    Returns the process-wide policy, loaded once from GENERATION_POLICY_PATH or the
+    bundled generation_policy.json.
+    """
+    global _policy
+    if _policy is None:
+        with _policy_lock:
+            if _policy is None:
+                path = os.environ.get("GENERATION_POLICY_PATH", DEFAULT_POLICY_PATH)
+                _policy = GenerationPolicy.from_file(path)
+                logger.info("Loaded generation policy %s from %s",
+                            _policy.config.get("version"), path)
+    return _policy
+
+
+def asset_duration_seconds(asset_data: Optional[dict]) -> Optional[float]:
+    """Returns the media duration stored on an asset document, if any."""
+    duration = ((asset_data or {}).get("video_details") or {}).get("duration")
+    return float(duration) if duration else None
@@ -0,0 +1,90 @@
+"""Token usage and latency accounting for Gemini responses."""
+
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Lists registered through capture_usage(); every recorded call is appended to each of them.
+_listeners = []
+_listeners_lock = threading.Lock()
+
+
+def usage_from_response(response) -> dict:
+    """
+    Extracts token counts from a generate_content response.
+
+    Args:
+        response: The response returned by client.models.generate_content.
+
+    Returns:
+        dict: Token counts keyed by kind. Empty if the response carries no usage metadata.
+    """
+    usage_metadata = getattr(response, "usage_metadata", None)
+    if not usage_metadata:
+        return {}
+    return {
+        "prompt_tokens": usage_metadata.prompt_token_count or 0,
+        "cached_tokens": usage_metadata.cached_content_token_count or 0,
+        "output_tokens": usage_metadata.candidates_token_count or 0,
+        "thinking_tokens": usage_metadata.thoughts_token_count or 0,
+        "total_tokens": usage_metadata.total_token_count or 0,
+    }
+
+
+def log_usage(
+    stage: str,
+    model_name: str,
+    response,
+    latency_seconds: Optional[float] = None,
+    asset_id: Optional[str] = None,
+) -> dict:
+    """
+    Logs the token usage and latency of a Gemini call and notifies active captures.
+
+    Args:
+        stage (str): Logical name of the call (e.g. "summary", "classification").
+        model_name (str): The model that served the call.
+        response: The generate_content response.
+        latency_seconds (Optional[float]): Wall time of the call.
+        asset_id (Optional[str]): The asset the call was made for, if known.
+
+    Returns:
+        dict: The usage record that was logged.
+    """
+    record = {
+        "stage": stage,
+        "model": model_name,
+        "latency_seconds": round(latency_seconds, 3) if latency_seconds is not None else None,
+        **usage_from_response(response),
+    }
+    logger.info(
+        "Gemini usage for stage '%s': %s",
+        stage,
+        record,
+        extra={"extra_fields": {"asset_id": asset_id, "llm_usage": record}},
+    )
+    with _listeners_lock:
+        for listener in _listeners:
+            listener.append(record)
+    return record
+
+
+@contextmanager
+def capture_usage():
+    """
+    Collects every usage record logged in this process while the context is active.
+
+    Yields:
+        list: The list that receives the usage records.
+    """
+    records = []
+    with _listeners_lock:
+        _listeners.append(records)
+    try:
+        yield records
+    finally:
+        with _listeners_lock:
+            _listeners.remove(records)
@@ -1,5 +1,6 @@
 """ Service for handling document storage """
 import logging
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 
 from google.cloud import firestore
@@ -155,6 +156,39 @@ class MediaAssetManager:
                         asset_id, exc_info=True, extra={"extra_fields": {"asset_id": asset_id}})
             return None
 
+    def find_assets_by_status(
+        self, metadata_type: str, status: str, limit: int = 100, start_after: Optional[str] = None
+    ) -> list:
+        """
+        Finds assets whose nested metadata section has a given status.
+
+        Assets are returned in document ID order, so callers page through all matches
+        by passing the last ID of a page as start_after.
+
+        Args:
+            metadata_type (str): The nested section (e.g., "transcription").
+            status (str): The status to match (e.g., "transcribing").
+            limit (int, optional): Maximum number of assets returned. Defaults to 100.
+            start_after (Optional[str]): Only return assets whose ID sorts after this one.
+
+        Returns:
+            list: (asset_id, asset data) tuples; empty on error.
+        """
+        document_id = firestore.FieldPath.document_id()
+        query = self.media_assets_collection.where(
+            filter=firestore.FieldFilter(f"{metadata_type}.status", "==", status)
+        ).order_by(document_id)
+        if start_after:
+            query = query.start_after({document_id: start_after})
+        query = query.limit(limit)
+        try:
+            return [(doc.id, doc.to_dict()) for doc in query.stream()]
+        except Exception:
+            logger.error("Error querying assets with %s.status == %s",
+                        metadata_type, status, exc_info=True,
+                        extra={"extra_fields": {"metadata_type": metadata_type, "status": status}})
+            return []
+
     def update_asset_metadata(
         self,
         asset_id: str,
@@ -183,7 +217,7 @@ class MediaAssetManager:
         # Check if the update is for a nested dictionary (e.g., "summary", "transcription").
         # These are predefined, structured objects within the Firestore document.
         if metadata_type in ["summary", "transcription", "previews", "video_details",
-                        "image_details", "article_details"]:
+                        "image_details", "article_details", "audio_artifact", "highlights"]:
             # For nested objects, construct the update payload using dot notation.
             # This allows Firestore to update individual fields within the nested object
             # without overwriting the entire object.
@@ -213,6 +247,89 @@ class MediaAssetManager:
                         {"asset_id": asset_id, "metadata_type": metadata_type}})
             return False
 
+    def acquire_lease(
+        self, asset_id: str, lease_name: str, owner: str, ttl_seconds: int = 300
+    ) -> bool:
+        """
+        Atomically acquires a named lease stored on the asset document.
+
+        Leases are used as single-flight locks so that only one service instance
+        performs an expensive step for an asset while the others wait for its result.
+        An expired lease can be taken over by any caller.
+
+        Args:
+            asset_id (str): The unique ID of the media asset.
+            lease_name (str): Name of the lease (e.g., "content_genre").
+            owner (str): Identifier of the caller taking the lease.
+            ttl_seconds (int, optional): Lease lifetime. Defaults to 300.
+
+        Returns:
+            bool: True if the lease was acquired (or is already held by owner), False otherwise.
+        """
+        doc_ref = self._get_doc_ref(asset_id)
+        log_extra = {"extra_fields": {"asset_id": asset_id, "lease": lease_name}}
+
+        @firestore.transactional
+        def _acquire(transaction):
+            snapshot = doc_ref.get(transaction=transaction)
+            if not snapshot.exists:
+                return False
+            lease = (snapshot.to_dict().get("leases") or {}).get(lease_name)
+            now = datetime.now(timezone.utc)
+            if lease and lease.get("owner") != owner and lease.get("expires_at") and lease["expires_at"] > now:
+                return False
+            transaction.update(
+                doc_ref,
+                {
+                    f"leases.{lease_name}": {
+                        "owner": owner,
+                        "expires_at": now + timedelta(seconds=ttl_seconds),
+                    }
+                },
+            )
+            return True
+
+        try:
+            acquired = _acquire(self.db.transaction())
+            logger.debug("Lease '%s' on asset %s acquired: %s",
+                        lease_name, asset_id, acquired, extra=log_extra)
+            return acquired
+        except Exception:
+            logger.error("Error acquiring lease '%s' for asset %s",
+                        lease_name, asset_id, exc_info=True, extra=log_extra)
+            return False
+
+    def release_lease(self, asset_id: str, lease_name: str, owner: str) -> bool:
+        """
+        Releases a lease previously acquired with acquire_lease.
+
+        Args:
+            asset_id (str): The unique ID of the media asset.
+            lease_name (str): Name of the lease.
+            owner (str): Identifier of the caller that holds the lease.
+
+        Returns:
+            bool: True if the lease was released, False otherwise.
+        """
+        doc_ref = self._get_doc_ref(asset_id)
+
+        @firestore.transactional
+        def _release(transaction):
+            snapshot = doc_ref.get(transaction=transaction)
+            lease = (snapshot.to_dict() or {}).get("leases", {}).get(lease_name) if snapshot.exists else None
+            if not lease or lease.get("owner") != owner:
+                return False
+            transaction.update(doc_ref, {f"leases.{lease_name}": firestore.DELETE_FIELD})
+            return True
+
+        try:
+            return _release(self.db.transaction())
+        except Exception:
+            logger.error("Error releasing lease '%s' for asset %s",
+                        lease_name, asset_id, exc_info=True,
+                        extra={"extra_fields": {"asset_id": asset_id, "lease": lease_name}})
+            return False
+
     def delete_asset(self, asset_id: str) -> bool:
         """
         Deletes a media asset document from Firestore.
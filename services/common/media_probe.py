@@ -0,0 +1,175 @@
+"""Technical metadata of a media file, read by ffprobe without downloading it.
+
+ffprobe reads the container headers over a signed GCS URL, seeking with HTTP range
+requests, so probing a multi-GB master transfers a few hundred KB. The dispatcher
+probes every uploaded video and audio file once and stores the result in
+`video_details` (duration, width, height, codecs, fps, bitrate); services read
+the stored values, e.g. with `generation_policy.asset_duration_seconds`, instead
+of probing or downloading the file again.
+"""
+
+import json
+import logging
+import subprocess
+import threading
+from typing import NamedTuple, Optional
+
+from common.gcs_media import feed_stdin, parse_gcs_uri, signed_read_url
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on a probe; a stalled read must not hold up dispatching.
+PROBE_TIMEOUT_SECONDS = 60
+# Bytes ffprobe may read to identify the streams; the container header is enough.
+PROBE_SIZE = 5 * 1024 * 1024
+
+
+class MediaProbe(NamedTuple):
+    """Stream and container properties reported by ffprobe."""
+
+    duration: Optional[float]
+    width: Optional[int] = None
+    height: Optional[int] = None
+    video_codec: Optional[str] = None
+    audio_codec: Optional[str] = None
+    fps: Optional[float] = None
+    bitrate: Optional[int] = None
+    format_name: Optional[str] = None
+
+    def to_details(self) -> dict:
+        """Returns the known fields, as stored in the asset's `video_details`."""
+        return {field: value for field, value in self._asdict().items() if value is not None}
+
+
+def _number(value, cast=float):
+    try:
+        number = cast(float(value))
+    except (TypeError, ValueError):
+        return None
+    return number if number > 0 else None
+
+
+def _frame_rate(value: Optional[str]) -> Optional[float]:
+    """Parses an ffprobe rate such as "30000/1001"."""
+    if not value or "/" not in value:
+        return _number(value)
+    numerator, denominator = value.split("/", 1)
+    numerator, denominator = _number(numerator), _number(denominator)
+    return round(numerator / denominator, 3) if numerator and denominator else None
+
+
+def parse_probe(data: dict) -> MediaProbe:
+    """
+    Builds a MediaProbe from ffprobe's `-show_format -show_streams` JSON output.
+
+    Args:
+        data (dict): The parsed ffprobe output.
+
+    Returns:
+        MediaProbe: Properties of the first video and audio streams; attached
+        pictures such as cover art are not treated as video.
+    """
+    streams = data.get("streams") or []
+    video = next(
+        (
+            s for s in streams
+            if s.get("codec_type") == "video" and not (s.get("disposition") or {}).get("attached_pic")
+        ),
+        {},
+    )
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), {})
+    container = data.get("format") or {}
+
+    duration = _number(container.get("duration")) or _number(video.get("duration")) or _number(audio.get("duration"))
+    return MediaProbe(
+        duration=round(duration, 3) if duration else None,
+        width=_number(video.get("width"), int),
+        height=_number(video.get("height"), int),
+        video_codec=video.get("codec_name"),
+        audio_codec=audio.get("codec_name"),
+        fps=_frame_rate(video.get("avg_frame_rate")) or _frame_rate(video.get("r_frame_rate")),
+        bitrate=_number(container.get("bit_rate"), int),
+        format_name=container.get("format_name"),
+    )
+
+
+def _ffprobe_command(source: str) -> list:
+    command = ["ffprobe", "-v", "error", "-probesize", str(PROBE_SIZE)]
+    if source.startswith(("http://", "https://")):
+        command += ["-reconnect", "1"]
+    return command + ["-print_format", "json", "-show_format", "-show_streams", source]
+
+
+def probe_media(source: str, timeout: float = PROBE_TIMEOUT_SECONDS) -> MediaProbe:
+    """
+    Runs ffprobe on a local path or URL.
+
+    Args:
+        source (str): Path or http(s) URL of the media file.
+        timeout (float): Seconds before the probe is abandoned.
+
+    Returns:
+        MediaProbe: The media properties.
+
+    Raises:
+        RuntimeError: If ffprobe fails or times out.
+    """
+    try:
+        completed = subprocess.run(
+            _ffprobe_command(source), capture_output=True, text=True, timeout=timeout
+        )
+    except subprocess.TimeoutExpired:
+        raise RuntimeError(f"ffprobe timed out after {timeout}s")
+    if completed.returncode != 0:
+        # The source may be a signed URL, so only ffprobe's own message is reported.
+        raise RuntimeError(f"ffprobe failed: {completed.stderr.strip()[-500:]}")
+    return parse_probe(json.loads(completed.stdout or "{}"))
+
+
+def _probe_blob_stream(blob, timeout: float) -> MediaProbe:
+    """Probes an object fed to ffprobe's stdin with ranged GCS reads."""
+    process = subprocess.Popen(
+        _ffprobe_command("pipe:0"), stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    # ffprobe closes stdin once it has read enough; the feeder stops on the broken pipe.
+    feeder = threading.Thread(target=feed_stdin, args=(blob, process.stdin), daemon=True)
+    feeder.start()
+    try:
+        stdout, stderr = process.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.communicate()
+        raise RuntimeError(f"ffprobe timed out after {timeout}s")
+    finally:
+        feeder.join(timeout=5)
+    if process.returncode != 0:
+        raise RuntimeError(f"ffprobe failed: {stderr.decode('utf-8', 'replace').strip()[-500:]}")
+    return parse_probe(json.loads(stdout or b"{}"))
+
+
+def probe_gcs_media(storage_client, gcs_uri: str, timeout: float = PROBE_TIMEOUT_SECONDS) -> MediaProbe:
+    """
+    Probes a GCS object without downloading it.
+
+    ffprobe reads a signed URL with range requests. When no URL can be signed the
+    object is streamed to ffprobe's stdin instead, which stops once the headers are
+    read for most files but reads through MP4s whose index is at the end.
+
+    Args:
+        storage_client: A google.cloud.storage Client.
+        gcs_uri (str): URI of the media file, e.g. gs://bucket/video.mp4.
+        timeout (float): Seconds before the probe is abandoned.
+
+    Returns:
+        MediaProbe: The media properties.
+
+    Raises:
+        RuntimeError: If ffprobe fails or times out.
+    """
+    bucket_name, blob_name = parse_gcs_uri(gcs_uri)
+    blob = storage_client.bucket(bucket_name).blob(blob_name)
+    url = signed_read_url(blob, expiration_seconds=max(int(timeout) * 2, 300))
+    if url:
+        return probe_media(url, timeout)
+    logger.info("Probing %s through stdin, no signed URL available", gcs_uri)
+    return _probe_blob_stream(blob, timeout)
@@ -0,0 +1,67 @@
+"""Builds Gemini video parts and settings for the sampling chosen by the generation policy."""
+
+from typing import Optional, Tuple
+
+from google.genai import types
+
+# Policy values for `media_resolution`; null keeps the model default.
+MEDIA_RESOLUTIONS = {
+    "low": types.MediaResolution.MEDIA_RESOLUTION_LOW,
+    "medium": types.MediaResolution.MEDIA_RESOLUTION_MEDIUM,
+    "high": types.MediaResolution.MEDIA_RESOLUTION_HIGH,
+}
+
+
+def media_resolution(policy: dict) -> Optional[types.MediaResolution]:
+    """
+    Returns the media resolution for GenerateContentConfig, or None for the model default.
+
+    Args:
+        policy (dict): A decision returned by GenerationPolicy.decide.
+    """
+    value = policy.get("media_resolution")
+    if not value:
+        return None
+    if value not in MEDIA_RESOLUTIONS:
+        raise ValueError(f"Unknown media_resolution '{value}' in generation policy")
+    return MEDIA_RESOLUTIONS[value]
+
+
+def is_sampled(policy: dict) -> bool:
+    """
+    Tells whether a decision reduces the video's fidelity.
+
+    The shared context cache holds the video tokenized at full fidelity, so sampled
+    calls send the video inline instead of referencing the cache.
+    """
+    return bool(policy.get("media_resolution") or policy.get("fps"))
+
+
+def video_part(
+    video_uri: str,
+    mime_type: str,
+    fps: Optional[float] = None,
+    window: Optional[Tuple[float, float]] = None,
+) -> types.Part:
+    """
+    Builds the video part of a request.
+
+    Args:
+        video_uri (str): GCS URI or YouTube URL of the video.
+        mime_type (str): MIME type of the video part.
+        fps (Optional[float]): Frames sampled per second; None keeps the model default of 1.
+        window (Optional[tuple]): (start, end) offsets in seconds to clip the video to.
+
+    Returns:
+        types.Part: The video part.
+    """
+    if not fps and not window:
+        return types.Part.from_uri(file_uri=video_uri, mime_type=mime_type)
+    return types.Part(
+        file_data=types.FileData(file_uri=video_uri, mime_type=mime_type),
+        video_metadata=types.VideoMetadata(
+            fps=fps or None,
+            start_offset=f"{window[0]}s" if window else None,
+            end_offset=f"{window[1]}s" if window else None,
+        ),
+    )
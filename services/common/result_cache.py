@@ -0,0 +1,240 @@
+"""Content-hash keyed cache of generated results, shared by all generator services.
+
+Entries live in the `result_cache` Firestore collection. The key combines the
+source object's content hash, the task, a fingerprint of the prompts used and the
+model, so re-ingesting the same master under a new asset_id reuses earlier
+results, while any prompt or model change produces a new key.
+
+Stale entries can be purged with:
+    python -m common.result_cache invalidate --task summary [--model gemini-2.5-flash]
+"""
+
+import argparse
+import hashlib
+import logging
+import threading
+from collections import Counter
+from typing import Callable, Optional
+
+from google.cloud import firestore
+
+logger = logging.getLogger(__name__)
+
+RESULT_CACHE_COLLECTION = "result_cache"
+
+
+def prompt_fingerprint(*parts: str) -> str:
+    """
+    Builds a short, stable fingerprint of the prompt material used for a task.
+
+    Args:
+        *parts (str): Prompt version labels, prompt texts, serialized schemas, etc.
+
+    Returns:
+        str: A 16 character hex digest that changes whenever any part changes.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()[:16]
+
+
+class ResultCache:
+    """
+    Firestore-backed cache of structured model outputs keyed by media content hash.
+    """
+
+    def __init__(self, db: firestore.Client, storage_client=None):
+        """
+        Args:
+            db (firestore.Client): Firestore client holding the cache collection.
+            storage_client: Optional google.cloud.storage client used to read object hashes.
+        """
+        self.db = db
+        self.collection = db.collection(RESULT_CACHE_COLLECTION)
+        self._storage_client = storage_client
+        # In-process hit/miss counters per task, complementing the log-based metrics.
+        self.stats = Counter()
+        self._stats_lock = threading.Lock()
+
+    @property
+    def storage_client(self):
+        if self._storage_client is None:
+            from google.cloud import storage
+
+            self._storage_client = storage.Client(project=self.db.project)
+        return self._storage_client
+
+    def content_hash(self, file_location: str) -> Optional[str]:
+        """
+        Returns the content hash of a GCS object, or None if it cannot be determined.
+
+        The MD5 hash is used when available. Composite objects only carry a CRC32C,
+        which is combined with the object size to make collisions unlikely.
+
+        Args:
+            file_location (str): GCS URI of the media file.
+        """
+        if not file_location or not file_location.startswith("gs://"):
+            return None
+        try:
+            bucket_name, blob_name = file_location.replace("gs://", "").split("/", 1)
+            blob = self.storage_client.bucket(bucket_name).get_blob(blob_name)
+        except Exception:
+            logger.warning("Could not read object metadata for %s", file_location, exc_info=True)
+            return None
+        if blob is None:
+            return None
+        if blob.md5_hash:
+            return f"md5:{blob.md5_hash}"
+        if blob.crc32c:
+            return f"crc32c:{blob.crc32c}:{blob.size}"
+        return None
+
+    @staticmethod
+    def make_key(content_hash: str, task: str, prompt_version: str, model: str) -> str:
+        """Builds the document ID for a cache entry."""
+        raw = "|".join([content_hash, task, prompt_version, model])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _record(self, task: str, outcome: str, asset_id: Optional[str]):
+        with self._stats_lock:
+            self.stats[(task, outcome)] += 1
+        logger.info(
+            "Result cache %s for task '%s'",
+            outcome,
+            task,
+            extra={
+                "extra_fields": {
+                    "metric": "result_cache",
+                    "task": task,
+                    "outcome": outcome,
+                    "asset_id": asset_id,
+                }
+            },
+        )
+
+    def get(self, key: str) -> Optional[dict]:
+        """Returns the cached payload for a key, or None on a miss or read error."""
+        try:
+            doc = self.collection.document(key).get()
+        except Exception:
+            logger.warning("Result cache read failed for key %s", key, exc_info=True)
+            return None
+        if not doc.exists:
+            return None
+        return (doc.to_dict() or {}).get("payload")
+
+    def put(self, key: str, payload: dict, task: str, prompt_version: str, model: str, content_hash: str):
+        """Stores a payload. Failures are logged and otherwise ignored."""
+        try:
+            self.collection.document(key).set(
+                {
+                    "payload": payload,
+                    "task": task,
+                    "prompt_version": prompt_version,
+                    "model": model,
+                    "content_hash": content_hash,
+                    "created_at": firestore.SERVER_TIMESTAMP,
+                }
+            )
+        except Exception:
+            logger.warning("Result cache write failed for task '%s'", task, exc_info=True)
+
+    def get_or_compute(
+        self,
+        content_hash: Optional[str],
+        task: str,
+        prompt_version: str,
+        model: str,
+        compute: Callable[[], dict],
+        asset_id: Optional[str] = None,
+        cacheable: Optional[Callable[[dict], bool]] = None,
+    ) -> dict:
+        """
+        Returns the cached result for the inputs, or computes and stores it.
+
+        A cached result is served to every later ingest of the same media, so
+        degraded results must not be stored. Results that are not dicts (e.g.
+        None) or contain an "error" key are returned but never cached; callers
+        reject other degraded results with `cacheable`.
+
+        Args:
+            content_hash (Optional[str]): Content hash of the source media. None disables caching.
+            task (str): Task name (e.g., "summary", "previews").
+            prompt_version (str): Fingerprint of the prompts used by the task.
+            model (str): Model name.
+            compute (Callable[[], dict]): Produces the result on a miss.
+            asset_id (Optional[str]): Asset being processed, for logging.
+            cacheable (Optional[Callable[[dict], bool]]): Returns False for a
+                computed result that should be returned without being cached.
+
+        Returns:
+            dict: The cached or freshly computed result.
+        """
+        if not content_hash:
+            return compute()
+
+        key = self.make_key(content_hash, task, prompt_version, model)
+        cached = self.get(key)
+        if cached is not None:
+            self._record(task, "hit", asset_id)
+            return cached
+
+        self._record(task, "miss", asset_id)
+        result = compute()
+        if not isinstance(result, dict) or "error" in result:
+            return result
+        if cacheable and not cacheable(result):
+            logger.info("Not caching degraded result for task '%s'", task,
+                        extra={"extra_fields": {"asset_id": asset_id, "task": task}})
+            return result
+        self.put(key, result, task, prompt_version, model, content_hash)
+        return result
+
+    def invalidate(self, task: Optional[str] = None, model: Optional[str] = None) -> int:
+        """
+        Deletes cache entries, e.g. after prompts in prompts.py were rewritten.
+
+        Args:
+            task (Optional[str]): Only delete entries for this task.
+            model (Optional[str]): Only delete entries for this model.
+
+        Returns:
+            int: Number of deleted entries.
+        """
+        query = self.collection
+        if task:
+            query = query.where(filter=firestore.FieldFilter("task", "==", task))
+        if model:
+            query = query.where(filter=firestore.FieldFilter("model", "==", model))
+
+        deleted = 0
+        batch = self.db.batch()
+        for doc in query.stream():
+            batch.delete(doc.reference)
+            deleted += 1
+            if deleted % 400 == 0:
+                batch.commit()
+                batch = self.db.batch()
+        batch.commit()
+        logger.info("Invalidated %d result cache entries (task=%s, model=%s)", deleted, task, model)
+        return deleted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the generator result cache.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    invalidate_parser = subparsers.add_parser("invalidate", help="Delete cache entries.")
+    invalidate_parser.add_argument("--project", default=None)
+    invalidate_parser.add_argument("--task", default=None)
+    invalidate_parser.add_argument("--model", default=None)
+    args = parser.parse_args()
+
+    cache = ResultCache(firestore.Client(project=args.project))
+    print(f"Deleted {cache.invalidate(task=args.task, model=args.model)} entries")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Incremental parser for a streamed top-level JSON object."""
+
+import json
+from typing import List, Tuple
+
+# Event kinds emitted by IncrementalObjectParser.feed
+FIELD = "field"  # A top-level member is complete: (FIELD, key, value)
+ITEM = "item"  # An element of a top-level array member is complete: (ITEM, key, value)
+
+
+class IncrementalObjectParser:
+    """
+    Parses a JSON object that arrives in arbitrary text chunks, such as a streamed
+    structured-output response, and reports members as soon as they are complete.
+
+    Completed top-level members are reported as FIELD events. Elements of top-level
+    arrays are additionally reported one by one as ITEM events, so long lists (e.g.
+    key sections) can be surfaced before the whole array is closed. The scan is a
+    single pass over the text; each character is examined once.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.pos = 0
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        # One of "key", "colon", "value" while inside the top-level object.
+        self.expecting = None
+        self.key_start = None
+        self.key = None
+        self.value_start = None
+        # Set while scanning the elements of a top-level array member.
+        self.array_key = None
+        self.item_start = None
+
+    def _emit_value(self, end: int, events: list):
+        raw = self.text[self.value_start:end].strip()
+        if raw:
+            events.append((FIELD, self.key, json.loads(raw)))
+        self.expecting = "key"
+
+    def _emit_item(self, end: int, events: list):
+        raw = self.text[self.item_start:end].strip()
+        if raw:
+            events.append((ITEM, self.array_key, json.loads(raw)))
+        self.item_start = end + 1
+
+    def feed(self, chunk: str) -> List[Tuple[str, str, object]]:
+        """
+        Consumes the next chunk of text.
+
+        Args:
+            chunk (str): The next piece of the JSON document.
+
+        Returns:
+            list: Events completed by this chunk, in document order.
+        """
+        events = []
+        self.text += chunk
+        text = self.text
+        for i in range(self.pos, len(text)):
+            c = text[i]
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif c == "\\":
+                    self.escape = True
+                elif c == '"':
+                    self.in_string = False
+                    if self.depth == 1 and self.expecting == "key":
+                        self.key = json.loads(text[self.key_start:i + 1])
+                        self.expecting = "colon"
+                continue
+
+            if c == '"':
+                self.in_string = True
+                if self.depth == 1 and self.expecting == "key":
+                    self.key_start = i
+            elif c in "{[":
+                if self.depth == 0:
+                    if c == "{":
+                        self.expecting = "key"
+                elif self.depth == 1 and c == "[":
+                    self.array_key = self.key
+                    self.item_start = i + 1
+                self.depth += 1
+            elif c in "}]":
+                if self.depth == 2 and c == "]" and self.array_key is not None:
+                    self._emit_item(i, events)
+                    self.array_key = None
+                elif self.depth == 1 and self.expecting == "value":
+                    self._emit_value(i, events)
+                self.depth -= 1
+            elif c == ",":
+                if self.depth == 1 and self.expecting == "value":
+                    self._emit_value(i, events)
+                elif self.depth == 2 and self.array_key is not None:
+                    self._emit_item(i, events)
+            elif c == ":" and self.depth == 1 and self.expecting == "colon":
+                self.expecting = "value"
+                self.value_start = i + 1
+        self.pos = len(text)
+        return events
@@ -0,0 +1,291 @@
+"""Columnar storage of word-level transcription timings.
+
+Storing every word as a map in the asset document makes long transcripts approach
+Firestore's 1 MiB document limit and turns every asset read into a multi-hundred KB
+transfer. Instead the words are kept in a gzip-compressed JSON sidecar in GCS as
+parallel arrays (words, start and end offsets in milliseconds), and the document
+only carries a pointer and a small summary built by `transcript_summary`.
+Speaker diarization, when enabled, is kept in the document as `SpeakerTurns`.
+
+Readers load the sidecar once and answer time-range lookups with a binary search:
+
+    words = load_transcript_words(storage_client, asset["transcription"]["words_uri"])
+    words.between(60.0, 90.0)
+"""
+
+import bisect
+import gzip
+import json
+import logging
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+WORDS_FORMAT = "columnar-v1"
+WORDS_CONTENT_TYPE = "application/json"
+
+
+def offset_to_ms(offset) -> int:
+    """
+    Converts a word offset to milliseconds.
+
+    Accepts the forms found in stored transcripts: Speech-to-Text duration strings
+    ("12.340s"), numbers of seconds and {"seconds", "nanos"} maps.
+    """
+    if isinstance(offset, str):
+        return int(round(float(offset.rstrip("s") or 0) * 1000))
+    if offset is None:
+        return 0
+    if isinstance(offset, dict):
+        return int(offset.get("seconds", 0)) * 1000 + int(offset.get("nanos", 0)) // 1_000_000
+    return int(round(float(offset) * 1000))
+
+
+class TranscriptWords:
+    """Word timings stored as parallel arrays, sorted by start time."""
+
+    def __init__(self, words: List[str], start_ms: List[int], end_ms: List[int]):
+        if not len(words) == len(start_ms) == len(end_ms):
+            raise ValueError("Word and offset arrays must have the same length.")
+        self.words = words
+        self.start_ms = start_ms
+        self.end_ms = end_ms
+
+    @classmethod
+    def from_word_dicts(cls, words: list) -> "TranscriptWords":
+        """
+        Builds the columnar form from `{word, start_time, end_time}` dicts.
+
+        Args:
+            words (list): Word dicts as produced by the transcription service.
+
+        Returns:
+            TranscriptWords: The words ordered by start time.
+        """
+        rows = sorted(
+            ((offset_to_ms(w.get("start_time")), offset_to_ms(w.get("end_time")), w.get("word") or "") for w in words),
+            key=lambda row: row[0],
+        )
+        return cls([r[2] for r in rows], [r[0] for r in rows], [r[1] for r in rows])
+
+    @classmethod
+    def concatenate(cls, parts: List[Tuple["TranscriptWords", int]]) -> "TranscriptWords":
+        """
+        Joins consecutive transcripts onto one timeline.
+
+        Args:
+            parts (list): (TranscriptWords, offset in milliseconds) in time order.
+
+        Returns:
+            TranscriptWords: All words with their offsets shifted.
+        """
+        words, start_ms, end_ms = [], [], []
+        for part, shift in parts:
+            words.extend(part.words)
+            start_ms.extend(ms + shift for ms in part.start_ms)
+            end_ms.extend(ms + shift for ms in part.end_ms)
+        return cls(words, start_ms, end_ms)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "TranscriptWords":
+        """Decodes a sidecar written by `to_bytes`."""
+        payload = json.loads(gzip.decompress(data))
+        if payload.get("format") != WORDS_FORMAT:
+            raise ValueError(f"Unsupported transcript words format: {payload.get('format')}")
+        return cls(payload["words"], payload["start_ms"], payload["end_ms"])
+
+    def to_bytes(self) -> bytes:
+        """Encodes the words as a gzip-compressed JSON document."""
+        payload = {
+            "format": WORDS_FORMAT,
+            "words": self.words,
+            "start_ms": self.start_ms,
+            "end_ms": self.end_ms,
+        }
+        return gzip.compress(json.dumps(payload, separators=(",", ":")).encode())
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    @property
+    def duration_seconds(self) -> float:
+        """End of the last word, in seconds."""
+        return max(self.end_ms, default=0) / 1000
+
+    def _range(self, start_seconds: float, end_seconds: float) -> range:
+        start = int(start_seconds * 1000)
+        end = int(end_seconds * 1000)
+        lo = bisect.bisect_left(self.start_ms, start)
+        # Include words that started before the range but are still being spoken.
+        while lo > 0 and self.end_ms[lo - 1] > start:
+            lo -= 1
+        hi = bisect.bisect_left(self.start_ms, end, lo)
+        return range(lo, hi)
+
+    def between(self, start_seconds: float, end_seconds: float) -> List[dict]:
+        """
+        Returns the words overlapping a time range.
+
+        Args:
+            start_seconds (float): Start of the range.
+            end_seconds (float): End of the range (exclusive).
+
+        Returns:
+            list: `{word, start_ms, end_ms}` dicts in time order.
+        """
+        return [
+            {"word": self.words[i], "start_ms": self.start_ms[i], "end_ms": self.end_ms[i]}
+            for i in self._range(start_seconds, end_seconds)
+        ]
+
+    def text_between(self, start_seconds: float, end_seconds: float) -> str:
+        """Returns the words overlapping a time range joined as text."""
+        return " ".join(self.words[i] for i in self._range(start_seconds, end_seconds))
+
+    def word_at(self, seconds: float) -> Optional[dict]:
+        """Returns the word being spoken at a point in time, or None during silence."""
+        position = int(seconds * 1000)
+        i = bisect.bisect_right(self.start_ms, position) - 1
+        if i >= 0 and self.end_ms[i] > position:
+            return {"word": self.words[i], "start_ms": self.start_ms[i], "end_ms": self.end_ms[i]}
+        return None
+
+
+class SpeakerTurns:
+    """
+    Speaker diarization stored as run-length turns (speaker, start, end).
+
+    Consecutive words of the same speaker collapse into one turn, so a talk show
+    with tens of thousands of words holds a few hundred entries, small enough to
+    keep in the asset document next to the transcript summary.
+    """
+
+    def __init__(self, speakers: Optional[List[str]] = None, start_ms: Optional[List[int]] = None,
+                 end_ms: Optional[List[int]] = None):
+        speakers, start_ms, end_ms = speakers or [], start_ms or [], end_ms or []
+        if not len(speakers) == len(start_ms) == len(end_ms):
+            raise ValueError("Speaker and offset arrays must have the same length.")
+        self.speakers = speakers
+        self.start_ms = start_ms
+        self.end_ms = end_ms
+
+    def add(self, speaker: str, start_ms: int, end_ms: int):
+        """Appends a word's speaker, extending the last turn if the speaker is the same."""
+        if self.speakers and self.speakers[-1] == speaker:
+            if end_ms > self.end_ms[-1]:
+                self.end_ms[-1] = end_ms
+            return
+        self.speakers.append(speaker)
+        self.start_ms.append(start_ms)
+        self.end_ms.append(end_ms)
+
+    @classmethod
+    def from_dict(cls, data: Optional[dict]) -> "SpeakerTurns":
+        """Decodes the `transcription.speaker_turns` field written by `to_dict`."""
+        if not data:
+            return cls()
+        return cls(list(data["speakers"]), list(data["start_ms"]), list(data["end_ms"]))
+
+    def to_dict(self) -> dict:
+        """Encodes the turns as parallel arrays for the asset document."""
+        return {"speakers": self.speakers, "start_ms": self.start_ms, "end_ms": self.end_ms}
+
+    def __len__(self) -> int:
+        return len(self.speakers)
+
+    @property
+    def speaker_count(self) -> int:
+        """Number of distinct speakers."""
+        return len(set(self.speakers))
+
+    def speaking_seconds(self) -> dict:
+        """Returns the total speaking time of each speaker, in seconds."""
+        totals = {}
+        for speaker, start, end in zip(self.speakers, self.start_ms, self.end_ms):
+            totals[speaker] = totals.get(speaker, 0) + (end - start)
+        return {speaker: ms / 1000 for speaker, ms in totals.items()}
+
+    def between(self, start_seconds: float, end_seconds: float) -> List[dict]:
+        """
+        Returns the turns overlapping a time range.
+
+        Args:
+            start_seconds (float): Start of the range.
+            end_seconds (float): End of the range (exclusive).
+
+        Returns:
+            list: `{speaker, start_ms, end_ms}` dicts in time order.
+        """
+        start = int(start_seconds * 1000)
+        end = int(end_seconds * 1000)
+        # Turns do not overlap, so their end offsets are sorted as well.
+        lo = bisect.bisect_right(self.end_ms, start)
+        hi = bisect.bisect_left(self.start_ms, end, lo)
+        return [
+            {"speaker": self.speakers[i], "start_ms": self.start_ms[i], "end_ms": self.end_ms[i]}
+            for i in range(lo, hi)
+        ]
+
+    def speaker_at(self, seconds: float) -> Optional[str]:
+        """Returns the speaker of the turn covering a point in time, or None."""
+        position = int(seconds * 1000)
+        i = bisect.bisect_right(self.start_ms, position) - 1
+        if i >= 0 and self.end_ms[i] > position:
+            return self.speakers[i]
+        return None
+
+
+def _split_gcs_uri(gcs_uri: str):
+    return gcs_uri.replace("gs://", "").split("/", 1)
+
+
+def write_transcript_words(storage_client, gcs_uri: str, words: TranscriptWords):
+    """
+    Uploads the words sidecar.
+
+    Args:
+        storage_client: A google.cloud.storage Client.
+        gcs_uri (str): Destination URI.
+        words (TranscriptWords): The words to store.
+    """
+    bucket_name, blob_name = _split_gcs_uri(gcs_uri)
+    blob = storage_client.bucket(bucket_name).blob(blob_name)
+    # Stored with gzip content encoding, so plain HTTP clients get the JSON transparently.
+    blob.content_encoding = "gzip"
+    blob.upload_from_string(words.to_bytes(), content_type=WORDS_CONTENT_TYPE)
+
+
+def load_transcript_words(storage_client, gcs_uri: str) -> TranscriptWords:
+    """
+    Downloads and decodes a words sidecar.
+
+    Args:
+        storage_client: A google.cloud.storage Client.
+        gcs_uri (str): URI stored in `transcription.words_uri`.
+
+    Returns:
+        TranscriptWords: The decoded words.
+    """
+    bucket_name, blob_name = _split_gcs_uri(gcs_uri)
+    blob = storage_client.bucket(bucket_name).blob(blob_name)
+    # raw_download keeps the stored gzip bytes instead of decompressing them in transit.
+    return TranscriptWords.from_bytes(blob.download_as_bytes(raw_download=True))
+
+
+def transcript_summary(words: TranscriptWords, words_uri: str) -> dict:
+    """
+    Returns the fields kept in the asset document in place of the word list.
+
+    Args:
+        words (TranscriptWords): The stored words.
+        words_uri (str): Location of the sidecar.
+
+    Returns:
+        dict: Pointer, format, word count and spoken duration.
+    """
+    return {
+        "words_uri": words_uri,
+        "words_format": WORDS_FORMAT,
+        "word_count": len(words),
+        "duration_seconds": words.duration_seconds,
+    }
@@ -0,0 +1,360 @@
+"""Cuts highlight segments out of a video with ffmpeg and joins them without re-encoding.
+
+Two cut modes:
+
+- "copy" stream-copies each segment from the keyframe at or before its start, so
+  nothing is decoded or encoded; a segment may start up to one GOP early.
+- "smart" starts exactly on time: only the part before the first keyframe inside
+  the segment is re-encoded, the rest is stream-copied. The encoded head has to
+  match the copied body, so this needs H.264 video with AAC (or no) audio; other
+  sources are cut in "copy" mode.
+
+Pieces are written as MPEG-TS, which carries the H.264/HEVC parameter sets in-band,
+so encoded and copied pieces can follow each other, and joined into an MP4 by the
+concat demuxer. Sources whose codecs cannot be copied into MPEG-TS (e.g. VP9 WebM)
+are encoded to H.264/AAC once per segment instead.
+
+The source can be a local file or a signed GCS URL. Over HTTP, ffmpeg and ffprobe
+seek with range requests: they read the container index and then only the bytes
+around each segment, so a short reel of a long master transfers a small fraction
+of the file.
+
+Pieces are cut concurrently. Each cut is its own ffmpeg process, so a thread pool is
+enough to keep several cores busy; the cores are divided between the concurrent
+cuts as encoder threads so they do not oversubscribe the instance.
+"""
+
+import bisect
+import logging
+import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+import ffmpeg
+
+logger = logging.getLogger(__name__)
+
+CUT_MODES = ("copy", "smart")
+# Codecs MPEG-TS can carry by stream copy.
+COPY_VIDEO_CODECS = ("h264", "hevc")
+COPY_AUDIO_CODECS = ("aac", "mp3", "ac3")
+# A start this close to a keyframe counts as keyframe-aligned.
+KEYFRAME_TOLERANCE_SECONDS = 0.05
+# Keyframes are only probed from this far before each segment start.
+KEYFRAME_SEARCH_SECONDS = 30.0
+# A copying input seek lands on the last keyframe at or before the position; the
+# offset keeps a rounded keyframe time from selecting the keyframe before it.
+SEEK_EPSILON_SECONDS = 0.001
+# Input options for sources read over HTTP; a dropped connection is resumed with a
+# range request instead of failing the cut.
+HTTP_INPUT_OPTIONS = {"reconnect": 1}
+# x264 settings of re-encoded pieces.
+ENCODE_PRESET = "veryfast"
+ENCODE_CRF = 18
+
+
+def available_cpus() -> int:
+    """Returns the number of CPUs this process may run on."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _input_options(source: str) -> dict:
+    return dict(HTTP_INPUT_OPTIONS) if source.startswith(("http://", "https://")) else {}
+
+
+class SourceInfo(NamedTuple):
+    """Stream details of the source that decide how it can be cut."""
+
+    video_index: int
+    video_codec: Optional[str]
+    pix_fmt: Optional[str]
+    audio_index: Optional[int]
+    audio_codec: Optional[str]
+    sample_rate: Optional[int]
+    channels: Optional[int]
+    # Timestamp of the first frame; ffmpeg seeks are relative to it.
+    start_time: float
+    duration: Optional[float] = None
+
+
+class Piece(NamedTuple):
+    """A time range of the source, cut by stream copy or by re-encoding."""
+
+    start: float
+    end: float
+    copy: bool
+
+
+def probe_source(path: str) -> SourceInfo:
+    """
+    Reads the codecs of the first video and audio streams.
+
+    Args:
+        path (str): Local path or signed URL of the source video.
+
+    Returns:
+        SourceInfo: The stream details.
+
+    Raises:
+        ValueError: If the file has no video stream.
+    """
+    probe = ffmpeg.probe(path, **_input_options(path))
+    streams = probe.get("streams", [])
+    video = next(
+        (
+            s for s in streams
+            if s.get("codec_type") == "video" and not s.get("disposition", {}).get("attached_pic")
+        ),
+        None,
+    )
+    if video is None:
+        # The path may be a signed URL, which is not repeated in errors.
+        raise ValueError("The source has no video stream.")
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), None) or {}
+    return SourceInfo(
+        video_index=video["index"],
+        video_codec=video.get("codec_name"),
+        pix_fmt=video.get("pix_fmt"),
+        audio_index=audio.get("index"),
+        audio_codec=audio.get("codec_name"),
+        sample_rate=int(audio["sample_rate"]) if audio.get("sample_rate") else None,
+        channels=audio.get("channels"),
+        start_time=float(probe.get("format", {}).get("start_time") or 0.0),
+        duration=float(probe["format"]["duration"]) if probe.get("format", {}).get("duration") else None,
+    )
+
+
+def keyframe_times(path: str, info: SourceInfo, segments: Sequence[Tuple[float, float]]) -> List[float]:
+    """
+    Lists the video keyframes around the segments.
+
+    Only packet headers are read, and only in the intervals covering each segment
+    and the search window before it, so long sources are not scanned end to end.
+
+    Args:
+        path (str): Local path or signed URL of the source video.
+        info (SourceInfo): Result of probe_source.
+        segments (Sequence): (start, end) seconds of the segments.
+
+    Returns:
+        list: Sorted keyframe times in seconds from the start of the video.
+    """
+    intervals = ",".join(
+        f"{max(0.0, start - KEYFRAME_SEARCH_SECONDS) + info.start_time:.3f}%{end + info.start_time:.3f}"
+        for start, end in segments
+    )
+    options = [arg for key, value in _input_options(path).items() for arg in (f"-{key}", str(value))]
+    output = subprocess.run(
+        [
+            "ffprobe", "-v", "error", *options,
+            "-select_streams", str(info.video_index),
+            "-read_intervals", intervals,
+            "-show_entries", "packet=pts_time,flags",
+            "-of", "csv=p=0",
+            path,
+        ],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    times = set()
+    for line in output.splitlines():
+        pts_time, _, flags = line.partition(",")
+        if "K" in flags and pts_time not in ("", "N/A"):
+            times.add(round(float(pts_time) - info.start_time, 6))
+    return sorted(times)
+
+
+def plan_cut(start: float, end: float, keyframes: List[float], mode: str) -> List[Piece]:
+    """
+    Splits a segment into the pieces to copy and to re-encode.
+
+    Args:
+        start (float): Segment start in seconds.
+        end (float): Segment end in seconds.
+        keyframes (list): Sorted keyframe times around the segment.
+        mode (str): "copy" or "smart".
+
+    Returns:
+        list: The pieces in time order.
+    """
+    i = bisect.bisect_right(keyframes, start + KEYFRAME_TOLERANCE_SECONDS)
+    previous = keyframes[i - 1] if i else None
+    if mode == "copy":
+        # Without a known keyframe the seek still starts at the preceding one.
+        return [Piece(previous if previous is not None else start, end, True)]
+    if previous is not None and start - previous <= KEYFRAME_TOLERANCE_SECONDS:
+        return [Piece(previous, end, True)]
+    following = keyframes[i] if i < len(keyframes) else None
+    if following is None or following >= end - KEYFRAME_TOLERANCE_SECONDS:
+        # The segment ends before the next keyframe.
+        return [Piece(start, end, False)]
+    return [Piece(start, following, False), Piece(following, end, True)]
+
+
+def cut_piece(source_path: str, info: SourceInfo, piece: Piece, output_path: str, threads: Optional[int] = None):
+    """
+    Writes one piece of the source as MPEG-TS.
+
+    Args:
+        source_path (str): Local path or signed URL of the source video.
+        info (SourceInfo): Result of probe_source.
+        piece (Piece): The range to cut and how.
+        output_path (str): Destination .ts file.
+        threads (Optional[int]): Decoder and encoder threads of a re-encoded piece;
+            ffmpeg's default (all cores) when None.
+
+    Raises:
+        ffmpeg.Error: If ffmpeg exits with a non-zero status.
+    """
+    seek = piece.start + SEEK_EPSILON_SECONDS if piece.copy else piece.start
+    input_kwargs = _input_options(source_path)
+    if threads and not piece.copy:
+        input_kwargs["threads"] = threads
+    source = ffmpeg.input(source_path, ss=f"{seek:.3f}", t=f"{piece.end - seek:.3f}", **input_kwargs)
+    streams = [source[str(info.video_index)]]
+    if info.audio_index is not None:
+        streams.append(source[str(info.audio_index)])
+
+    if piece.copy:
+        output_kwargs = {"c": "copy"}
+    else:
+        # An H.264 source keeps its pixel format so the piece matches the copied ones.
+        output_kwargs = {
+            "vcodec": "libx264",
+            "preset": ENCODE_PRESET,
+            "crf": ENCODE_CRF,
+            "pix_fmt": info.pix_fmt if info.video_codec == "h264" and info.pix_fmt else "yuv420p",
+        }
+        if threads:
+            output_kwargs["threads"] = threads
+        if info.audio_index is not None:
+            output_kwargs["acodec"] = "aac"
+            if info.sample_rate:
+                output_kwargs["ar"] = info.sample_rate
+            if info.channels:
+                output_kwargs["ac"] = info.channels
+
+    ffmpeg.output(
+        *streams, output_path, format="mpegts", avoid_negative_ts="make_zero", **output_kwargs
+    ).global_args("-nostats").run(capture_stdout=True, capture_stderr=True, overwrite_output=True)
+
+
+def _cut_with_retries(source_path: str, info: SourceInfo, piece: Piece, output_path: str,
+                      threads: int, retries: int) -> str:
+    for attempt in range(retries + 1):
+        try:
+            cut_piece(source_path, info, piece, output_path, threads)
+            return output_path
+        except ffmpeg.Error as e:
+            if attempt == retries:
+                raise
+            stderr = e.stderr.decode(errors="replace")[-500:] if e.stderr else ""
+            logger.warning(
+                "Cutting %s failed (attempt %d of %d), retrying: %s",
+                os.path.basename(output_path), attempt + 1, retries + 1, stderr,
+            )
+
+
+def cut_segments(
+    source_path: str,
+    segments: Sequence[Tuple[float, float]],
+    work_dir: str,
+    mode: str = "copy",
+    workers: Optional[int] = None,
+    retries: int = 1,
+) -> List[str]:
+    """
+    Cuts segments out of a video into MPEG-TS pieces ready for concat_pieces.
+
+    Args:
+        source_path (str): Local path or signed URL of the source video.
+        segments (Sequence): (start, end) seconds of the segments, in reel order.
+        work_dir (str): Directory receiving the pieces.
+        mode (str): "copy" or "smart".
+        workers (Optional[int]): Pieces cut concurrently; one per available CPU when None.
+        retries (int): Extra attempts for a piece whose cut fails.
+
+    Returns:
+        list: Paths of the pieces in reel order, whatever order the cuts finish in.
+
+    Raises:
+        ValueError: If the mode is unknown or the source has no video.
+        ffmpeg.Error: If a piece still fails after its retries.
+    """
+    if mode not in CUT_MODES:
+        raise ValueError(f"Unknown cut mode {mode!r}; expected one of {CUT_MODES}.")
+    if not segments:
+        return []
+    info = probe_source(source_path)
+    copyable = info.video_codec in COPY_VIDEO_CODECS and (
+        info.audio_index is None or info.audio_codec in COPY_AUDIO_CODECS
+    )
+    if not copyable:
+        logger.info(
+            "Source codecs %s/%s cannot be stream-copied, re-encoding each segment",
+            info.video_codec, info.audio_codec,
+        )
+    elif mode == "smart" and not (info.video_codec == "h264" and info.audio_codec in (None, "aac")):
+        logger.info(
+            "Smart cutting needs H.264/AAC, cutting %s/%s on keyframes instead",
+            info.video_codec, info.audio_codec,
+        )
+        mode = "copy"
+    keyframes = keyframe_times(source_path, info, segments) if copyable else []
+
+    # Every piece gets its output path up front, so the reel order does not depend
+    # on which cut finishes first.
+    jobs = []
+    for index, (start, end) in enumerate(segments):
+        pieces = plan_cut(start, end, keyframes, mode) if copyable else [Piece(start, end, False)]
+        logger.info(
+            "Cutting segment %d (%.2fs - %.2fs) as %s",
+            index + 1, start, end,
+            ", ".join(f"{'copy' if p.copy else 'encode'} {p.start:.2f}-{p.end:.2f}" for p in pieces),
+        )
+        for part, piece in enumerate(pieces):
+            jobs.append((piece, os.path.join(work_dir, f"segment_{index + 1:03d}_{part}.ts")))
+
+    cpus = available_cpus()
+    workers = max(1, min(workers or cpus, len(jobs)))
+    threads = max(1, cpus // workers)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(
+            pool.map(
+                lambda job: _cut_with_retries(source_path, info, job[0], job[1], threads, retries),
+                jobs,
+            )
+        )
+
+
+def concat_pieces(piece_paths: List[str], output_path: str) -> str:
+    """
+    Joins pieces into an MP4 with the concat demuxer, without re-encoding.
+
+    Args:
+        piece_paths (list): Pieces from cut_segments, in order.
+        output_path (str): Destination MP4 file.
+
+    Returns:
+        str: output_path.
+
+    Raises:
+        ffmpeg.Error: If ffmpeg exits with a non-zero status.
+    """
+    list_path = f"{os.path.splitext(output_path)[0]}_pieces.txt"
+    with open(list_path, "w") as f:
+        for path in piece_paths:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+    try:
+        ffmpeg.input(list_path, format="concat", safe=0).output(
+            output_path, c="copy", movflags="+faststart"
+        ).global_args("-nostats").run(capture_stdout=True, capture_stderr=True, overwrite_output=True)
+    finally:
+        os.remove(list_path)
+    return output_path
@@ -6,9 +6,9 @@ import json
 import os
 import traceback
 import tempfile
-from moviepy import VideoFileClip
 from .prompts import VIDEO_OVERVIEW_PROMPT, VIDEO_CHUNKING_PROMPT, REEL_ANALYSIS_PROMPT
 from .video_creator import create_final_highlight_reel
+from .clip_cutter import cut_segments
 from .utils import (
     seconds_to_mmss, 
     smooth_segment_boundaries,    
@@ -17,7 +17,7 @@ from .utils import (
     initialize_vertex_client,
     validate_timestamp_markers, 
     detect_segment_overlap)
-from .get_video_gcs import download_from_gcs
+from .get_video_gcs import download_from_gcs, get_signed_read_url
 from google.cloud import storage
 
 
@@ -25,6 +25,17 @@ from dotenv import load_dotenv
 # This line loads the variables from .env into the environment
 load_dotenv()
 
+# "copy" cuts segments on keyframes without re-encoding; "smart" re-encodes only the
+# part of each segment before its first keyframe so it starts exactly on time.
+HIGHLIGHT_CUT_MODE = os.environ.get("HIGHLIGHT_CUT_MODE", "copy").lower()
+# Segments cut concurrently; 0 uses one per available CPU.
+HIGHLIGHT_RENDER_WORKERS = int(os.environ.get("HIGHLIGHT_RENDER_WORKERS", "0"))
+# Extra attempts for a segment whose cut fails.
+HIGHLIGHT_CUT_RETRIES = int(os.environ.get("HIGHLIGHT_CUT_RETRIES", "1"))
+# "range" lets ffmpeg read only the segments from GCS over a signed URL;
+# "download" copies the whole source to the temp directory first.
+HIGHLIGHT_SOURCE_READ = os.environ.get("HIGHLIGHT_SOURCE_READ", "range").lower()
+
 
 ### Function to analyze video overview and extract master character list
 
@@ -389,6 +400,58 @@ def analyze_reel_flow(segments_data: Dict[str, Any], target_duration: int, model
         return None
 
 
+def highlight_target_duration(duration: float) -> int:
+    """
+    Target length of the reel: a quarter of the video, at most 90 seconds.
+
+    Args:
+        duration: Video duration in seconds
+
+    Returns:
+        Target reel duration in seconds
+    """
+    target_duration = min(90, int(duration // 4))
+    return min(target_duration, 120) # Ensure it doesn't exceed 120s
+
+
+def render_highlight_reel(video_url: str, selected_segments: List[Dict[str, Any]], temp_dir: str, output_path: str) -> Optional[str]:
+    """
+    Step 4: Cut the selected segments out of the source video and join them.
+
+    Args:
+        video_url: GCS video URL fetched from Firestore
+        selected_segments: Segments from analyze_reel_flow, in reel order
+        temp_dir: Directory for the source copy (download mode) and the cut pieces
+        output_path: File path of the final highlight reel
+
+    Returns:
+        Path to the highlight reel, or None if joining the segments failed
+    """
+    # ffmpeg seeks over HTTP range requests, transferring the index and the
+    # selected segments instead of the whole source.
+    source = get_signed_read_url(video_url) if HIGHLIGHT_SOURCE_READ == "range" else None
+    if source:
+        print(f"Reading segments of {video_url} over a signed URL...")
+    else:
+        print(f"Downloading source video from {video_url}...")
+        try:
+            source = download_from_gcs(video_url, temp_dir)
+        except Exception as e:
+            print(f"Error downloading video from GCS: {e}")
+            raise RuntimeError(f'Failed to download video from GCS: {e}') from e
+
+    print(f"Cutting {len(selected_segments)} segments ({HIGHLIGHT_CUT_MODE} mode)...")
+    segment_paths = cut_segments(
+        source,
+        [(segment['start_timestamp'], segment['end_timestamp']) for segment in selected_segments],
+        temp_dir,
+        HIGHLIGHT_CUT_MODE,
+        workers=HIGHLIGHT_RENDER_WORKERS or None,
+        retries=HIGHLIGHT_CUT_RETRIES,
+    )
+    return create_final_highlight_reel(segment_paths, output_path=output_path)
+
+
 def create_highlight_reel(video_url: str,duration: int, model_id: str = 'gemini-2.5-pro') -> Dict[str, Any]:
     """
     Main orchestrator function for the 4-step highlight reel generation process.
@@ -402,8 +465,7 @@ def create_highlight_reel(video_url: str,duration: int, model_id: str = 'gemini-
         Dict with success status and generated HTML or error message
     """
     try:
-        target_duration = min(90, duration // 4)
-        target_duration = min(target_duration, 120) # Ensure it doesn't exceed 120s
+        target_duration = highlight_target_duration(duration)
         print(f"Video duration: {duration}s, Target reel duration: {target_duration}s")
 
 
@@ -447,29 +509,10 @@ def create_highlight_reel(video_url: str,duration: int, model_id: str = 'gemini-
         print("\n=== Step 4: Creating final highlight reel ===")
         
         with tempfile.TemporaryDirectory() as temp_dir:
-            print(f"Downloading source video from {video_url}...")
-            try:
-                local_video_path = download_from_gcs(video_url, temp_dir)
-            except Exception as e:
-                print(f"Error downloading video from GCS: {e}")
-                return {'success': False, 'error': f'Failed to download video from GCS: {e}'}
-
-            segment_paths = []
-            with VideoFileClip(local_video_path) as video:
-                for i, segment in enumerate(selected_segments):
-                    start_time = segment['start_timestamp']
-                    end_time = segment['end_timestamp']
-                    segment_id = segment['segment_id']
-                    
-                    print(f"Clipping segment {segment_id} ({start_time:.2f}s - {end_time:.2f}s)...")
-                    clip_path = os.path.join(temp_dir, f"segment_{i+1}_{segment_id}.mp4")
-                    
-                    subclip = video.subclipped(start_time, end_time)
-                    subclip.write_videofile(clip_path, codec="libx264", audio_codec="aac", logger=None)
-                    segment_paths.append(clip_path)
-
             output_file_name = f"highlight_{os.path.basename(video_url).split('.')[0]}.mp4"
-            output_highlight_path = create_final_highlight_reel(segment_paths, output_path=output_file_name)
+            output_highlight_path = render_highlight_reel(
+                video_url, selected_segments, temp_dir, output_path=output_file_name
+            )
 
             #Upload to GCS
             if output_highlight_path:
@@ -2,6 +2,8 @@ import logging
 import os
 from google.cloud import storage
 from urllib.parse import urlparse
+from typing import Optional
+from common.gcs_media import signed_read_url
 from dotenv import load_dotenv
 # This line loads the variables from .env into the environment
 load_dotenv()
@@ -37,6 +39,18 @@ def parse_gcs_uri(uri: str) -> (str, str):
         return None, None
 
 
+def get_signed_read_url(gcs_uri: str) -> Optional[str]:
+    """
+    Returns a signed HTTPS URL that ffmpeg can read the object from with range
+    requests, or None if no URL can be signed (callers then download the file).
+    """
+    storage_client = get_gcs_client()
+    bucket_name, blob_name = parse_gcs_uri(gcs_uri)
+    if not storage_client or not bucket_name:
+        return None
+    return signed_read_url(storage_client.bucket(bucket_name).blob(blob_name))
+
+
 def download_from_gcs(gcs_uri: str, temp_dir: str) -> str:
     """Downloads a file from a GCS URI to a temp directory and returns its local path."""
     if not gcs_uri:
@@ -0,0 +1,384 @@
+"""Highlight reel generation as a staged, resumable pipeline.
+
+Each stage runs in its own Pub/Sub push request, stores its output and publishes
+the message of the next stage:
+
+    probe -> overview -> chunk -> select -> render -> upload
+
+Stage outputs are JSON files (and the rendered reel) under
+`gs://<source bucket>/<asset_id>/highlights/`, and the asset's `highlights` field
+records which stages are complete. A redelivered or repeated message skips the
+stages that are already complete, so a failed render does not repeat the Gemini
+calls of the stages before it. The state belongs to one generation of the source
+object; a re-uploaded source starts over.
+
+A failing stage is retried through Pub/Sub redelivery until it has failed
+`max_attempts` times, then the pipeline is marked failed. Processing the asset
+again resumes it from the failed stage.
+
+`InMemoryStageQueue` stands in for Pub/Sub in tests and local runs:
+
+    queue = InMemoryStageQueue()
+    pipeline = HighlightPipeline(asset_manager, storage_client, queue, "gemini-2.5-pro")
+    pipeline.start(asset_id, "gs://bucket/video.mp4")
+    queue.drain(pipeline.handle)
+"""
+
+import abc
+import collections
+import json
+import logging
+import os
+import tempfile
+import uuid
+from typing import Callable, List, Optional, Tuple
+
+from google.cloud import firestore
+
+from common.gcs_media import parse_gcs_uri
+from common.generation_policy import asset_duration_seconds
+from common.media_probe import probe_gcs_media
+
+from .final_highlight_gen import (
+    analyze_reel_flow,
+    analyze_video_overview,
+    chunk_video_segments,
+    highlight_target_duration,
+    render_highlight_reel,
+)
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("probe", "overview", "chunk", "select", "render", "upload")
+# Just above the previews service's 600s request timeout, so the lease of a stage
+# whose instance died expires before Pub/Sub gives up redelivering it.
+DEFAULT_LEASE_SECONDS = 660
+
+
+class StageBusy(Exception):
+    """Raised when another delivery of the same stage holds its lease."""
+
+
+class StageQueue(abc.ABC):
+    """Carries stage messages to the handler of the next stage."""
+
+    @abc.abstractmethod
+    def publish(self, message: dict):
+        """Sends a stage message; it must be delivered at least once."""
+
+
+class PubSubStageQueue(StageQueue):
+    """Publishes stage messages to a Pub/Sub topic pushed to the /highlights route."""
+
+    def __init__(self, project_id: str, topic: str):
+        from google.cloud import pubsub_v1
+
+        self.publisher = pubsub_v1.PublisherClient()
+        self.topic_path = self.publisher.topic_path(project_id, topic)
+
+    def publish(self, message: dict):
+        self.publisher.publish(self.topic_path, json.dumps(message).encode("utf-8")).result(timeout=60)
+
+
+class InMemoryStageQueue(StageQueue):
+    """
+    In-process stand-in for Pub/Sub, for tests and local runs.
+
+    Messages are delivered in order by `drain`. A message whose handler raises is
+    delivered again, like an unacknowledged Pub/Sub message, up to max_deliveries.
+    """
+
+    def __init__(self, max_deliveries: int = 5):
+        self.messages = collections.deque()
+        self.max_deliveries = max_deliveries
+
+    def publish(self, message: dict):
+        self.messages.append(dict(message))
+
+    def drain(self, handler: Callable[[dict], str]) -> List[Tuple[dict, object]]:
+        """
+        Delivers messages, including those published while draining, until none are left.
+
+        Args:
+            handler (callable): Receives each message, e.g. HighlightPipeline.handle.
+
+        Returns:
+            list: (message, outcome) pairs in delivery order; the outcome of a failed
+                  delivery is the exception it raised.
+        """
+        deliveries = collections.Counter()
+        delivered = []
+        while self.messages:
+            message = self.messages.popleft()
+            key = json.dumps(message, sort_keys=True)
+            deliveries[key] += 1
+            try:
+                outcome = handler(message)
+            except Exception as e:
+                outcome = e
+                if deliveries[key] < self.max_deliveries:
+                    self.messages.append(message)
+            delivered.append((message, outcome))
+        return delivered
+
+
+class HighlightPipeline:
+    """Runs the highlight stages of an asset, one message at a time."""
+
+    def __init__(
+        self,
+        asset_manager,
+        storage_client,
+        queue: StageQueue,
+        model_id: str,
+        output_bucket: Optional[str] = None,
+        max_attempts: int = 3,
+        lease_seconds: int = DEFAULT_LEASE_SECONDS,
+    ):
+        """
+        Args:
+            asset_manager (MediaAssetManager): Holds the `highlights` state of each asset.
+            storage_client: A google.cloud.storage Client for stage outputs.
+            queue (StageQueue): Carries the stage messages.
+            model_id (str): Gemini model of the overview, chunk and select stages.
+            output_bucket (Optional[str]): Bucket receiving the final reel under
+                `video-highlights/`; the reel stays next to the stage outputs when None.
+            max_attempts (int): Failures of one stage before the pipeline is marked failed.
+            lease_seconds (int): How long one delivery may hold a stage before others take
+                over; keep it just above the request timeout of the /highlights route.
+        """
+        self.asset_manager = asset_manager
+        self.storage_client = storage_client
+        self.queue = queue
+        self.model_id = model_id
+        self.output_bucket = output_bucket
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+
+    def _state(self, asset_id: str) -> dict:
+        return (self.asset_manager.get_asset(asset_id) or {}).get("highlights") or {}
+
+    @staticmethod
+    def _next_stage(state: dict) -> Optional[str]:
+        completed = set(state.get("completed_stages") or [])
+        return next((stage for stage in STAGES if stage not in completed), None)
+
+    def _skip_reason(self, state: dict, stage: str, generation: str) -> Optional[str]:
+        """Returns why a stage message must not run against the state, or None."""
+        if generation != state.get("source_generation"):
+            return "stale"
+        if state.get("status") == "failed":
+            return "failed"
+        if self._next_stage(state) != stage:
+            return "skipped"
+        return None
+
+    def _publish(self, asset_id: str, file_location: str, stage: str, generation: str):
+        self.queue.publish(
+            {
+                "asset_id": asset_id,
+                "file_location": file_location,
+                "stage": stage,
+                "source_generation": generation,
+            }
+        )
+
+    def _update(self, asset_id: str, data: dict):
+        # Stage progress must be recorded before the next stage is published.
+        if not self.asset_manager.update_asset_metadata(asset_id, "highlights", data):
+            raise RuntimeError(f"Could not update the highlight state of asset {asset_id}")
+
+    def start(self, asset_id: str, file_location: str) -> str:
+        """
+        Starts the pipeline of an asset, or resumes it from its first incomplete stage.
+
+        Args:
+            asset_id (str): The ID of the asset.
+            file_location (str): GCS URI of the source video.
+
+        Returns:
+            str: The stage published, or "completed" if the reel already exists.
+        """
+        bucket_name, blob_name = parse_gcs_uri(file_location)
+        source_blob = self.storage_client.bucket(bucket_name).get_blob(blob_name)
+        if source_blob is None:
+            raise FileNotFoundError(f"{file_location} does not exist.")
+        generation = str(source_blob.generation)
+
+        state = self._state(asset_id)
+        if state.get("source_generation") != generation:
+            # A new or re-uploaded source; earlier stage outputs do not apply.
+            state = {
+                "status": "pending",
+                "stage": None,
+                "source_generation": generation,
+                "completed_stages": [],
+                "outputs": {},
+                "attempts": {},
+                "reel_uri": None,
+                "error_message": None,
+            }
+            self._update(asset_id, state)
+        elif state.get("status") == "failed":
+            self._update(asset_id, {"status": "pending", "attempts": {}, "error_message": None})
+
+        stage = self._next_stage(state)
+        if stage is None:
+            return "completed"
+        self._publish(asset_id, file_location, stage, generation)
+        return stage
+
+    def handle(self, message: dict) -> str:
+        """
+        Runs the stage named in a message and publishes the next one.
+
+        Args:
+            message (dict): {asset_id, file_location, stage, source_generation}.
+
+        Returns:
+            str: "completed" when the stage ran, "skipped" for a stage that is already
+                 complete, "stale" for a message of an earlier source generation and
+                 "failed" once the stage has used up its attempts.
+
+        Raises:
+            StageBusy: If another delivery is running the stage.
+            Exception: The stage's error while it has attempts left; the message
+                should be redelivered.
+        """
+        asset_id = message["asset_id"]
+        file_location = message["file_location"]
+        stage = message["stage"]
+        generation = message.get("source_generation")
+        if stage not in STAGES:
+            raise ValueError(f"Unknown highlight stage {stage!r}.")
+        log_extra = {"extra_fields": {"asset_id": asset_id, "stage": stage}}
+
+        state = self._state(asset_id)
+        skip_reason = self._skip_reason(state, stage, generation)
+        if skip_reason == "stale":
+            logger.info("Ignoring %s message of an earlier source generation", stage, extra=log_extra)
+        expected = self._next_stage(state)
+        if skip_reason == "skipped" and expected is not None:
+            # A redelivered message; make sure the pending stage has been published,
+            # in case the previous delivery stopped between recording and publishing.
+            self._publish(asset_id, file_location, expected, generation)
+        if skip_reason:
+            return skip_reason
+
+        owner = f"highlights-{uuid.uuid4()}"
+        lease = f"highlights_{stage}"
+        if not self.asset_manager.acquire_lease(asset_id, lease, owner, ttl_seconds=self.lease_seconds):
+            raise StageBusy(f"Stage {stage} of asset {asset_id} is running elsewhere")
+        try:
+            # Another delivery may have completed the stage, and published the next one,
+            # between the checks above and taking the lease.
+            state = self._state(asset_id)
+            skip_reason = self._skip_reason(state, stage, generation)
+            if skip_reason:
+                logger.info("Highlight stage %s finished elsewhere: %s", stage, skip_reason, extra=log_extra)
+                return skip_reason
+            self._update(asset_id, {"status": "processing", "stage": stage})
+            logger.info("Running highlight stage %s for asset %s", stage, asset_id, extra=log_extra)
+            try:
+                output = getattr(self, f"_run_{stage}")(asset_id, file_location, state)
+                output_uri = self._write_output(file_location, asset_id, stage, output)
+            except Exception as e:
+                attempts = (state.get("attempts") or {}).get(stage, 0) + 1
+                update = {f"attempts.{stage}": attempts}
+                if attempts >= self.max_attempts:
+                    update.update(status="failed", error_message=f"Highlight stage {stage} failed: {e}")
+                self._update(asset_id, update)
+                logger.error(
+                    "Highlight stage %s failed for asset %s (attempt %d of %d)",
+                    stage, asset_id, attempts, self.max_attempts,
+                    exc_info=True, extra=log_extra,
+                )
+                if attempts >= self.max_attempts:
+                    return "failed"
+                raise
+
+            next_stage = STAGES[STAGES.index(stage) + 1] if stage != STAGES[-1] else None
+            update = {"completed_stages": firestore.ArrayUnion([stage]), f"outputs.{stage}": output_uri}
+            if next_stage is None:
+                update.update(status="completed", stage=None, reel_uri=output["reel_uri"], error_message=None)
+            self._update(asset_id, update)
+        finally:
+            self.asset_manager.release_lease(asset_id, lease, owner)
+
+        if next_stage:
+            self._publish(asset_id, file_location, next_stage, generation)
+        return "completed"
+
+    # Stage outputs
+
+    def _output_blob(self, file_location: str, asset_id: str, name: str):
+        bucket_name, _ = parse_gcs_uri(file_location)
+        return self.storage_client.bucket(bucket_name).blob(f"{asset_id}/highlights/{name}")
+
+    def _write_output(self, file_location: str, asset_id: str, stage: str, output: dict) -> str:
+        blob = self._output_blob(file_location, asset_id, f"{stage}.json")
+        blob.upload_from_string(json.dumps(output), content_type="application/json")
+        return f"gs://{blob.bucket.name}/{blob.name}"
+
+    def _load_output(self, state: dict, stage: str) -> dict:
+        bucket_name, blob_name = parse_gcs_uri(state["outputs"][stage])
+        return json.loads(self.storage_client.bucket(bucket_name).blob(blob_name).download_as_bytes())
+
+    # Stages
+
+    def _run_probe(self, asset_id: str, file_location: str, state: dict) -> dict:
+        # The dispatcher stores the duration when it probes the upload; assets it could
+        # not probe are probed here, reading only the container headers.
+        duration = asset_duration_seconds(self.asset_manager.get_asset(asset_id))
+        if not duration:
+            duration = probe_gcs_media(self.storage_client, file_location).duration
+        if not duration:
+            raise ValueError(f"Could not determine the duration of {file_location}")
+        return {"duration": duration}
+
+    def _run_overview(self, asset_id: str, file_location: str, state: dict) -> dict:
+        duration = self._load_output(state, "probe")["duration"]
+        # Chunking proceeds without character constraints when no overview is produced.
+        return {"overview": analyze_video_overview(file_location, int(duration), self.model_id)}
+
+    def _run_chunk(self, asset_id: str, file_location: str, state: dict) -> dict:
+        duration = self._load_output(state, "probe")["duration"]
+        overview = self._load_output(state, "overview")["overview"]
+        segments_data = chunk_video_segments(file_location, int(duration), overview, self.model_id)
+        if not segments_data:
+            raise RuntimeError("Failed to analyze video segments")
+        return segments_data
+
+    def _run_select(self, asset_id: str, file_location: str, state: dict) -> dict:
+        duration = self._load_output(state, "probe")["duration"]
+        selection_data = analyze_reel_flow(
+            self._load_output(state, "chunk"), highlight_target_duration(duration), self.model_id
+        )
+        if not selection_data or not selection_data.get("selected_segments"):
+            raise RuntimeError("Failed to select highlight segments")
+        return selection_data
+
+    def _run_render(self, asset_id: str, file_location: str, state: dict) -> dict:
+        selected_segments = self._load_output(state, "select")["selected_segments"]
+        with tempfile.TemporaryDirectory() as temp_dir:
+            reel_path = render_highlight_reel(
+                file_location, selected_segments, temp_dir, os.path.join(temp_dir, "reel.mp4")
+            )
+            if not reel_path:
+                raise RuntimeError("Failed to create final highlight reel")
+            blob = self._output_blob(file_location, asset_id, "reel.mp4")
+            blob.upload_from_filename(reel_path, content_type="video/mp4")
+        return {"staging_uri": f"gs://{blob.bucket.name}/{blob.name}", "segment_count": len(selected_segments)}
+
+    def _run_upload(self, asset_id: str, file_location: str, state: dict) -> dict:
+        staging_uri = self._load_output(state, "render")["staging_uri"]
+        if not self.output_bucket:
+            return {"reel_uri": staging_uri}
+        bucket_name, blob_name = parse_gcs_uri(staging_uri)
+        source_bucket = self.storage_client.bucket(bucket_name)
+        destination_name = f"video-highlights/highlight_{os.path.basename(file_location).split('.')[0]}.mp4"
+        # A server-side copy; the reel is not downloaded again.
+        source_bucket.copy_blob(
+            source_bucket.blob(blob_name), self.storage_client.bucket(self.output_bucket), destination_name
+        )
+        return {"reel_uri": f"gs://{self.output_bucket}/{destination_name}"}
@@ -2,31 +2,32 @@
 
 import os
 import json
+import time
 import base64
 import logging
 from typing import Union
 from flask import Flask, request
 
-from google import genai
 from google.genai import types
 
 from common.media_asset_manager import MediaAssetManager
 from common.logging_config import configure_logger
-from common.content_classifier import classify_content
+from common.content_classifier import get_or_classify_content, DEFAULT_GENRE
+from common.llm_usage import log_usage
+from common.context_cache import VideoContextCache, build_cached_request, is_cache_miss
+from common.genai_client import get_genai_client
+from common.result_cache import ResultCache, prompt_fingerprint
+from common.generation_policy import get_generation_policy, asset_duration_seconds
+from common.media_sampling import media_resolution, is_sampled, video_part
 
 from .structured_output_schema import SHORTS_SCHEMA
-from .prompts import get_preview_prompts
+from .prompts import get_preview_prompts, PROMPT_VERSION
 
 
 # Highlight Generation service Imports
-import tempfile
-import moviepy as mp
 from google.cloud import storage
-from google.cloud import firestore
-
-from .firestore_util import get_video_metadata
-from .final_highlight_gen import analyze_video_overview, initialize_vertex_client,create_highlight_reel
 
+from .highlight_pipeline import DEFAULT_LEASE_SECONDS, HighlightPipeline, PubSubStageQueue, StageBusy
 
 
 # Configure logger for the service
@@ -39,7 +40,39 @@ asset_manager = MediaAssetManager(project_id=project_id)
 llm_model = os.environ.get("LLM_MODEL", "gemini-2.5-flash")
 
 storage_client = storage.Client()
-firestore_client = firestore.Client()
+
+# Optional content-hash keyed cache of results, so re-ingested media skips Gemini.
+result_cache = (
+    ResultCache(asset_manager.db, storage_client)
+    if os.environ.get("RESULT_CACHE", "false").lower() == "true"
+    else None
+)
+
+# Optional shared Gemini context cache for the asset's video. Cached content lives
+# in a regional endpoint, so the cache gets its own client bound to that location.
+context_cache = None
+if os.environ.get("GEMINI_CONTEXT_CACHE", "false").lower() == "true":
+    context_cache = VideoContextCache(
+        get_genai_client(
+            project_id,
+            os.environ.get("GEMINI_CACHE_LOCATION", os.environ.get("GCP_REGION", "us-central1")),
+        ),
+        asset_manager,
+        ttl_seconds=int(os.environ.get("GEMINI_CONTEXT_CACHE_TTL_SECONDS", "3600")),
+    )
+
+# Optional highlight reels, generated by a staged pipeline with one Pub/Sub message per stage.
+highlight_pipeline = None
+if os.environ.get("HIGHLIGHTS_ENABLED", "false").lower() == "true":
+    highlight_pipeline = HighlightPipeline(
+        asset_manager,
+        storage_client,
+        PubSubStageQueue(project_id, os.environ.get("HIGHLIGHTS_TOPIC", "highlights-stage-topic")),
+        os.environ.get("HIGHLIGHTS_LLM_MODEL", "gemini-2.5-pro"),
+        output_bucket=os.environ.get("OUTPUT_BUCKET_NAME"),
+        max_attempts=int(os.environ.get("HIGHLIGHT_STAGE_MAX_ATTEMPTS", "3")),
+        lease_seconds=int(os.environ.get("HIGHLIGHT_STAGE_LEASE_SECONDS", str(DEFAULT_LEASE_SECONDS))),
+    )
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -52,6 +85,9 @@ def generate(
     system_instruction_text,
     response_schema,
     model_name=llm_model,
+    asset_id=None,
+    content_genre=None,
+    duration_seconds=None,
 ) -> str:
     """ "
     Invokes a generative AI model with a video and text prompt to generate structured data.
@@ -63,76 +99,114 @@ def generate(
         system_instruction_text (str): The system instruction for the model.
         response_schema (dict): The schema for the expected JSON output.
         model_name (str): The name of the generative model to use (default: "gemini-2.5-pro").
+            The generation policy may route the call to a different model.
+        asset_id (str): The asset being processed. Required to use the shared context cache.
+        content_genre (str): The content genre, used by the generation policy.
+        duration_seconds (float): Media duration for the generation policy, if known.
 
     Returns:
         str: The generated JSON string response from the model.
 
     """
-    logger.info(f"Using model: {model_name}")
-    client = genai.Client(
-        vertexai=True,
-        project=project_id,
-        location="global",
-    )
-
-    # Prepare the user prompt parts: one for the text instruction and one for the video file.
-    msg1_text1 = types.Part.from_text(text=prompt_text)
-    msg1_video1 = types.Part.from_uri(
-       file_uri=video_uri,
-        mime_type="video/youtube" if source == "youtube" else "video/*",
+    # Pick model, thinking budget and output cap for this asset's duration and genre.
+    policy = get_generation_policy().decide(
+        "previews", model_name, duration_seconds, content_genre, asset_id
     )
-    msg1_video1 = types.Part.from_uri(
-       file_uri=video_uri,
-        mime_type="video/*",
-    )
-
-    # The system instruction guides the model's behavior and persona.
-    si_text1 = system_instruction_text
-
-    # Combine the parts into a single user content block.
-    contents = [
-        types.Content(role="user", parts=[msg1_text1, msg1_video1]),
-    ]
-
-    # Configure the generation settings for the model.
-    generate_content_config = types.GenerateContentConfig(
-        # Model creativity and determinism settings.
-        temperature=1,
-        top_p=1,
-        seed=0,
-        # Enforce JSON output according to the provided schema.
-        max_output_tokens=65535,
-        response_mime_type="application/json",
-        response_schema=response_schema,
-        # Disable safety filters to allow processing of a wide range of content.
-        safety_settings=[
-            types.SafetySetting(category="HARM_CATEGORY_HATE_SPEECH", threshold="OFF"),
-            types.SafetySetting(
-                category="HARM_CATEGORY_DANGEROUS_CONTENT", threshold="OFF"
+    model_name = policy["model"]
+    logger.info(f"Using model: {model_name}")
+    client = get_genai_client(project_id, "global")
+    mime_type = "video/youtube" if source == "youtube" else "video/*"
+
+    # Reuse the video tokens cached by another service for this asset when available.
+    # The cached video is tokenized at full fidelity, so sampled calls send it inline.
+    cache_name = None
+    if context_cache and asset_id and not is_sampled(policy):
+        cache_name = context_cache.get_handle(asset_id, video_uri, mime_type, model_name)
+
+    def build_config(cached_content=None):
+        # Configure the generation settings for the model.
+        return types.GenerateContentConfig(
+            # Model creativity and determinism settings.
+            temperature=1,
+            top_p=1,
+            seed=0,
+            # Enforce JSON output according to the provided schema.
+            max_output_tokens=policy["max_output_tokens"],
+            media_resolution=media_resolution(policy),
+            response_mime_type="application/json",
+            response_schema=response_schema,
+            # Disable safety filters to allow processing of a wide range of content.
+            safety_settings=[
+                types.SafetySetting(category="HARM_CATEGORY_HATE_SPEECH", threshold="OFF"),
+                types.SafetySetting(
+                    category="HARM_CATEGORY_DANGEROUS_CONTENT", threshold="OFF"
+                ),
+                types.SafetySetting(
+                    category="HARM_CATEGORY_SEXUALLY_EXPLICIT", threshold="OFF"
+                ),
+                types.SafetySetting(category="HARM_CATEGORY_HARASSMENT", threshold="OFF"),
+            ],
+            # Set the system-level instructions for the model. Cached requests
+            # carry them as a text part instead.
+            system_instruction=(
+                None if cached_content else [types.Part.from_text(text=system_instruction_text)]
             ),
-            types.SafetySetting(
-                category="HARM_CATEGORY_SEXUALLY_EXPLICIT", threshold="OFF"
+            cached_content=cached_content,
+            thinking_config=types.ThinkingConfig(
+                thinking_budget=policy["thinking_budget"],
             ),
-            types.SafetySetting(category="HARM_CATEGORY_HARASSMENT", threshold="OFF"),
-        ],
-        # Set the system-level instructions for the model.
-        system_instruction=[types.Part.from_text(text=si_text1)],
-        thinking_config=types.ThinkingConfig(
-            thinking_budget=-1,
-        ),
-    )
+        )
 
-    # Send the request to the generative model.
-    response = client.models.generate_content(
-        model=model_name,
-        contents=contents,
-        config=generate_content_config,
-    )
+    started = time.monotonic()
+    response = None
+    if cache_name:
+        try:
+            response = context_cache.client.models.generate_content(
+                model=model_name,
+                contents=build_cached_request(system_instruction_text, prompt_text),
+                config=build_config(cache_name),
+            )
+        except Exception as e:
+            if not is_cache_miss(e, cache_name):
+                raise
+            # The handle expired or was evicted; delete it and send the video inline.
+            logger.warning(
+                "Cached content %s is gone for asset %s, falling back to inline video",
+                cache_name,
+                asset_id,
+                exc_info=True,
+                extra={"extra_fields": {"asset_id": asset_id, "cache_name": cache_name}},
+            )
+            context_cache.evict(asset_id, model_name)
+
+    if response is None:
+        # Prepare the user prompt parts: one for the text instruction and one for the video file.
+        msg1_text1 = types.Part.from_text(text=prompt_text)
+        msg1_video1 = video_part(video_uri, mime_type, policy.get("fps"))
+
+        # Combine the parts into a single user content block.
+        contents = [
+            types.Content(role="user", parts=[msg1_text1, msg1_video1]),
+        ]
+
+        # Send the request to the generative model.
+        response = client.models.generate_content(
+            model=model_name,
+            contents=contents,
+            config=build_config(),
+        )
+    log_usage("previews", model_name, response, time.monotonic() - started, asset_id)
 
     return response.text
 
 
-def generate_previews(asset_id: str, file_location: str, source: str, content_genre: str = "entertainment") -> Union[list, dict]:
+def generate_previews(
+    asset_id: str,
+    file_location: str,
+    source: str,
+    content_genre: str = "entertainment",
+    duration_seconds: float = None,
+) -> Union[list, dict]:
     """
     Generates a list of potential short video clips from a media asset using Gemini.
 
@@ -141,6 +215,7 @@ def generate_previews(asset_id: str, file_location: str, source: str, content_ge
         file_location (str): GCS URI of the media file (e.g., gs://bucket/path/to/file.mp4).
         source (str): The source of the video, e.g., "GCS" or "youtube".
         content_genre (str): The content genre for prompt selection.
+        duration_seconds (float): Media duration for the generation policy, if known.
 
     Returns:
         Union[list, dict]: A list of preview clips on success,
@@ -166,6 +241,9 @@ def generate_previews(asset_id: str, file_location: str, source: str, content_ge
             system_instructions_text,
             SHORTS_SCHEMA,
             model_name=llm_model,
+            asset_id=asset_id,
+            content_genre=content_genre,
+            duration_seconds=duration_seconds,
         )
         # Parse the JSON string response into a Python list.
         shorts_data = json.loads(raw_response)
@@ -195,68 +273,54 @@ def generate_previews(asset_id: str, file_location: str, source: str, content_ge
         )
         return {"error": f"Failed to generate previews: {str(e)}"}
 
-def create_video_metadata(bucket_name, source_blob_name,collection_name):
+def generate_previews_cached(
+    asset_id: str,
+    file_location: str,
+    source: str,
+    content_genre: str,
+    content_hash: str = None,
+    duration_seconds: float = None,
+) -> Union[list, dict]:
     """
-    Downloads a video from a GCS bucket, extracts its duration,
-    ,stores the metadata in a Firestore document
-    and returns the document ID.
+    Returns the output of generate_previews, reusing the clips generated earlier for
+    the same media content, prompts and model when the result cache is enabled.
 
     Args:
-        bucket_name (str): The name of the GCS bucket.
-        source_blob_name (str): The full path to the video object in the bucket.
-        collection_name (str): The Firestore collection name to store the metadata.
-    """
-    
-    # 1. Download the video to a temporary local file.
-    # We use a temporary file to avoid cluttering the system and
-    # ensure it's deleted automatically.
-    
-    # Create a temporary file with a .mp4 extension for moviepy to recognize it.
-    temp_file = tempfile.NamedTemporaryFile(suffix='.mp4', delete=False)
-    temp_file_path = temp_file.name
-    temp_file.close()
-
-    try:
-        bucket = storage_client.bucket(bucket_name)
-        blob = bucket.blob(source_blob_name)
-        #local_path = os.path.join(temp_dir, os.path.basename(blob_name))
-        
-        print(f"Downloading {source_blob_name} from bucket {bucket_name} to {temp_file_path}...")
-        blob.download_to_filename(temp_file_path)
-        print("Download complete.")
-
-        # 2. Use moviepy to get the video metadata.
-        # This is a much more efficient and reliable method for technical metadata
-        # like duration, as opposed to a large language model.
-        try:
-            video_clip = mp.VideoFileClip(temp_file_path)
-            duration_seconds = video_clip.duration
-            print(f"Video duration: {duration_seconds} seconds")
-            
-            # Close the video clip to release the file handle
-            video_clip.close()
-
-        except Exception as e:
-            print(f"Error processing video with moviepy: {e}")
-            return
-
-        # 3. Store the metadata in a Firestore document.
-        # The document will be created in the 'video_metadata' collection.
-        metadata = {
-            #'video_path': f"gs://{bucket_name}/{source_blob_name}",
-            'duration_seconds': duration_seconds,
-            'timestamp': firestore.SERVER_TIMESTAMP
-        }
+        asset_id (str): The ID of the asset.
+        file_location (str): GCS URI of the media file.
+        source (str): The source of the video, e.g., "GCS" or "youtube".
+        content_genre (str): The content genre for prompt selection.
+        content_hash (str): Content hash of the media file.
+        duration_seconds (float): Media duration for the generation policy, if known.
 
-        doc_ref = firestore_client.collection('video_metadata').add(metadata)
-        print(f"Metadata for {source_blob_name} stored in Firestore with ID: {doc_ref[1].id}")
-        return doc_ref[1].id
+    Returns:
+        Union[list, dict]: Same contract as generate_previews.
+    """
+    if not result_cache:
+        return generate_previews(asset_id, file_location, source, content_genre, duration_seconds)
+
+    def compute():
+        preview_results = generate_previews(asset_id, file_location, source, content_genre, duration_seconds)
+        # Cache entries are documents, so the list of clips is wrapped.
+        return {"clips": preview_results} if isinstance(preview_results, list) else preview_results
+
+    system_instructions_text, prompt = get_preview_prompts(content_genre)
+    results = result_cache.get_or_compute(
+        content_hash,
+        "previews",
+        prompt_fingerprint(
+            PROMPT_VERSION,
+            system_instructions_text,
+            prompt,
+            json.dumps(SHORTS_SCHEMA, sort_keys=True),
+            get_generation_policy().fingerprint,
+        ),
+        llm_model,
+        compute,
+        asset_id=asset_id,
+    )
+    return results["clips"] if "clips" in results else results
 
-    finally:
-        # Clean up the temporary file, regardless of success or failure.
-        if os.path.exists(temp_file_path):
-            os.remove(temp_file_path)
-            print(f"Cleaned up temporary file: {temp_file_path}")
 
 @app.route("/", methods=["POST"])
 def handle_message():
@@ -318,39 +382,47 @@ def handle_message():
         asset_manager.update_asset_metadata(
             asset_id, "previews", {"status": "processing"}
         )
-
-        # Classify content genre for prompt selection
-        content_genre = classify_content(file_location, source, project_id, llm_model)
+        # Read once here; the generation policy of every call needs the duration.
+        duration_seconds = asset_duration_seconds(asset_manager.get_asset(asset_id))
+
+        # Classify content genre for prompt selection. The genre is classified once
+        # per asset and stored in video_details; other services reuse it.
+        content_hash = result_cache.content_hash(file_location) if result_cache else None
+        content_genre = get_or_classify_content(
+            asset_manager,
+            asset_id,
+            file_location,
+            source,
+            project_id,
+            llm_model,
+            context_cache,
+            result_cache=result_cache,
+            content_hash=content_hash,
+        ) or DEFAULT_GENRE
         logger.info(
             "Content genre for asset %s: %s", asset_id, content_genre, extra=log_extra
         )
-        # Store content genre in video_details
-        asset_manager.update_asset_metadata(
-            asset_id, "video_details", {"content_genre": content_genre}
-        )
 
         # Trigger the core logic to generate preview clips.
-        preview_results = generate_previews(asset_id, file_location, source, content_genre)
-
-        #### Trigger the core logic to generate highlights only do this if source != 'youtube'
-        # video_file_name= file_name +".mp4"
-        # bucket_name=file_location.split("/")[2] 
-        # collection_name = message_data.get("collection_name")
-        # #Creating the new Metadata entry in Firestore for highlights
-        # doc_id=create_video_metadata(bucket_name, video_file_name,collection_name)
-
-        # #Feching of created new Metadata entry from Firestore
-        # Document_data=get_video_metadata(firestore_client, collection_name, doc_id)
-        # print(f"Fetched metadata from Firestore document ID: {doc_id}")
-        # print(f"Document data: {Document_data}")
-
-        # duration=Document_data['duration_seconds']
-        # model_id=llm_model
-
-        # print(f"Creating Highlight Reel... for {file_name}")
-        # create_highlight_reel(file_location,duration,model_id)
-
+        preview_results = generate_previews_cached(
+            asset_id, file_location, source, content_genre, content_hash, duration_seconds
+        )
 
+        # Highlight reels are cut from the uploaded file, so YouTube sources are skipped.
+        # Starting an asset again resumes its pipeline from the first incomplete stage.
+        if highlight_pipeline and source != "youtube":
+            try:
+                stage = highlight_pipeline.start(asset_id, file_location)
+                logger.info(
+                    "Highlight pipeline for asset %s at stage: %s", asset_id, stage, extra=log_extra
+                )
+            except Exception:
+                logger.error(
+                    "Could not start the highlight pipeline for asset %s",
+                    asset_id,
+                    exc_info=True,
+                    extra=log_extra,
+                )
 
         # A successful response is a list of clips, while an error is a dict.
         if isinstance(preview_results, dict) and "error" in preview_results:
@@ -389,6 +461,8 @@ def handle_message():
                 error_msg,
                 extra=log_extra,
             )
+        if context_cache:
+            context_cache.release(asset_id)
 
         return "", 204
     except Exception as e:
@@ -408,6 +482,53 @@ def handle_message():
                     "error_message": f"Critical error in service: {str(e)}",
                 },
             )
+            if context_cache:
+                context_cache.release(asset_id)
         # Return a 204 status to acknowledge the Pub/Sub message and prevent retries,
         # even though an error occurred. This is a common pattern for non-recoverable errors.
-        return "Error processing message, but acknowledging to prevent retries.", 204
\ No newline at end of file
+        return "Error processing message, but acknowledging to prevent retries.", 204
+
+
+@app.route("/highlights", methods=["POST"])
+def handle_highlight_stage():
+    """
+    Cloud Run entry point that runs one highlight pipeline stage per Pub/Sub message.
+
+    A non-2xx response makes Pub/Sub redeliver the message, which retries the stage.
+    """
+    request_json = request.get_json(silent=True)
+    if not request_json or "message" not in request_json:
+        logger.error("Invalid Pub/Sub message format: missing 'message' key.")
+        return "Bad Request: invalid Pub/Sub message format", 400
+    if highlight_pipeline is None:
+        logger.warning("Highlight stage message received while highlights are disabled.")
+        return "", 204
+
+    try:
+        message_data = json.loads(base64.b64decode(request_json["message"]["data"]).decode("utf-8"))
+    except (KeyError, ValueError):
+        logger.error("Malformed highlight stage message.", exc_info=True)
+        return "Bad Request: malformed message", 400
+    if not all(message_data.get(key) for key in ("asset_id", "file_location", "stage")):
+        logger.error(
+            "Highlight stage message missing required data",
+            extra={"extra_fields": {"message_data": message_data}},
+        )
+        return "Bad Request: missing required data", 400
+
+    log_extra = {"extra_fields": {"asset_id": message_data["asset_id"], "stage": message_data["stage"]}}
+    try:
+        outcome = highlight_pipeline.handle(message_data)
+        logger.info(
+            "Highlight stage %s for asset %s: %s",
+            message_data["stage"],
+            message_data["asset_id"],
+            outcome,
+            extra=log_extra,
+        )
+        return "", 204
+    except StageBusy:
+        return "Stage is running in another request", 409
+    except Exception:
+        logger.error("Highlight stage failed, requesting redelivery.", exc_info=True, extra=log_extra)
+        return "Highlight stage failed", 500
@@ -280,6 +280,10 @@ Given a video segment with timestamps and summary, you will:
 
 # --- Simple preview prompts (used by generate_previews in main.py) ---
 
+# Part of every result cache key. Prompt text changes invalidate cached results
+# automatically; bump this to force regeneration without editing a prompt.
+PROMPT_VERSION = "1"
+
 ENTERTAINMENT_PREVIEW_SYSTEM = """
 You are helping an entertainment company create shorts out of their entertainment titles.
 You are able to identify the scenes that would make users see the full title."""
@@ -1,7 +1,7 @@
 import re
 import os
 from typing import Dict, Any, List, Optional
-from google import genai
+from common.genai_client import get_genai_client
 
 def initialize_vertex_client():
     """
@@ -21,11 +21,8 @@ def initialize_vertex_client():
         raise ValueError("GCP_PROJECT_ID environment variable is not set")
     
     try:
-        client = genai.Client(
-            vertexai=True, 
-            project=PROJECT_ID, 
-            location=LOCATION
-        )
+        # Shared per (project, location) so every highlight step reuses one client.
+        client = get_genai_client(PROJECT_ID, LOCATION)
         print("Successfully initialized Vertex AI client")
         return client
     except Exception as e:
@@ -1,14 +1,16 @@
 #Required Imports
-import moviepy as mp
-import os
-from moviepy import VideoFileClip, concatenate_videoclips
 from typing import List, Optional
 
+from .clip_cutter import concat_pieces
+
 
 def create_final_highlight_reel(segment_paths: List[str], output_path: str = "highlight_reel.mp4") -> Optional[str]:
     """
     Create a highlight reel by concatenating video segments.
 
+    The segments are joined with ffmpeg's concat demuxer without re-encoding, so they
+    must share codecs, as the pieces written by clip_cutter.cut_segments do.
+
     Args:
         segment_paths (List[str]): List of file paths to the video segments.
         output_path (str): File path to save the final highlight reel. Defaults to "highlight_reel.mp4".
@@ -17,18 +19,11 @@ def create_final_highlight_reel(segment_paths: List[str], output_path: str = "hi
         str: Path to the created highlight reel video file.
     """
     try:
-        clips = [VideoFileClip(path) for path in segment_paths]
-        final_clip = concatenate_videoclips(clips, method="chain")
-        final_clip.write_videofile(output_path, codec="libx264", audio_codec="aac")
-
-        # Close all clips to release resources
-        for clip in clips:
-            clip.close()
-        final_clip.close()
+        concat_pieces(segment_paths, output_path)
 
         print(f"Highlight reel created at: {output_path}")
         return output_path
 
     except Exception as e:
         print(f"Error creating highlight reel: {e}")
-        return None
\ No newline at end of file
+        return None
@@ -2,24 +2,54 @@
 
 import os
 import json
+import time
 import base64
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
 
-from google import genai
+from google.cloud import firestore
 from google.genai import types
 
 from flask import Flask, request
 
 from common.media_asset_manager import MediaAssetManager
 from common.logging_config import configure_logger
-from common.content_classifier import classify_content
+from common.content_classifier import get_or_classify_content, DEFAULT_GENRE, VALID_GENRES
+from common.llm_usage import log_usage
+from common.context_cache import VideoContextCache, build_cached_request, is_cache_miss
+from common.genai_client import get_genai_client
+from common.result_cache import ResultCache, prompt_fingerprint
+from common.streaming_json import IncrementalObjectParser, FIELD
+from common.debounced_writer import DebouncedAssetUpdater
+from common.generation_policy import get_generation_policy, asset_duration_seconds
+from common.media_sampling import media_resolution, is_sampled, video_part
 from .structured_output_schema import (
     SUMMARY_SCHEMA,
     KEY_SECTIONS_SCHEMA,
     ASSET_CATEGORIZATION_SCHEMA,
+    FUSED_SCHEMA,
+    REDUCE_SUMMARY_SCHEMA,
+)
+from .prompts import (
+    get_summary_prompts,
+    get_sections_prompts,
+    get_categorization_prompts,
+    get_fused_prompts,
+    get_window_prompt,
+    get_reduce_summary_prompts,
+    PROMPT_VERSION,
+)
+from .map_reduce import (
+    ChunkResultStore,
+    plan_windows,
+    format_timestamp,
+    rebase_sections,
+    merge_sections,
+    merge_people,
+    merge_topics,
+    merge_categorizations,
 )
-from .prompts import get_summary_prompts, get_sections_prompts, get_categorization_prompts
 
 # Configure logger for the service
 configure_logger()
@@ -32,6 +62,55 @@ location = os.environ.get("GCP_REGION", "us-central1")
 asset_manager = MediaAssetManager(project_id=project_id)
 llm_model = os.environ.get("LLM_MODEL", "gemini-2.5-flash")
 
+# Summary, key sections and categorization are independent calls over the same
+# video. "concurrent" runs them in parallel, "sequential" keeps the original order.
+summary_execution_mode = os.environ.get("SUMMARY_EXECUTION_MODE", "concurrent").lower()
+# Upper bound of in-flight Gemini calls for this instance. The executor is shared
+# by all gunicorn threads so a busy instance queues work instead of exceeding quota.
+max_concurrent_llm_calls = int(os.environ.get("SUMMARY_MAX_CONCURRENT_CALLS", "3"))
+# Per-call timeout applied to every Gemini request, in seconds.
+llm_call_timeout_seconds = float(os.environ.get("SUMMARY_CALL_TIMEOUT_SECONDS", "900"))
+llm_executor = ThreadPoolExecutor(
+    max_workers=max_concurrent_llm_calls, thread_name_prefix="summary-llm"
+)
+# "split" classifies the genre and runs three calls; "fused" sends the video once
+# with a merged schema and splits the response into the same Firestore fields.
+summary_generation_mode = os.environ.get("SUMMARY_GENERATION_MODE", "split").lower()
+# Streams Gemini responses and writes completed fields to the summary as they arrive.
+summary_streaming = os.environ.get("SUMMARY_STREAMING", "false").lower() == "true"
+# Minimum seconds between two partial writes of the same asset.
+summary_stream_write_interval_seconds = float(
+    os.environ.get("SUMMARY_STREAM_WRITE_INTERVAL_SECONDS", "5")
+)
+# Number of key sections pushed individually before the sections list is complete.
+summary_stream_max_sections = int(os.environ.get("SUMMARY_STREAM_MAX_SECTIONS", "10"))
+# Assets at least this long (video_details.duration) are summarized window by
+# window and the window results merged. 0 disables the map-reduce mode.
+summary_map_reduce_min_duration_seconds = float(
+    os.environ.get("SUMMARY_MAP_REDUCE_MIN_DURATION_SECONDS", "5400")
+)
+summary_window_seconds = float(os.environ.get("SUMMARY_WINDOW_SECONDS", "1800"))
+summary_window_overlap_seconds = float(os.environ.get("SUMMARY_WINDOW_OVERLAP_SECONDS", "60"))
+# Window results are stored so a redelivered message only runs the missing windows.
+chunk_store = ChunkResultStore(asset_manager)
+
+# Optional content-hash keyed cache of results, so re-ingested media skips Gemini.
+result_cache = (
+    ResultCache(asset_manager.db)
+    if os.environ.get("RESULT_CACHE", "false").lower() == "true"
+    else None
+)
+
+# Optional shared Gemini context cache for the asset's video. Cached content lives
+# in a regional endpoint, so the cache gets its own client bound to that location.
+context_cache = None
+if os.environ.get("GEMINI_CONTEXT_CACHE", "false").lower() == "true":
+    context_cache = VideoContextCache(
+        get_genai_client(project_id, os.environ.get("GEMINI_CACHE_LOCATION", location)),
+        asset_manager,
+        ttl_seconds=int(os.environ.get("GEMINI_CONTEXT_CACHE_TTL_SECONDS", "3600")),
+    )
+
 app = Flask(__name__)
 
 
@@ -42,6 +121,12 @@ def generate(
     system_instruction_text,
     response_schema,
     model_name=llm_model,
+    stage="summaries",
+    asset_id=None,
+    on_stream_event=None,
+    content_genre=None,
+    video_window=None,
+    duration_seconds=None,
 ) -> str:
     """ "
     Common function that will execute the prompts as per the inputs and return the
@@ -49,70 +134,150 @@ def generate(
     Args:
         prompt_text (str): The text prompt for the model.
         video_uri (str): The GCS URI of the video file (e.g., "gs://your-bucket/your-video.mp4").
+            None sends a text-only request.
         source (str): The source of the video, e.g., "GCS" or "youtube".
         system_instruction_text (str): The system instruction for the model.
         model_name (str): The name of the generative model to use (default: "gemini-2.5-pro").
+            The generation policy may route the call to a different model.
+        stage (str): Name of the calling stage, used for usage and latency logging
+            and as the generation policy task.
+        asset_id (str): The asset being processed. Required to use the shared context cache.
+        on_stream_event (callable): When given, the response is streamed and called with
+            (event, key, value) for every JSON member completed so far. When it has a
+            `for_call()` method, each model call streams to the callback it returns.
+        content_genre (str): The content genre, used by the generation policy.
+        video_window (tuple): (start, end) offsets in seconds to restrict the call to.
+        duration_seconds (float): Media duration for the generation policy, if known.
+            A video_window's own length is used instead.
     Returns:
         str: The generated text response from the model.
 
     """
-    logger.info(f"Using model: {model_name}")
-    client = genai.Client(
-        vertexai=True,
-        project=project_id,
-        location="global",
+    if video_window:
+        duration_seconds = video_window[1] - video_window[0]
+    policy = get_generation_policy().decide(
+        stage, model_name, duration_seconds, content_genre, asset_id
     )
+    model_name = policy["model"]
+    logger.info(f"Using model: {model_name}")
+    client = get_genai_client(project_id, "global")
 
-    msg1_text1 = types.Part.from_text(text=prompt_text)
+    mime_type = "video/youtube" if source == "youtube" else "video/*"
 
-    if source == "youtube":
-        msg1_video1 = types.Part.from_uri(
-            file_uri=video_uri, mime_type="video/youtube"
-        )
-    else:  # Default to GCS
-        msg1_video1 = types.Part.from_uri(
-            file_uri=video_uri, mime_type="video/*"
+    # The cached video is tokenized at full fidelity, so sampled and windowed calls
+    # send it inline.
+    cache_name = None
+    if context_cache and asset_id and video_uri and not video_window and not is_sampled(policy):
+        cache_name = context_cache.get_handle(asset_id, video_uri, mime_type, model_name)
+
+    def build_config(cached_content=None):
+        return types.GenerateContentConfig(
+            temperature=1,
+            top_p=1,
+            seed=0,
+            max_output_tokens=policy["max_output_tokens"],
+            media_resolution=media_resolution(policy),
+            response_mime_type="application/json",
+            response_schema=response_schema,
+            safety_settings=[
+                types.SafetySetting(category="HARM_CATEGORY_HATE_SPEECH", threshold="OFF"),
+                types.SafetySetting(
+                    category="HARM_CATEGORY_DANGEROUS_CONTENT", threshold="OFF"
+                ),
+                types.SafetySetting(
+                    category="HARM_CATEGORY_SEXUALLY_EXPLICIT", threshold="OFF"
+                ),
+                types.SafetySetting(category="HARM_CATEGORY_HARASSMENT", threshold="OFF"),
+            ],
+            # Cached requests carry the system instruction as a text part instead.
+            system_instruction=(
+                None if cached_content else [types.Part.from_text(text=system_instruction_text)]
+            ),
+            cached_content=cached_content,
+            thinking_config=types.ThinkingConfig(
+                thinking_budget=policy["thinking_budget"],
+            ),
+            http_options=types.HttpOptions(timeout=int(llm_call_timeout_seconds * 1000)),
         )
 
-    si_text1 = system_instruction_text
+    def call_model(model_client, contents, config):
+        if on_stream_event is None:
+            response = model_client.models.generate_content(
+                model=model_name,
+                contents=contents,
+                config=config,
+            )
+            return response.text, response
 
-    contents = [
-        types.Content(role="user", parts=[msg1_text1, msg1_video1]),
-    ]
+        # Stream the response and report JSON members as soon as they are complete.
+        # A retried call streams the whole response again, so each call gets its own callback.
+        emit = on_stream_event.for_call() if hasattr(on_stream_event, "for_call") else on_stream_event
+        parser = IncrementalObjectParser()
+        text_chunks = []
+        response = None
+        for response in model_client.models.generate_content_stream(
+            model=model_name,
+            contents=contents,
+            config=config,
+        ):
+            chunk_text = response.text or ""
+            text_chunks.append(chunk_text)
+            if parser is None:
+                continue
+            try:
+                for event in parser.feed(chunk_text):
+                    emit(*event)
+            except Exception:
+                # Partial updates are best effort; the full response is still used.
+                logger.warning("Stopped streaming partial results for stage %s", stage, exc_info=True)
+                parser = None
+        # The last chunk carries the usage metadata of the whole call.
+        return "".join(text_chunks), response
 
-    generate_content_config = types.GenerateContentConfig(
-        temperature=1,
-        top_p=1,
-        seed=0,
-        max_output_tokens=65535,
-        response_mime_type="application/json",
-        response_schema=response_schema,
-        safety_settings=[
-            types.SafetySetting(category="HARM_CATEGORY_HATE_SPEECH", threshold="OFF"),
-            types.SafetySetting(
-                category="HARM_CATEGORY_DANGEROUS_CONTENT", threshold="OFF"
-            ),
-            types.SafetySetting(
-                category="HARM_CATEGORY_SEXUALLY_EXPLICIT", threshold="OFF"
-            ),
-            types.SafetySetting(category="HARM_CATEGORY_HARASSMENT", threshold="OFF"),
-        ],
-        system_instruction=[types.Part.from_text(text=si_text1)],
-        thinking_config=types.ThinkingConfig(
-            thinking_budget=-1,
-        ),
-    )
+    started = time.monotonic()
+    response = None
+    if cache_name:
+        try:
+            response_text, response = call_model(
+                context_cache.client,
+                build_cached_request(system_instruction_text, prompt_text),
+                build_config(cache_name),
+            )
+        except Exception as e:
+            if not is_cache_miss(e, cache_name):
+                raise
+            # The handle expired or was evicted; delete it and send the video inline.
+            logger.warning(
+                "Cached content %s is gone for asset %s, falling back to inline video",
+                cache_name,
+                asset_id,
+                exc_info=True,
+                extra={"extra_fields": {"asset_id": asset_id, "cache_name": cache_name}},
+            )
+            context_cache.evict(asset_id, model_name)
 
-    response = client.models.generate_content(
-        model=model_name,
-        contents=contents,
-        config=generate_content_config,
-    )
+    if response is None:
+        parts = [types.Part.from_text(text=prompt_text)]
+        if video_uri:
+            parts.append(video_part(video_uri, mime_type, policy.get("fps"), video_window))
+        contents = [
+            types.Content(role="user", parts=parts),
+        ]
+        response_text, response = call_model(client, contents, build_config())
+    log_usage(stage, model_name, response, time.monotonic() - started, asset_id)
 
-    return response.text
+    return response_text
 
 
-def generate_summary(asset_id: str, file_location: str, source: str, content_genre: str = "entertainment") -> dict:
+def generate_summary(
+    asset_id: str,
+    file_location: str,
+    source: str,
+    content_genre: str = "entertainment",
+    on_stream_event=None,
+    video_window=None,
+    duration_seconds=None,
+) -> dict:
     """
     Generates a summary for a media asset using GenAI models.
 
@@ -121,6 +286,9 @@ def generate_summary(asset_id: str, file_location: str, source: str, content_gen
         file_location (str): GCS URI of the media file.
         source (str): The source of the media file (e.g., "GCS", "youtube").
         content_genre (str): The content genre for prompt selection.
+        on_stream_event (callable): Optional callback for streamed partial results.
+        video_window (tuple): Optional (start, end) offsets in seconds of a long video.
+        duration_seconds (float): Media duration for the generation policy, if known.
     Returns:
         dict: A dictionary containing the result of the summary prompt,
               or an error dictionary if generation fails.
@@ -130,6 +298,8 @@ def generate_summary(asset_id: str, file_location: str, source: str, content_gen
     raw_response = ""
     try:
         system_instructions_text, prompt = get_summary_prompts(content_genre)
+        if video_window:
+            prompt = get_window_prompt(prompt, *map(format_timestamp, video_window))
         raw_response = generate(
             prompt,
             file_location,
@@ -137,6 +307,12 @@ def generate_summary(asset_id: str, file_location: str, source: str, content_gen
             system_instructions_text,
             SUMMARY_SCHEMA,
             model_name=llm_model,
+            stage="summary",
+            asset_id=asset_id,
+            on_stream_event=on_stream_event,
+            content_genre=content_genre,
+            video_window=video_window,
+            duration_seconds=duration_seconds,
         )
         summary_data = json.loads(raw_response)
 
@@ -165,7 +341,15 @@ def generate_summary(asset_id: str, file_location: str, source: str, content_gen
         return {"error": f"Failed to process with Gemini: {str(e)}"}
 
 
-def generate_key_sections(asset_id: str, file_location: str, source: str, content_genre: str = "entertainment") -> dict:
+def generate_key_sections(
+    asset_id: str,
+    file_location: str,
+    source: str,
+    content_genre: str = "entertainment",
+    on_stream_event=None,
+    video_window=None,
+    duration_seconds=None,
+) -> dict:
     """
     Generates key sections for a media asset using GenAI models.
 
@@ -174,6 +358,9 @@ def generate_key_sections(asset_id: str, file_location: str, source: str, conten
         file_location (str): GCS URI of the media file.
         source (str): The source of the media file (e.g., "GCS", "youtube").
         content_genre (str): The content genre for prompt selection.
+        on_stream_event (callable): Optional callback for streamed partial results.
+        video_window (tuple): Optional (start, end) offsets in seconds of a long video.
+        duration_seconds (float): Media duration for the generation policy, if known.
     Returns:
         dict: A dictionary containing the result of the key sections prompt,
               or an error dictionary if generation fails.
@@ -183,6 +370,8 @@ def generate_key_sections(asset_id: str, file_location: str, source: str, conten
     raw_response = ""
     try:
         system_instruction_text, prompt_content = get_sections_prompts(content_genre)
+        if video_window:
+            prompt_content = get_window_prompt(prompt_content, *map(format_timestamp, video_window))
         # Define a specific model so that the default one is not used
         raw_response = generate(
             prompt_content,
@@ -191,6 +380,12 @@ def generate_key_sections(asset_id: str, file_location: str, source: str, conten
             system_instruction_text,
             KEY_SECTIONS_SCHEMA,
             model_name=llm_model,
+            stage="key_sections",
+            asset_id=asset_id,
+            on_stream_event=on_stream_event,
+            content_genre=content_genre,
+            video_window=video_window,
+            duration_seconds=duration_seconds,
         )
         key_sections_data = json.loads(raw_response)
 
@@ -220,7 +415,13 @@ def generate_key_sections(asset_id: str, file_location: str, source: str, conten
 
 
 def generate_asset_categorization(
-    asset_id: str, file_location: str, source: str, content_genre: str = "entertainment"
+    asset_id: str,
+    file_location: str,
+    source: str,
+    content_genre: str = "entertainment",
+    on_stream_event=None,
+    video_window=None,
+    duration_seconds=None,
 ) -> dict:
     """
     Generates Detailed Categorization for a media asset using GenAI models.
@@ -230,6 +431,9 @@ def generate_asset_categorization(
         file_location (str): GCS URI of the media file.
         source (str): The source of the media file (e.g., "GCS", "youtube").
         content_genre (str): The content genre for prompt selection.
+        on_stream_event (callable): Optional callback for streamed partial results.
+        video_window (tuple): Optional (start, end) offsets in seconds of a long video.
+        duration_seconds (float): Media duration for the generation policy, if known.
     Returns:
         dict: A dictionary containing the result of the categorizations prompt,
               or an error dictionary if generation fails.
@@ -241,6 +445,8 @@ def generate_asset_categorization(
     raw_response = ""
     try:
         system_instruction_text, prompt_content = get_categorization_prompts(content_genre)
+        if video_window:
+            prompt_content = get_window_prompt(prompt_content, *map(format_timestamp, video_window))
         # Define a specific model so that the default one is not used
         raw_response = generate(
             prompt_content,
@@ -249,6 +455,12 @@ def generate_asset_categorization(
             system_instruction_text,
             ASSET_CATEGORIZATION_SCHEMA,
             model_name=llm_model,
+            stage="categorization",
+            asset_id=asset_id,
+            on_stream_event=on_stream_event,
+            content_genre=content_genre,
+            video_window=video_window,
+            duration_seconds=duration_seconds,
         )
         detailed_categorization_data = json.loads(raw_response)
 
@@ -277,6 +489,578 @@ def generate_asset_categorization(
         return {"error": f"Failed to process with Gemini: {str(e)}"}
 
 
+def generate_fused(
+    asset_id: str, file_location: str, source: str, on_stream_event=None, duration_seconds=None
+) -> dict:
+    """
+    Generates genre, summary, key sections and categorization in a single Gemini call.
+
+    Args:
+        asset_id (str): The ID of the asset.
+        file_location (str): GCS URI of the media file.
+        source (str): The source of the media file (e.g., "GCS", "youtube").
+        on_stream_event (callable): Optional callback for streamed partial results.
+        duration_seconds (float): Media duration for the generation policy, if known.
+    Returns:
+        dict: The parsed fused response, or an error dictionary if generation fails.
+    """
+    log_extra = {"extra_fields": {"asset_id": asset_id, "file_location": file_location}}
+    logger.info("Generating fused metadata for asset: %s", asset_id, extra=log_extra)
+    raw_response = ""
+    try:
+        system_instruction_text, prompt_content = get_fused_prompts()
+        raw_response = generate(
+            prompt_content,
+            file_location,
+            source,
+            system_instruction_text,
+            FUSED_SCHEMA,
+            model_name=llm_model,
+            stage="fused",
+            asset_id=asset_id,
+            on_stream_event=on_stream_event,
+            duration_seconds=duration_seconds,
+        )
+        fused_data = json.loads(raw_response)
+
+        logger.info(
+            "Successfully generated fused metadata for asset %s",
+            asset_id,
+            extra=log_extra,
+        )
+        return fused_data
+    except json.JSONDecodeError:
+        logger.error(
+            "Failed to decode JSON for fused metadata on asset %s. Raw response: %s",
+            asset_id,
+            raw_response,
+            exc_info=True,
+            extra=log_extra,
+        )
+        return {"error": f"Malformed JSON response from model: {raw_response}"}
+    except Exception as e:
+        logger.error(
+            "Failed to generate fused metadata for asset %s",
+            asset_id,
+            exc_info=True,
+            extra=log_extra,
+        )
+        return {"error": f"Failed to process with Gemini: {str(e)}"}
+
+
+def split_fused_response(fused_data: dict) -> tuple:
+    """
+    Splits a fused response into the per-stage results produced by split mode.
+
+    A stage whose fields are all missing from the response is reported as an error,
+    so the usual partial-success handling applies to the fused call as well.
+
+    Args:
+        fused_data (dict): The output of generate_fused.
+    Returns:
+        tuple: (content_genre, results) where results is keyed by stage name.
+               content_genre is None when the fused call failed or returned no
+               valid genre.
+    """
+    if "error" in fused_data:
+        error = {"error": fused_data["error"]}
+        return None, {stage: error for stage in SUMMARY_STAGES}
+
+    content_genre = fused_data.get("content_genre")
+    if content_genre not in VALID_GENRES:
+        content_genre = None
+
+    stage_schemas = {
+        "summary": SUMMARY_SCHEMA,
+        "key_sections": KEY_SECTIONS_SCHEMA,
+        "categorization": ASSET_CATEGORIZATION_SCHEMA,
+    }
+    results = {}
+    for stage, schema in stage_schemas.items():
+        stage_data = {
+            key: fused_data[key] for key in schema["properties"] if key in fused_data
+        }
+        results[stage] = stage_data or {"error": "Fused response did not contain this stage"}
+    return content_genre, results
+
+
+def fused_response_complete(fused_data: dict) -> bool:
+    """Returns True when a fused response has a valid genre and every stage; only those are cached."""
+    content_genre, results = split_fused_response(fused_data)
+    return content_genre is not None and not any("error" in result for result in results.values())
+
+
+def stage_prompt_version(stage: str, content_genre: str) -> str:
+    """
+    Returns the fingerprint of the prompts and schema a stage uses for a genre.
+
+    Used in result cache keys, so editing a prompt or schema invalidates the
+    cached results of that stage only. The generation policy fingerprint is
+    included because it can change the model and its budgets.
+    """
+    if stage == "fused":
+        system_instruction_text, prompt_text = get_fused_prompts()
+        schema = FUSED_SCHEMA
+    else:
+        prompt_getter, schema = STAGE_PROMPT_SOURCES[stage]
+        system_instruction_text, prompt_text = prompt_getter(content_genre)
+    return prompt_fingerprint(
+        PROMPT_VERSION,
+        system_instruction_text,
+        prompt_text,
+        json.dumps(schema, sort_keys=True),
+        get_generation_policy().fingerprint,
+    )
+
+
+def _run_timed_stage(
+    stage,
+    stage_fn,
+    asset_id,
+    file_location,
+    source,
+    content_genre,
+    content_hash=None,
+    on_stream_event=None,
+    duration_seconds=None,
+):
+    """
+    Runs a single generation stage and measures how long it took.
+
+    When the result cache is enabled and the media content hash is known, a cached
+    result for the same media, prompts and model is returned instead of calling Gemini.
+
+    Returns:
+        tuple: (result dict, elapsed seconds). Unexpected exceptions are converted
+               into an error dictionary so one stage never aborts the others.
+    """
+    started = time.monotonic()
+    try:
+        if result_cache:
+            result = result_cache.get_or_compute(
+                content_hash,
+                stage,
+                stage_prompt_version(stage, content_genre),
+                llm_model,
+                lambda: stage_fn(
+                    asset_id,
+                    file_location,
+                    source,
+                    content_genre,
+                    on_stream_event,
+                    duration_seconds=duration_seconds,
+                ),
+                asset_id=asset_id,
+            )
+        else:
+            result = stage_fn(
+                asset_id,
+                file_location,
+                source,
+                content_genre,
+                on_stream_event,
+                duration_seconds=duration_seconds,
+            )
+    except Exception as e:
+        logger.error(
+            "Unexpected failure in stage %s for asset %s",
+            stage_fn.__name__,
+            asset_id,
+            exc_info=True,
+            extra={"extra_fields": {"asset_id": asset_id}},
+        )
+        result = {"error": f"Failed to process with Gemini: {str(e)}"}
+    return result, round(time.monotonic() - started, 3)
+
+
+# Stage name -> generation function. Stage names are used for latency reporting
+# and as result cache task names.
+SUMMARY_STAGES = {
+    "summary": generate_summary,
+    "key_sections": generate_key_sections,
+    "categorization": generate_asset_categorization,
+}
+
+# Stage name -> (prompt getter, schema), used to fingerprint cached results.
+STAGE_PROMPT_SOURCES = {
+    "summary": (get_summary_prompts, SUMMARY_SCHEMA),
+    "key_sections": (get_sections_prompts, KEY_SECTIONS_SCHEMA),
+    "categorization": (get_categorization_prompts, ASSET_CATEGORIZATION_SCHEMA),
+}
+
+
+def run_summary_stages(
+    asset_id: str,
+    file_location: str,
+    source: str,
+    content_genre: str,
+    content_hash: str = None,
+    on_stream_event=None,
+    duration_seconds: float = None,
+) -> tuple:
+    """
+    Executes the summary, key sections and categorization stages for an asset.
+
+    In "concurrent" mode the stages are submitted to the shared, bounded executor;
+    otherwise they run one after another on the request thread.
+
+    Args:
+        asset_id (str): The ID of the asset.
+        file_location (str): GCS URI of the media file.
+        source (str): The source of the media file (e.g., "GCS", "youtube").
+        content_genre (str): The content genre for prompt selection.
+        content_hash (str): Content hash of the media, enables the result cache.
+        on_stream_event (callable): Optional callback for streamed partial results.
+        duration_seconds (float): Media duration for the generation policy, if known.
+    Returns:
+        tuple: (results, latencies) where both are dictionaries keyed by stage name.
+    """
+    log_extra = {"extra_fields": {"asset_id": asset_id, "file_location": file_location}}
+    results = {}
+    latencies = {}
+
+    if summary_execution_mode == "concurrent":
+        futures = {
+            stage: llm_executor.submit(
+                _run_timed_stage,
+                stage,
+                stage_fn,
+                asset_id,
+                file_location,
+                source,
+                content_genre,
+                content_hash,
+                on_stream_event,
+                duration_seconds,
+            )
+            for stage, stage_fn in SUMMARY_STAGES.items()
+        }
+        for stage, future in futures.items():
+            results[stage], latencies[stage] = future.result()
+    else:
+        for stage, stage_fn in SUMMARY_STAGES.items():
+            results[stage], latencies[stage] = _run_timed_stage(
+                stage,
+                stage_fn,
+                asset_id,
+                file_location,
+                source,
+                content_genre,
+                content_hash,
+                on_stream_event,
+                duration_seconds,
+            )
+
+    for stage, elapsed in latencies.items():
+        logger.info(
+            "Stage '%s' for asset %s took %.3fs",
+            stage,
+            asset_id,
+            elapsed,
+            extra={
+                "extra_fields": {
+                    **log_extra["extra_fields"],
+                    "stage": stage,
+                    "latency_seconds": elapsed,
+                    "execution_mode": summary_execution_mode,
+                }
+            },
+        )
+    return results, latencies
+
+
+def reduce_window_summaries(
+    asset_id: str,
+    source: str,
+    content_genre: str,
+    windows: list,
+    window_results: list,
+    duration_seconds: float = None,
+) -> dict:
+    """
+    Combines the summaries of all windows into the summary of the whole asset.
+
+    The prose fields come from a text-only Gemini call over the window summaries;
+    people and subject topics are deduplicated across windows without a model call.
+
+    Args:
+        asset_id (str): The ID of the asset.
+        source (str): The source of the media file (e.g., "GCS", "youtube").
+        content_genre (str): The content genre of the asset.
+        windows (list): (start, end) offsets of the windows, in order.
+        window_results (list): The summary result of each window.
+        duration_seconds (float): Media duration for the generation policy, if known.
+    Returns:
+        dict: The merged summary, or an error dictionary if the reduce call fails.
+    """
+    window_summaries = json.dumps(
+        [
+            {
+                "start": format_timestamp(start),
+                "end": format_timestamp(end),
+                "summary": result.get("summary"),
+                "itemized_summary": result.get("itemized_summary"),
+            }
+            for (start, end), result in zip(windows, window_results)
+        ],
+        ensure_ascii=False,
+        indent=1,
+    )
+    raw_response = ""
+    try:
+        system_instruction_text, prompt_content = get_reduce_summary_prompts(
+            content_genre, window_summaries
+        )
+        raw_response = generate(
+            prompt_content,
+            None,
+            source,
+            system_instruction_text,
+            REDUCE_SUMMARY_SCHEMA,
+            model_name=llm_model,
+            stage="summary_reduce",
+            asset_id=asset_id,
+            content_genre=content_genre,
+            duration_seconds=duration_seconds,
+        )
+        reduced = json.loads(raw_response)
+    except Exception as e:
+        logger.error(
+            "Failed to reduce window summaries for asset %s. Raw response: %s",
+            asset_id,
+            raw_response,
+            exc_info=True,
+            extra={"extra_fields": {"asset_id": asset_id}},
+        )
+        return {"error": f"Failed to combine window summaries: {str(e)}"}
+
+    reduced["subject_topics"] = merge_topics([r.get("subject_topics") for r in window_results])
+    reduced["people"] = merge_people([r.get("people") for r in window_results])
+    return reduced
+
+
+def map_reduce_prompt_version(stage: str, content_genre: str) -> str:
+    """
+    Returns the fingerprint of a stage's map-reduce result for a genre.
+
+    Besides the stage prompts it covers the window prompt, the reduce prompts and
+    the window settings, which all change the merged result.
+    """
+    parts = [
+        stage_prompt_version(stage, content_genre),
+        get_window_prompt("", "{start}", "{end}"),
+        summary_window_seconds,
+        summary_window_overlap_seconds,
+    ]
+    if stage == "summary":
+        parts += [
+            *get_reduce_summary_prompts(content_genre, ""),
+            json.dumps(REDUCE_SUMMARY_SCHEMA, sort_keys=True),
+        ]
+    return prompt_fingerprint(*parts)
+
+
+def run_map_reduce_stages(
+    asset_id: str,
+    file_location: str,
+    source: str,
+    content_genre: str,
+    duration_seconds: float,
+    content_hash: str = None,
+) -> tuple:
+    """
+    Executes the summary stages of a long asset window by window and merges them.
+
+    Map: every stage runs on every overlapping window of the video. All window
+    calls are submitted directly to the shared, bounded executor (or run one after
+    another in "sequential" mode), so the parallelism stays within the instance's
+    Gemini call limit. Successful window results are stored and reused when the
+    same message is processed again.
+
+    Reduce: section timestamps are rebased to asset time and merged, people,
+    topics and categorizations are deduplicated, and the window summaries are
+    combined by a text-only call. A stage fails if any of its windows failed;
+    processing the asset again only reruns the failed windows.
+
+    When the result cache is enabled, the merged result of each stage is cached
+    like the single-pass results, so a re-ingested asset skips the windows of the
+    stages already computed for the same media.
+
+    Args:
+        asset_id (str): The ID of the asset.
+        file_location (str): GCS URI of the media file.
+        source (str): The source of the media file (e.g., "GCS", "youtube").
+        content_genre (str): The content genre for prompt selection.
+        duration_seconds (float): Duration of the media.
+        content_hash (str): Content hash of the media, part of the stored results' fingerprint.
+    Returns:
+        tuple: (results, latencies) keyed by stage name, like run_summary_stages.
+    """
+    log_extra = {"extra_fields": {"asset_id": asset_id, "file_location": file_location}}
+    windows = plan_windows(duration_seconds, summary_window_seconds, summary_window_overlap_seconds)
+    logger.info(
+        "Summarizing asset %s (%.0fs) in %d windows",
+        asset_id,
+        duration_seconds,
+        len(windows),
+        extra=log_extra,
+    )
+
+    def run_window(stage, window):
+        fingerprint = prompt_fingerprint(
+            stage_prompt_version(stage, content_genre), llm_model, file_location, content_hash or ""
+        )
+        stored = chunk_store.get(asset_id, stage, window, fingerprint)
+        if stored is not None:
+            return stored
+        try:
+            result = SUMMARY_STAGES[stage](asset_id, file_location, source, content_genre, None, window)
+        except Exception as e:
+            logger.error(
+                "Unexpected failure in stage %s for window %s of asset %s",
+                stage,
+                window,
+                asset_id,
+                exc_info=True,
+                extra=log_extra,
+            )
+            result = {"error": f"Failed to process with Gemini: {str(e)}"}
+        if "error" not in result:
+            chunk_store.put(asset_id, stage, window, fingerprint, result)
+        return result
+
+    def map_reduce(stage):
+        started = time.monotonic()
+        if summary_execution_mode == "concurrent":
+            futures = [llm_executor.submit(run_window, stage, window) for window in windows]
+            stage_results = [future.result() for future in futures]
+        else:
+            stage_results = [run_window(stage, window) for window in windows]
+        map_seconds = round(time.monotonic() - started, 3)
+
+        started = time.monotonic()
+        failed = [
+            format_timestamp(window[0])
+            for window, result in zip(windows, stage_results)
+            if "error" in result
+        ]
+        if failed:
+            result = {
+                "error": f"{len(failed)} of {len(windows)} windows failed (starting at {', '.join(failed)}): "
+                + next(result["error"] for result in stage_results if "error" in result)
+            }
+        elif stage == "summary":
+            result = reduce_window_summaries(
+                asset_id, source, content_genre, windows, stage_results, duration_seconds
+            )
+        elif stage == "key_sections":
+            result = {
+                "sections": merge_sections(
+                    [rebase_sections(r.get("sections"), w) for w, r in zip(windows, stage_results)],
+                    windows,
+                )
+            }
+        else:
+            result = merge_categorizations(stage_results)
+        reduce_seconds = round(time.monotonic() - started, 3)
+        logger.info(
+            "Map-reduce of stage '%s' for asset %s took %.3fs (map) and %.3fs (reduce)",
+            stage,
+            asset_id,
+            map_seconds,
+            reduce_seconds,
+            extra={
+                "extra_fields": {
+                    **log_extra["extra_fields"],
+                    "stage": stage,
+                    "windows": len(windows),
+                    "latency_seconds": {"map": map_seconds, "reduce": reduce_seconds},
+                    "execution_mode": summary_execution_mode,
+                }
+            },
+        )
+        return result
+
+    def run_stage(stage):
+        started = time.monotonic()
+        if result_cache:
+            result = result_cache.get_or_compute(
+                content_hash,
+                f"{stage}_map_reduce",
+                map_reduce_prompt_version(stage, content_genre),
+                llm_model,
+                lambda: map_reduce(stage),
+                asset_id=asset_id,
+            )
+        else:
+            result = map_reduce(stage)
+        return result, round(time.monotonic() - started, 3)
+
+    results = {}
+    latencies = {}
+    if summary_execution_mode == "concurrent":
+        # The stage threads only wait for their window calls, which the shared executor bounds.
+        with ThreadPoolExecutor(max_workers=len(SUMMARY_STAGES), thread_name_prefix="summary-stage") as stages:
+            futures = {stage: stages.submit(run_stage, stage) for stage in SUMMARY_STAGES}
+            for stage, future in futures.items():
+                results[stage], latencies[stage] = future.result()
+    else:
+        for stage in SUMMARY_STAGES:
+            results[stage], latencies[stage] = run_stage(stage)
+    return results, latencies
+
+
+class PartialSummaryHandler:
+    """
+    Streaming callback that pushes completed summary fields to Firestore.
+
+    Completed top-level fields are written as they finish, and the first
+    `summary_stream_max_sections` key sections are written one by one before the
+    sections array is complete. All writes go through the debounced updater.
+
+    generate() takes a fresh callback from `for_call` for every model call, so a
+    call retrying a failed one rewrites the sections instead of appending them
+    again. `streamed_keys` lists every field written so far, so the final update
+    can remove those of a stage that did not succeed.
+    """
+
+    def __init__(self, updater: DebouncedAssetUpdater):
+        """
+        Args:
+            updater (DebouncedAssetUpdater): Updater for the asset's summary section.
+        """
+        self.updater = updater
+        self.streamed_keys = set()
+
+    def for_call(self):
+        """Returns the on_stream_event callback of one model call."""
+        streamed_sections = []
+
+        def on_stream_event(event, key, value):
+            if key == "content_genre":
+                return
+            if event == FIELD:
+                self.streamed_keys.add(key)
+                self.updater.update({key: value})
+            elif key == "sections" and len(streamed_sections) < summary_stream_max_sections:
+                self.streamed_keys.add(key)
+                streamed_sections.append(value)
+                self.updater.update({"sections": list(streamed_sections)})
+
+        return on_stream_event
+
+    def stale_fields(self, final_fields: dict) -> dict:
+        """
+        Returns deletes for the streamed fields missing from the final update.
+
+        Args:
+            final_fields (dict): The fields of the successful stages.
+        Returns:
+            dict: DELETE_FIELD for every streamed key not in final_fields.
+        """
+        return {key: firestore.DELETE_FIELD for key in self.streamed_keys - final_fields.keys()}
+
+
 @app.route("/", methods=["POST"])
 def handle_message():
     """
@@ -291,6 +1075,8 @@ def handle_message():
 
     pubsub_message = request_json["message"]
     asset_id = None  # Initialize asset_id for error logging
+    partial_updater = None
+    on_stream_event = None
 
     try:
         # Extract basic information from message
@@ -346,24 +1132,87 @@ def handle_message():
             asset_id, "summary", {"status": "processing"}
         )
 
-        # Classify content genre for prompt selection
-        content_genre = classify_content(file_location, source, project_id, llm_model)
-        logger.info(
-            "Content genre for asset %s: %s", asset_id, content_genre, extra=log_extra
-        )
-        # Store content genre in video_details
-        asset_manager.update_asset_metadata(
-            asset_id, "video_details", {"content_genre": content_genre}
+        # Content hash of the source media, used to reuse results of earlier ingests.
+        content_hash = result_cache.content_hash(file_location) if result_cache else None
+
+        # Long assets are summarized window by window, in any generation mode.
+        duration_seconds = asset_duration_seconds(asset_data)
+        use_map_reduce = bool(
+            summary_map_reduce_min_duration_seconds
+            and duration_seconds
+            and duration_seconds >= summary_map_reduce_min_duration_seconds
         )
 
-        # Generate both summary from asset
-        summary_results = generate_summary(asset_id, file_location, source, content_genre)
-        # Obtains key sections
-        key_sections_results = generate_key_sections(asset_id, file_location, source, content_genre)
-        # Obtains detailed categorization
-        detailed_categorization_results = generate_asset_categorization(
-            asset_id, file_location, source, content_genre
+        # Push partial results to the summary while the model is still generating.
+        on_stream_event = None
+        if summary_streaming and not use_map_reduce:
+            partial_updater = DebouncedAssetUpdater(
+                asset_manager, asset_id, "summary", summary_stream_write_interval_seconds
+            )
+            on_stream_event = PartialSummaryHandler(partial_updater)
+
+        if summary_generation_mode == "fused" and not use_map_reduce:
+            # One call returns the genre together with every summary field.
+            started = time.monotonic()
+            if result_cache:
+                fused_results = result_cache.get_or_compute(
+                    content_hash,
+                    "fused",
+                    stage_prompt_version("fused", None),
+                    llm_model,
+                    lambda: generate_fused(asset_id, file_location, source, on_stream_event, duration_seconds),
+                    asset_id=asset_id,
+                    cacheable=fused_response_complete,
+                )
+            else:
+                fused_results = generate_fused(asset_id, file_location, source, on_stream_event, duration_seconds)
+            content_genre, stage_results = split_fused_response(fused_results)
+            stage_latencies = {"fused": round(time.monotonic() - started, 3)}
+            # Keep a genre already stored by another service so all services agree on it.
+            stored_genre = (asset_data.get("video_details") or {}).get("content_genre")
+            if content_genre and not stored_genre:
+                asset_manager.update_asset_metadata(
+                    asset_id, "video_details", {"content_genre": content_genre}
+                )
+        else:
+            # Classify content genre for prompt selection, once per asset across services
+            content_genre = get_or_classify_content(
+                asset_manager,
+                asset_id,
+                file_location,
+                source,
+                project_id,
+                llm_model,
+                context_cache,
+                result_cache=result_cache,
+                content_hash=content_hash,
+            ) or DEFAULT_GENRE
+            # Generate summary, key sections and detailed categorization
+            if use_map_reduce:
+                stage_results, stage_latencies = run_map_reduce_stages(
+                    asset_id, file_location, source, content_genre, duration_seconds, content_hash
+                )
+            else:
+                stage_results, stage_latencies = run_summary_stages(
+                    asset_id,
+                    file_location,
+                    source,
+                    content_genre,
+                    content_hash,
+                    on_stream_event,
+                    duration_seconds,
+                )
+
+        if partial_updater:
+            # The final update below supersedes any partial fields still pending.
+            partial_updater.close()
+
+        logger.info(
+            "Content genre for asset %s: %s", asset_id, content_genre, extra=log_extra
         )
+        summary_results = stage_results["summary"]
+        key_sections_results = stage_results["key_sections"]
+        detailed_categorization_results = stage_results["categorization"]
 
         # --- Consolidate results and handle partial failures ---
         combined_results = {}
@@ -426,6 +1275,7 @@ def handle_message():
                 "status": status,
                 **combined_results,
                 "error_message": combined_error_message,
+                "stage_latency_seconds": stage_latencies,
             }
             logger.error(
                 "Summary/sections/categorization generation for asset %s completed with status '%s'. Errors: %s",
@@ -439,6 +1289,7 @@ def handle_message():
                 "status": "completed",
                 **combined_results,
                 "error_message": None,
+                "stage_latency_seconds": stage_latencies,
             }
             logger.info(
                 "Successfully completed summary, key sections, and categorization generation for asset: %s",
@@ -446,7 +1297,12 @@ def handle_message():
                 extra=log_extra,
             )
 
+        if on_stream_event:
+            # Streamed fields of a failed stage must not be shown as final results.
+            update_data.update(on_stream_event.stale_fields(combined_results))
         asset_manager.update_asset_metadata(asset_id, "summary", update_data)
+        if context_cache:
+            context_cache.release(asset_id)
 
         return "", 204
     except Exception as e:
@@ -455,6 +1311,8 @@ def handle_message():
             exc_info=True,
             extra={"extra_fields": {"asset_id": asset_id}},
         )
+        if partial_updater:
+            partial_updater.close()
         if asset_id:
             asset_manager.update_asset_metadata(
                 asset_id,
@@ -462,6 +1320,9 @@ def handle_message():
                 {
                     "status": "failed",
                     "error_message": f"Critical error in service: {str(e)}",
+                    **(on_stream_event.stale_fields({}) if on_stream_event else {}),
                 },
             )
+            if context_cache:
+                context_cache.release(asset_id)
         return "Error processing message, but acknowledging to prevent retries.", 204
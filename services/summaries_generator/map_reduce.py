@@ -0,0 +1,263 @@
+"""Helpers for summarizing long videos window by window and merging the results."""
+
+import logging
+import re
+from collections import Counter
+from typing import List, Optional, Tuple
+
+from google.cloud import firestore
+
+logger = logging.getLogger(__name__)
+
+# Sections of the same type from adjacent windows starting this close together
+# inside the windows' overlap are treated as one moment reported twice.
+SECTION_DEDUPE_TOLERANCE_SECONDS = 30
+
+# Limits of SUMMARY_SCHEMA, kept when merging window results.
+MAX_PEOPLE = 10
+MAX_SUBJECT_TOPICS = 5
+
+
+def plan_windows(duration_seconds: float, window_seconds: float, overlap_seconds: float) -> List[Tuple[int, int]]:
+    """
+    Splits a media duration into overlapping windows.
+
+    Args:
+        duration_seconds (float): Duration of the media.
+        window_seconds (float): Length of each window.
+        overlap_seconds (float): Overlap between consecutive windows.
+
+    Returns:
+        list: (start, end) offsets in whole seconds, covering the whole duration.
+    """
+    step = max(window_seconds - overlap_seconds, 1)
+    windows = []
+    start = 0
+    while True:
+        end = min(start + window_seconds, duration_seconds)
+        windows.append((int(start), int(round(end))))
+        if end >= duration_seconds:
+            return windows
+        start += step
+
+
+def parse_timestamp(value) -> Optional[float]:
+    """Parses "HH:MM:SS", "MM:SS" or plain seconds (with optional fractions) into seconds."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not isinstance(value, str) or not re.fullmatch(r"\s*\d+(:\d+){0,2}(\.\d+)?\s*", value):
+        return None
+    seconds = 0.0
+    for part in value.strip().split(":"):
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+
+def format_timestamp(seconds: float) -> str:
+    """Formats seconds as "HH:MM:SS"."""
+    seconds = int(round(seconds))
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def rebase_sections(sections: list, window: Tuple[int, int]) -> list:
+    """
+    Moves section timestamps from window time to asset time.
+
+    Window calls are asked for timestamps relative to the start of the window, so
+    the window start is added to both ends of every section. Both ends are then
+    clamped to the window; sections left empty (end at or before start) or
+    starting past the window are dropped.
+
+    Args:
+        sections (list): Sections returned for the window.
+        window (tuple): (start, end) of the window in seconds.
+
+    Returns:
+        list: Copies of the sections with "HH:MM:SS" timestamps in asset time.
+    """
+    start, end = window
+    rebased = []
+    for section in sections or []:
+        section = dict(section)
+        times = {}
+        for key in ("start_time", "end_time"):
+            seconds = parse_timestamp(section.get(key))
+            if seconds is None:
+                continue
+            times[key] = min(max(seconds + start, start), end)
+            section[key] = format_timestamp(times[key])
+        section_start = times.get("start_time")
+        section_end = times.get("end_time")
+        if section_start is not None and section_start >= end:
+            continue
+        if section_start is not None and section_end is not None and section_end <= section_start:
+            continue
+        rebased.append(section)
+    return rebased
+
+
+def merge_sections(sections_by_window: list, windows: list) -> list:
+    """
+    Merges the rebased sections of all windows into one chronological list.
+
+    Two adjacent windows both report the moments in their overlap. A section is
+    dropped as such a repeat when a section of the same type from the neighbouring
+    window was kept, both start inside the overlap of the two windows and their
+    starts are within SECTION_DEDUPE_TOLERANCE_SECONDS. Sections from the same
+    window are always kept.
+
+    Args:
+        sections_by_window (list): Lists of rebased sections, in window order.
+        windows (list): (start, end) of each window in seconds, in the same order.
+
+    Returns:
+        list: The merged sections.
+    """
+    def start_of(section):
+        seconds = parse_timestamp(section.get("start_time"))
+        return seconds if seconds is not None else float("inf")
+
+    def in_overlap(seconds, first, second):
+        earlier = min(first, second)
+        return windows[earlier + 1][0] <= seconds <= windows[earlier][1]
+
+    tagged = sorted(
+        (
+            (start_of(section), index, section)
+            for index, sections in enumerate(sections_by_window)
+            for section in sections
+        ),
+        key=lambda item: item[0],
+    )
+    merged = []
+    kept = []  # (start, window index, type) of the merged sections
+    for start, index, section in tagged:
+        section_type = (section.get("type") or "").casefold()
+        repeated = any(
+            kept_type == section_type
+            and abs(kept_index - index) == 1
+            and start - kept_start <= SECTION_DEDUPE_TOLERANCE_SECONDS
+            and in_overlap(start, index, kept_index)
+            and in_overlap(kept_start, index, kept_index)
+            for kept_start, kept_index, kept_type in kept
+        )
+        if repeated:
+            continue
+        kept.append((start, index, section_type))
+        merged.append(section)
+    return merged
+
+
+def _ranked_unique(items: list, key, limit: Optional[int] = None) -> list:
+    """Deduplicates items by key, ordered by frequency and then first appearance."""
+    counts = Counter()
+    first = {}
+    for item in items:
+        item_key = key(item)
+        if not item_key:
+            continue
+        counts[item_key] += 1
+        first.setdefault(item_key, item)
+    ranked = sorted(first, key=lambda k: -counts[k])
+    return [first[k] for k in ranked[:limit]]
+
+
+def _first_unique(items: list, key) -> list:
+    """Deduplicates items by key, keeping the first occurrence of each."""
+    seen = set()
+    unique = []
+    for item in items:
+        item_key = key(item)
+        if item_key and item_key not in seen:
+            seen.add(item_key)
+            unique.append(item)
+    return unique
+
+
+def merge_people(people_by_window: list) -> list:
+    """Deduplicates people by name across windows, most frequently seen first."""
+    people = [person for window_people in people_by_window for person in window_people or []]
+    return _ranked_unique(
+        people, lambda person: (person.get("person") or "").strip().casefold(), MAX_PEOPLE
+    )
+
+
+def merge_topics(topics_by_window: list) -> list:
+    """Deduplicates subject topics across windows, most frequent first."""
+    topics = [topic for window_topics in topics_by_window for topic in window_topics or []]
+    return _ranked_unique(topics, lambda topic: str(topic).strip().casefold(), MAX_SUBJECT_TOPICS)
+
+
+def merge_categorizations(categorizations: list) -> dict:
+    """
+    Unions the categorization lists of all windows.
+
+    Characters are deduplicated by name and the other lists by value, keeping the
+    order in which they first appear.
+    """
+    merged = {}
+    for categorization in categorizations:
+        for field, values in categorization.items():
+            if isinstance(values, list):
+                merged.setdefault(field, []).extend(values)
+    for field, values in merged.items():
+        if field == "character":
+            merged[field] = _first_unique(values, lambda item: (item.get("name") or "").strip().casefold())
+        else:
+            merged[field] = _first_unique(values, lambda item: str(item).strip().casefold())
+    return merged
+
+
+class ChunkResultStore:
+    """
+    Persists the result of every window call under
+    `media_assets/{asset_id}/summary_chunks`, so a redelivered message resumes
+    with the windows that are still missing instead of starting over.
+
+    Results are stored with a fingerprint of the prompts, model and media they
+    were produced from and are only reused when the fingerprint still matches.
+    """
+
+    def __init__(self, asset_manager):
+        """
+        Args:
+            asset_manager: MediaAssetManager of the service.
+        """
+        self.asset_manager = asset_manager
+
+    def _doc_ref(self, asset_id: str, stage: str, window: Tuple[int, int]):
+        return (
+            self.asset_manager.media_assets_collection.document(asset_id)
+            .collection("summary_chunks")
+            .document(f"{stage}_{window[0]}_{window[1]}")
+        )
+
+    def get(self, asset_id: str, stage: str, window: Tuple[int, int], fingerprint: str) -> Optional[dict]:
+        """Returns the stored result of a window call, or None if it must be (re)computed."""
+        try:
+            doc = self._doc_ref(asset_id, stage, window).get()
+        except Exception:
+            logger.warning("Could not read chunk result %s %s", stage, window, exc_info=True,
+                           extra={"extra_fields": {"asset_id": asset_id}})
+            return None
+        data = doc.to_dict() if doc.exists else None
+        if not data or data.get("fingerprint") != fingerprint:
+            return None
+        return data.get("result")
+
+    def put(self, asset_id: str, stage: str, window: Tuple[int, int], fingerprint: str, result: dict):
+        """Stores the successful result of a window call. Failures are logged and ignored."""
+        try:
+            self._doc_ref(asset_id, stage, window).set(
+                {
+                    "stage": stage,
+                    "start_seconds": window[0],
+                    "end_seconds": window[1],
+                    "fingerprint": fingerprint,
+                    "result": result,
+                    "updated_at": firestore.SERVER_TIMESTAMP,
+                }
+            )
+        except Exception:
+            logger.warning("Could not store chunk result %s %s", stage, window, exc_info=True,
+                           extra={"extra_fields": {"asset_id": asset_id}})
@@ -1,5 +1,9 @@
 """Genre-specific prompts for the summaries generator service."""
 
+# Part of every result cache key. Prompt text changes invalidate cached results
+# automatically; bump this to force regeneration without editing a prompt.
+PROMPT_VERSION = "1"
+
 # --- Entertainment prompts (existing behavior, extracted as-is) ---
 
 ENTERTAINMENT_SUMMARY_SYSTEM = """
@@ -128,6 +132,59 @@ Describe the emotional tone and atmosphere — exciting, tense, dramatic, celebr
 Do not have verbose description. Use single words when adding items to the result."""
 
 
+# --- Fused prompts (single call producing genre, summary, sections and categorization) ---
+
+FUSED_SYSTEM = """
+You are a skilled video analysis expert with a deep understanding of media and sports broadcasts.
+Your task is to analyze the provided video once and return all of its metadata in a single structured response."""
+
+FUSED_PROMPT = f"""
+Step 1 - content_genre
+Classify the video into exactly one category based on its CONTENT FORMAT:
+- "sports": Real/live sporting event footage with real athletes competing.
+- "entertainment": Scripted/produced content such as movies, TV shows, music videos, talk shows or reality TV. A movie ABOUT a sport is still "entertainment".
+- "documentary": Non-fiction long-form content such as documentaries, educational films or investigative journalism.
+- "other": Anything that doesn't fit the above.
+
+Step 2 - summary, itemized_summary, subject_topics and people
+If content_genre is "sports":
+{SPORTS_SUMMARY_PROMPT}
+Otherwise:
+{ENTERTAINMENT_SUMMARY_PROMPT}
+
+Step 3 - sections
+If content_genre is "sports":
+{SPORTS_SECTIONS_PROMPT}
+Otherwise:
+{ENTERTAINMENT_SECTIONS_PROMPT}
+
+Step 4 - categorization (character, concept, scenario, setting, subject, practice, theme, video_mood)
+If content_genre is "sports":
+{SPORTS_CATEGORIZATION_PROMPT}
+Otherwise:
+{ENTERTAINMENT_CATEGORIZATION_PROMPT}"""
+
+
+# --- Map-reduce prompts (long videos summarized window by window) ---
+
+WINDOW_PROMPT_PREFIX = """
+The video is an excerpt from {window_start} to {window_end} of a longer video.
+Analyze only this excerpt and give every timestamp relative to the start of the excerpt.
+"""
+
+REDUCE_SUMMARY_SYSTEM = """
+You are a skilled video analysis expert.
+You combine the summaries of consecutive parts of one long video into a single summary of the whole video."""
+
+REDUCE_SUMMARY_PROMPT = """
+The following JSON lists the summaries of consecutive parts of one {genre} video, in chronological order.
+Overlapping parts may describe the same events twice; mention each event only once.
+Provide summary and itemized_summary for the whole video.
+Avoid any additional comment or text.
+
+{window_summaries}"""
+
+
 def get_summary_prompts(genre: str) -> tuple[str, str]:
     """Return (system_instruction, prompt) for summary generation."""
     if genre == "sports":
@@ -147,3 +204,20 @@ def get_categorization_prompts(genre: str) -> tuple[str, str]:
     if genre == "sports":
         return SPORTS_CATEGORIZATION_SYSTEM, SPORTS_CATEGORIZATION_PROMPT
     return ENTERTAINMENT_CATEGORIZATION_SYSTEM, ENTERTAINMENT_CATEGORIZATION_PROMPT
+
+
+def get_fused_prompts() -> tuple[str, str]:
+    """Return (system_instruction, prompt) for the single-pass fused generation."""
+    return FUSED_SYSTEM, FUSED_PROMPT
+
+
+def get_window_prompt(prompt: str, window_start: str, window_end: str) -> str:
+    """Return a stage prompt restricted to one window of a long video."""
+    return WINDOW_PROMPT_PREFIX.format(window_start=window_start, window_end=window_end) + prompt
+
+
+def get_reduce_summary_prompts(genre: str, window_summaries: str) -> tuple[str, str]:
+    """Return (system_instruction, prompt) for combining window summaries."""
+    return REDUCE_SUMMARY_SYSTEM, REDUCE_SUMMARY_PROMPT.format(
+        genre=genre, window_summaries=window_summaries
+    )
@@ -124,4 +124,29 @@ KEY_SECTIONS_SCHEMA = {
             }
         }
     }
-}
\ No newline at end of file
+}
+
+# Single-pass schema: genre plus every field of the three schemas above.
+FUSED_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "content_genre": {
+            "type": "STRING",
+            "enum": ["sports", "entertainment", "documentary", "other"]
+        },
+        **SUMMARY_SCHEMA["properties"],
+        **KEY_SECTIONS_SCHEMA["properties"],
+        **ASSET_CATEGORIZATION_SCHEMA["properties"]
+    },
+    "required": ["content_genre"]
+}
+
+# Reduce step of the map-reduce mode: the prose fields of SUMMARY_SCHEMA. People
+# and subject topics are merged from the window results without a model call.
+REDUCE_SUMMARY_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "summary": SUMMARY_SCHEMA["properties"]["summary"],
+        "itemized_summary": SUMMARY_SCHEMA["properties"]["itemized_summary"]
+    }
+}
@@ -0,0 +1,93 @@
+"""Tests for common.captions against word timings in the transcription service's shape."""
+
+import json
+import os
+
+import pytest
+
+from common.captions import SENTENCE_END, build_cues, to_srt, to_webvtt
+from common.transcript_store import TranscriptWords
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "word_timings.json")
+
+
+@pytest.fixture
+def words():
+    with open(FIXTURE, encoding="utf-8") as f:
+        return TranscriptWords.from_word_dicts(json.load(f)["words"])
+
+
+def cue_words(cue):
+    return " ".join(cue.lines).split()
+
+
+def test_cues_keep_every_word_in_order(words):
+    cues = list(build_cues(words))
+    assert [w for cue in cues for w in cue_words(cue)] == words.words
+
+
+@pytest.mark.parametrize("max_cue_ms", [6000, 10**9])
+def test_line_length_and_line_count_limits(words, max_cue_ms):
+    cues = list(build_cues(words, max_cue_ms=max_cue_ms))
+    assert all(len(cue.lines) <= 2 for cue in cues)
+    assert all(len(line) <= 42 for cue in cues for line in cue.lines)
+    # Without the duration limit, the long sentences fill both lines of a cue.
+    if max_cue_ms == 10**9:
+        assert any(len(cue.lines) == 2 for cue in cues)
+
+
+def test_sentence_final_punctuation_ends_a_cue(words):
+    for cue in build_cues(words):
+        inner = cue_words(cue)[:-1]
+        assert not any(word.endswith(SENTENCE_END) for word in inner)
+    assert next(build_cues(words)).lines == ["Welcome back to the show."]
+
+
+def test_pause_starts_a_new_cue(words):
+    cues = list(build_cues(words))
+    # "extra time" is followed by a 2.05s pause before "Thank you!".
+    time_cue = next(cue for cue in cues if cue_words(cue)[-1] == "time")
+    thank_cue = next(cue for cue in cues if cue_words(cue)[0] == "Thank")
+    assert time_cue is not thank_cue
+    assert cue_words(thank_cue) == ["Thank", "you!"]
+
+
+def test_cues_do_not_overlap_and_respect_durations(words):
+    cues = list(build_cues(words))
+    for cue in cues:
+        assert cue.start_ms < cue.end_ms
+        # A cue only runs past 6s when extended to the 1s minimum.
+        assert cue.end_ms - cue.start_ms <= 6000
+        assert cue.end_ms - cue.start_ms >= 1000
+    for current, following in zip(cues, cues[1:]):
+        assert current.end_ms <= following.start_ms
+
+
+def test_short_cue_is_extended_without_reaching_the_next(words):
+    cues = list(build_cues(words))
+    # "time" ends at 12.25s and is held for 1s; the next cue starts at 14.25s.
+    time_cue = next(cue for cue in cues if cue_words(cue) == ["time"])
+    assert (time_cue.start_ms, time_cue.end_ms) == (11900, 12900)
+
+
+def test_webvtt_formatting(words):
+    cues = list(build_cues(words))
+    document = to_webvtt(cues)
+    assert document.startswith(
+        "WEBVTT\n"
+        "\n00:00:00.000 --> 00:00:01.700\nWelcome back to the show.\n"
+        "\n00:00:01.750 --> 00:00:07.300\n"
+        "Tonight we have a very special guest\njoining us in the studio to talk about the\n"
+    )
+    assert document.endswith("\n01:00:24.500 --> 01:00:25.500\nYes.\n")
+
+
+def test_srt_formatting(words):
+    cues = list(build_cues(words))
+    document = to_srt(cues)
+    assert document.startswith(
+        "1\n00:00:00,000 --> 00:00:01,700\nWelcome back to the show.\n\n"
+        "2\n00:00:01,750 --> 00:00:07,300\n"
+        "Tonight we have a very special guest\njoining us in the studio to talk about the\n\n"
+    )
+    assert document.endswith(f"{len(cues)}\n01:00:24,500 --> 01:00:25,500\nYes.\n\n")
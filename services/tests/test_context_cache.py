@@ -0,0 +1,105 @@
+"""Tests for common.context_cache against in-memory fakes of the genai client and asset store."""
+
+import types as pytypes
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytest.importorskip("google.genai")
+
+from google.genai import errors  # noqa: E402
+
+from common.context_cache import VideoContextCache, is_cache_miss  # noqa: E402
+
+VIDEO_URI = "gs://bucket/video.mp4"
+MODEL = "gemini-2.5-flash"
+
+
+class FakeCaches:
+    """Implements the `caches.create/delete` calls used by VideoContextCache."""
+
+    def __init__(self):
+        self.live = {}
+        self.created = 0
+
+    def create(self, model, config):
+        self.created += 1
+        name = f"cachedContents/{self.created}"
+        self.live[name] = model
+        return pytypes.SimpleNamespace(
+            name=name, expire_time=datetime.now(timezone.utc) + timedelta(hours=1)
+        )
+
+    def delete(self, name):
+        if self.live.pop(name, None) is None:
+            raise LookupError(name)
+
+
+class FakeAssetManager:
+    """Stores one asset document, applying dot-notation updates like MediaAssetManager."""
+
+    def __init__(self, asset):
+        self.asset = asset
+
+    def get_asset(self, asset_id):
+        return self.asset
+
+    def update_asset_metadata(self, asset_id, metadata_type, data):
+        for key, value in data.items():
+            target = self.asset.setdefault(metadata_type, {})
+            *parents, leaf = key.split(".")
+            for parent in parents:
+                target = target.setdefault(parent, {})
+            target[leaf] = value
+        return True
+
+
+@pytest.fixture
+def cache():
+    asset = {"summary": {"status": "processing"}, "previews": {"status": "processing"}, "video_details": {}}
+    client = pytypes.SimpleNamespace(caches=FakeCaches())
+    return VideoContextCache(client, FakeAssetManager(asset))
+
+
+def test_handle_is_created_once_and_shared(cache):
+    first = cache.get_handle("asset-1", VIDEO_URI, "video/*", MODEL)
+    second = cache.get_handle("asset-1", VIDEO_URI, "video/*", MODEL)
+    assert first == second == "cachedContents/1"
+    assert cache.client.caches.created == 1
+    assert cache._creation_locks == {}
+
+
+def test_release_evicts_once_the_last_consumer_is_done(cache):
+    name = cache.get_handle("asset-1", VIDEO_URI, "video/*", MODEL)
+    asset = cache.asset_manager.asset
+
+    asset["summary"]["status"] = "completed"
+    assert cache.release("asset-1") is False
+    assert name in cache.client.caches.live
+
+    asset["previews"]["status"] = "failed"
+    assert cache.release("asset-1") is True
+    assert name not in cache.client.caches.live
+    assert asset["video_details"]["context_caches"]["gemini_2_5_flash"] is None
+
+    # A second release, e.g. from a concurrent consumer, finds nothing left to evict.
+    assert cache.release("asset-1") is False
+
+
+def api_error(code, message):
+    return errors.APIError(code, {"error": {"code": code, "message": message, "status": "ERROR"}})
+
+
+@pytest.mark.parametrize(
+    "error, expected",
+    [
+        (api_error(404, "Not found: cachedContents/1"), True),
+        (api_error(400, "Cached content is expired or invalid."), True),
+        (api_error(404, "Publisher Model gemini-x was not found."), False),
+        (api_error(429, "Resource exhausted: cachedContents/1"), False),
+        (api_error(500, "Internal error."), False),
+        (TimeoutError("read timed out"), False),
+    ],
+)
+def test_only_missing_cached_content_is_a_cache_miss(error, expected):
+    assert is_cache_miss(error, "cachedContents/1") is expected
@@ -0,0 +1,317 @@
+"""Tests for previews_generator.highlight_pipeline, driven through InMemoryStageQueue."""
+
+import copy
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+for module in ("google.genai", "google.cloud.firestore", "google.cloud.storage", "ffmpeg", "dotenv"):
+    pytest.importorskip(module)
+
+from google.cloud import firestore  # noqa: E402
+
+from common.media_probe import MediaProbe  # noqa: E402
+from previews_generator import highlight_pipeline  # noqa: E402
+from previews_generator.highlight_pipeline import (  # noqa: E402
+    STAGES,
+    HighlightPipeline,
+    InMemoryStageQueue,
+    StageBusy,
+    StageQueue,
+)
+
+ASSET_ID = "asset-1"
+SOURCE_URI = "gs://media/show.mp4"
+
+
+class FakeAssetManager:
+    """Stores one asset document with dot-notation updates and expiring leases."""
+
+    def __init__(self, asset):
+        self.asset = asset
+        self.on_acquire = None
+
+    def get_asset(self, asset_id):
+        # Firestore returns a snapshot, not a live view of the document.
+        return copy.deepcopy(self.asset)
+
+    def update_asset_metadata(self, asset_id, metadata_type, data):
+        for key, value in data.items():
+            target = self.asset.setdefault(metadata_type, {})
+            *parents, leaf = key.split(".")
+            for parent in parents:
+                target = target.setdefault(parent, {})
+            if isinstance(value, firestore.ArrayUnion):
+                existing = target.setdefault(leaf, [])
+                existing.extend(v for v in value.values if v not in existing)
+            else:
+                target[leaf] = copy.deepcopy(value)
+        return True
+
+    def acquire_lease(self, asset_id, lease_name, owner, ttl_seconds=300):
+        if self.on_acquire:
+            self.on_acquire()
+        leases = self.asset.setdefault("leases", {})
+        lease = leases.get(lease_name)
+        now = datetime.now(timezone.utc)
+        if lease and lease["owner"] != owner and lease["expires_at"] > now:
+            return False
+        leases[lease_name] = {"owner": owner, "expires_at": now + timedelta(seconds=ttl_seconds)}
+        return True
+
+    def release_lease(self, asset_id, lease_name, owner):
+        leases = self.asset.get("leases") or {}
+        if (leases.get(lease_name) or {}).get("owner") == owner:
+            del leases[lease_name]
+        return True
+
+
+class FakeBlob:
+    def __init__(self, bucket, name):
+        self.bucket = bucket
+        self.name = name
+
+    @property
+    def generation(self):
+        return self.bucket.client.generations[(self.bucket.name, self.name)]
+
+    def upload_from_string(self, data, content_type=None):
+        self.bucket.client.objects[(self.bucket.name, self.name)] = data.encode("utf-8")
+
+    def upload_from_filename(self, filename, content_type=None):
+        with open(filename, "rb") as f:
+            self.bucket.client.objects[(self.bucket.name, self.name)] = f.read()
+
+    def download_as_bytes(self):
+        return self.bucket.client.objects[(self.bucket.name, self.name)]
+
+
+class FakeBucket:
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+
+    def blob(self, name):
+        return FakeBlob(self, name)
+
+    def get_blob(self, name):
+        return FakeBlob(self, name) if (self.name, name) in self.client.generations else None
+
+    def copy_blob(self, blob, destination_bucket, new_name):
+        self.client.on_copy()
+        self.client.objects[(destination_bucket.name, new_name)] = self.client.objects[(self.name, blob.name)]
+
+
+class FakeStorageClient:
+    """In-memory GCS holding the source video and the stage outputs."""
+
+    def __init__(self):
+        self.objects = {("media", "show.mp4"): b"video"}
+        self.generations = {("media", "show.mp4"): 1}
+        self.on_copy = lambda: None
+
+    def bucket(self, name):
+        return FakeBucket(self, name)
+
+
+class FlakyQueue(InMemoryStageQueue):
+    """Loses the delivery that publishes a given stage, like a crash before publishing."""
+
+    def __init__(self, drop_stage=None):
+        super().__init__()
+        self.drop_stage = drop_stage
+
+    def publish(self, message):
+        if message["stage"] == self.drop_stage:
+            self.drop_stage = None
+            raise ConnectionError("publish failed")
+        super().publish(message)
+
+
+@pytest.fixture
+def failures():
+    """Failures left per stage; a stage fails while its count is positive."""
+    return {}
+
+
+@pytest.fixture
+def calls(monkeypatch, failures, storage_client):
+    """Replaces the work of every stage, counting its calls."""
+    calls = {stage: 0 for stage in STAGES}
+
+    def step(stage, result):
+        def run(*args, **kwargs):
+            calls[stage] += 1
+            if failures.get(stage):
+                failures[stage] -= 1
+                raise RuntimeError(f"{stage} failed")
+            return result(*args) if callable(result) else result
+
+        return run
+
+    def render(video_url, selected_segments, temp_dir, output_path):
+        with open(output_path, "wb") as f:
+            f.write(b"reel")
+        return output_path
+
+    monkeypatch.setattr(highlight_pipeline, "probe_gcs_media", step("probe", MediaProbe(duration=600.0)))
+    monkeypatch.setattr(highlight_pipeline, "analyze_video_overview", step("overview", {"characters": []}))
+    monkeypatch.setattr(highlight_pipeline, "chunk_video_segments", step("chunk", {"segments": [1, 2]}))
+    monkeypatch.setattr(
+        highlight_pipeline, "analyze_reel_flow", step("select", {"selected_segments": [{"start": 0, "end": 5}]})
+    )
+    monkeypatch.setattr(highlight_pipeline, "render_highlight_reel", step("render", render))
+    storage_client.on_copy = step("upload", None)
+    return calls
+
+
+@pytest.fixture
+def asset_manager():
+    return FakeAssetManager({"video_details": {}})
+
+
+@pytest.fixture
+def storage_client():
+    return FakeStorageClient()
+
+
+def make_pipeline(asset_manager, storage_client, queue=None, **kwargs):
+    return HighlightPipeline(
+        asset_manager,
+        storage_client,
+        queue or InMemoryStageQueue(),
+        "gemini-test",
+        output_bucket="reels",
+        **kwargs,
+    )
+
+
+def run(pipeline):
+    pipeline.start(ASSET_ID, SOURCE_URI)
+    return pipeline.queue.drain(pipeline.handle)
+
+
+def highlights(asset_manager):
+    return asset_manager.asset["highlights"]
+
+
+def test_stage_queue_requires_publish():
+    with pytest.raises(TypeError):
+        StageQueue()
+
+
+def test_pipeline_runs_every_stage_once(asset_manager, storage_client, calls):
+    pipeline = make_pipeline(asset_manager, storage_client)
+    delivered = run(pipeline)
+
+    assert [message["stage"] for message, _ in delivered] == list(STAGES)
+    assert all(outcome == "completed" for _, outcome in delivered)
+    assert calls == {stage: 1 for stage in STAGES}
+    state = highlights(asset_manager)
+    assert state["status"] == "completed"
+    assert state["completed_stages"] == list(STAGES)
+    assert state["reel_uri"] == "gs://reels/video-highlights/highlight_show.mp4"
+    assert storage_client.objects[("reels", "video-highlights/highlight_show.mp4")] == b"reel"
+    assert asset_manager.asset["leases"] == {}
+
+
+@pytest.mark.parametrize("failing_stage", STAGES)
+def test_failed_stage_is_retried_without_repeating_earlier_stages(
+    asset_manager, storage_client, calls, failures, failing_stage
+):
+    failures[failing_stage] = 1
+    pipeline = make_pipeline(asset_manager, storage_client)
+    delivered = run(pipeline)
+
+    failed = [message["stage"] for message, outcome in delivered if isinstance(outcome, Exception)]
+    assert failed == [failing_stage]
+    assert calls == {stage: 2 if stage == failing_stage else 1 for stage in STAGES}
+    state = highlights(asset_manager)
+    assert state["status"] == "completed"
+    assert state["attempts"] == {failing_stage: 1}
+
+
+def test_stage_out_of_attempts_fails_the_pipeline_and_resumes_later(
+    asset_manager, storage_client, calls, failures
+):
+    failures["select"] = 3
+    pipeline = make_pipeline(asset_manager, storage_client, max_attempts=3)
+    delivered = run(pipeline)
+
+    assert delivered[-1][1] == "failed"
+    state = highlights(asset_manager)
+    assert state["status"] == "failed"
+    assert state["completed_stages"] == ["probe", "overview", "chunk"]
+    assert "select" in state["error_message"]
+
+    # Processing the asset again resumes from the failed stage.
+    assert pipeline.start(ASSET_ID, SOURCE_URI) == "select"
+    pipeline.queue.drain(pipeline.handle)
+    assert highlights(asset_manager)["status"] == "completed"
+    assert (calls["overview"], calls["chunk"], calls["select"]) == (1, 1, 4)
+
+
+def test_redelivered_message_republishes_the_pending_stage(asset_manager, storage_client, calls):
+    # The chunk delivery records its output, then fails to publish the select stage.
+    pipeline = make_pipeline(asset_manager, storage_client, FlakyQueue(drop_stage="select"))
+    delivered = run(pipeline)
+
+    outcomes = [(message["stage"], outcome) for message, outcome in delivered]
+    assert ("chunk", "skipped") in outcomes
+    assert calls["chunk"] == 1
+    assert highlights(asset_manager)["status"] == "completed"
+
+
+def test_redelivery_after_completion_is_skipped(asset_manager, storage_client, calls):
+    pipeline = make_pipeline(asset_manager, storage_client)
+    delivered = run(pipeline)
+
+    first_message = delivered[0][0]
+    assert pipeline.handle(first_message) == "skipped"
+    assert not pipeline.queue.messages
+    assert calls["probe"] == 1
+
+
+def test_stage_finished_while_waiting_for_the_lease_is_not_repeated(asset_manager, storage_client, calls):
+    pipeline = make_pipeline(asset_manager, storage_client)
+    pipeline.start(ASSET_ID, SOURCE_URI)
+    message = pipeline.queue.messages.popleft()
+
+    # Another delivery completes the stage after this one has read the state.
+    def finish_elsewhere():
+        asset_manager.on_acquire = None
+        make_pipeline(asset_manager, storage_client).handle(message)
+
+    asset_manager.on_acquire = finish_elsewhere
+    assert pipeline.handle(message) == "skipped"
+    assert calls["probe"] == 1
+    assert not pipeline.queue.messages
+
+
+def test_held_stage_raises_busy_until_its_lease_expires(asset_manager, storage_client, calls):
+    pipeline = make_pipeline(asset_manager, storage_client)
+    pipeline.start(ASSET_ID, SOURCE_URI)
+    message = pipeline.queue.messages.popleft()
+    asset_manager.asset["leases"] = {
+        "highlights_probe": {"owner": "dead-instance", "expires_at": datetime.now(timezone.utc) + timedelta(seconds=60)}
+    }
+    with pytest.raises(StageBusy):
+        pipeline.handle(message)
+
+    asset_manager.asset["leases"]["highlights_probe"]["expires_at"] = datetime.now(timezone.utc)
+    assert pipeline.handle(message) == "completed"
+
+
+def test_new_source_generation_starts_over(asset_manager, storage_client, calls):
+    pipeline = make_pipeline(asset_manager, storage_client)
+    first_run = run(pipeline)
+
+    storage_client.generations[("media", "show.mp4")] = 2
+    assert pipeline.start(ASSET_ID, SOURCE_URI) == "probe"
+    pipeline.queue.drain(pipeline.handle)
+
+    assert highlights(asset_manager)["source_generation"] == "2"
+    assert highlights(asset_manager)["status"] == "completed"
+    assert calls["overview"] == 2
+    # Messages of the replaced source are ignored.
+    assert pipeline.handle(first_run[1][0]) == "stale"
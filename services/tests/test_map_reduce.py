@@ -0,0 +1,48 @@
+"""Tests for merging the key sections of overlapping windows in summaries_generator.map_reduce."""
+
+import pytest
+
+pytest.importorskip("google.cloud.firestore")
+
+from summaries_generator.map_reduce import merge_sections, rebase_sections  # noqa: E402
+
+# Two 30 minute windows overlapping from 00:29:00 to 00:30:00.
+WINDOWS = [(0, 1800), (1740, 3540)]
+
+
+def section(start, end, section_type="highlight"):
+    return {"start_time": start, "end_time": end, "type": section_type}
+
+
+def starts(sections):
+    return [s["start_time"] for s in sections]
+
+
+def test_moment_reported_by_both_windows_is_kept_once():
+    first = [section("00:29:10", "00:29:40")]
+    # The second window reports the same moment relative to its own start.
+    second = rebase_sections([section("00:00:20", "00:00:50")], WINDOWS[1])
+    assert starts(merge_sections([first, second], WINDOWS)) == ["00:29:10"]
+
+
+def test_close_sections_of_one_window_are_all_kept():
+    sections = [section("00:10:00", "00:10:10"), section("00:10:15", "00:10:30")]
+    assert starts(merge_sections([sections, []], WINDOWS)) == ["00:10:00", "00:10:15"]
+
+
+def test_close_sections_outside_the_overlap_are_all_kept():
+    first = [section("00:28:50", "00:29:00")]
+    second = [section("00:29:05", "00:29:20")]
+    # The first section starts before the overlap, so it is not a repeat.
+    assert starts(merge_sections([first, second], WINDOWS)) == ["00:28:50", "00:29:05"]
+
+
+def test_sections_of_other_types_in_the_overlap_are_all_kept():
+    first = [section("00:29:10", "00:29:40", "dialogue")]
+    second = [section("00:29:12", "00:29:40", "highlight")]
+    assert len(merge_sections([first, second], WINDOWS)) == 2
+
+
+def test_rebased_sections_are_clamped_to_the_window():
+    rebased = rebase_sections([section("00:29:00", "00:31:00"), section("00:31:00", "00:32:00")], WINDOWS[1])
+    assert rebased == [section("00:58:00", "00:59:00")]
@@ -0,0 +1,83 @@
+"""Splits long audio on silences for chunked transcription."""
+
+import re
+from typing import List, Optional, Tuple
+
+from common.gcs_media import progress_seconds
+
+_SILENCE_START = re.compile(r"silence_start: (-?[\d.]+)")
+_SILENCE_END = re.compile(r"silence_end: ([\d.]+)")
+_DURATION = re.compile(r"Duration: (\d+):(\d+):([\d.]+)")
+
+
+def _hms(match) -> float:
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def parse_silencedetect(lines: List[str]) -> Tuple[Optional[float], List[Tuple[float, float]]]:
+    """
+    Parses the stderr of an ffmpeg silencedetect run.
+
+    The container duration is used when the header carries one; streamed FLAC has
+    none, so the time of ffmpeg's final report is used instead.
+
+    Args:
+        lines (list): Lines ffmpeg wrote to stderr.
+
+    Returns:
+        tuple: (duration in seconds or None, list of (silence_start, silence_end)).
+    """
+    duration = None
+    silences = []
+    silence_start = None
+    for line in lines:
+        match = _DURATION.search(line)
+        if match and duration is None:
+            duration = _hms(match)
+        match = _SILENCE_START.search(line)
+        if match:
+            silence_start = max(float(match.group(1)), 0.0)
+        match = _SILENCE_END.search(line)
+        if match and silence_start is not None:
+            silences.append((silence_start, float(match.group(1))))
+            silence_start = None
+    return duration or progress_seconds(lines), silences
+
+
+def plan_chunks(
+    duration: float, silences: List[Tuple[float, float]], target_seconds: float, search_seconds: float
+) -> List[Tuple[float, float]]:
+    """
+    Splits the audio into chunks of about target_seconds, cutting in silences.
+
+    Each cut is placed in the middle of the silence closest to the ideal cut point
+    within search_seconds of it, so no word is split. Without a silence nearby the
+    audio is cut at the ideal point. The last chunk absorbs a remainder shorter
+    than a quarter of the target.
+
+    Args:
+        duration (float): Audio duration in seconds.
+        silences (list): (start, end) of detected silences.
+        target_seconds (float): Desired chunk length.
+        search_seconds (float): How far from the ideal cut point a silence may be.
+
+    Returns:
+        list: (start, end) of consecutive chunks covering the whole audio.
+    """
+    midpoints = [(start + end) / 2 for start, end in silences]
+    chunks = []
+    position = 0.0
+    while duration - position > target_seconds * 1.25:
+        ideal = position + target_seconds
+        nearby = [m for m in midpoints if abs(m - ideal) <= search_seconds and m > position]
+        cut = min(nearby, key=lambda m: abs(m - ideal)) if nearby else ideal
+        chunks.append((position, cut))
+        position = cut
+    chunks.append((position, duration))
+    return chunks
+
+
+def format_offset(milliseconds: int) -> str:
+    """Formats milliseconds as a Speech-to-Text duration string."""
+    return f"{milliseconds / 1000:.3f}s"
@@ -0,0 +1,88 @@
+"""Spoken language identification on a short audio sample."""
+
+import logging
+from collections import Counter
+from typing import List, Optional
+
+from google.cloud.speech_v2.types import cloud_speech
+
+from common.gcs_media import ffmpeg_gcs_to_bytes
+
+logger = logging.getLogger(__name__)
+
+
+def match_language(detected: Optional[str], candidates: List[str], default: str) -> str:
+    """
+    Maps a detected language onto one of the configured recognizer languages.
+
+    An exact match (ignoring case) wins; otherwise the first candidate with the same
+    primary language is used (e.g. detected "es-419" -> configured "es-US").
+
+    Args:
+        detected (Optional[str]): BCP-47 code reported by Speech-to-Text.
+        candidates (list): Languages with a recognizer, in order of preference.
+        default (str): Returned when nothing matches.
+
+    Returns:
+        str: The language to transcribe with.
+    """
+    if not detected:
+        return default
+    detected = detected.lower()
+    for candidate in candidates:
+        if candidate.lower() == detected:
+            return candidate
+    primary = detected.split("-")[0]
+    for candidate in candidates:
+        if candidate.lower().split("-")[0] == primary:
+            return candidate
+    return default
+
+
+def _recognize_sample(speech_client, recognizer_name: str, sample: bytes) -> Optional[str]:
+    response = speech_client.recognize(
+        request=cloud_speech.RecognizeRequest(
+            recognizer=recognizer_name,
+            config=cloud_speech.RecognitionConfig(auto_decoding_config={}),
+            content=sample,
+        )
+    )
+    # Weight each segment's language by the amount of speech recognized in it.
+    votes = Counter()
+    for result in response.results:
+        if result.language_code and result.alternatives:
+            votes[result.language_code] += len(result.alternatives[0].transcript.strip())
+    votes = +votes
+    return votes.most_common(1)[0][0] if votes else None
+
+
+def detect_language(
+    speech_client, recognizer_name: str, audio_blob, sample_offset: float, sample_seconds: float
+) -> Optional[str]:
+    """
+    Identifies the spoken language of an audio file from a few seconds of it.
+
+    The sample is cut with ffmpeg straight from GCS and sent inline to a synchronous
+    recognize call on a recognizer with automatic language detection. The sample
+    starts `sample_offset` seconds in to skip intros and music; if that part holds
+    no speech (or the audio is shorter), the beginning is tried instead.
+
+    Args:
+        speech_client: The shared SpeechClient.
+        recognizer_name (str): Recognizer configured for language "auto".
+        audio_blob: The extracted audio in GCS.
+        sample_offset (float): Start of the sample in seconds.
+        sample_seconds (float): Length of the sample.
+
+    Returns:
+        Optional[str]: The detected BCP-47 language code, or None.
+    """
+    for start in dict.fromkeys([sample_offset, 0.0]):
+        sample = ffmpeg_gcs_to_bytes(
+            audio_blob, input_kwargs={"ss": start, "t": sample_seconds}, format="flac", acodec="flac", ac=1
+        )
+        detected = _recognize_sample(speech_client, recognizer_name, sample)
+        if detected:
+            logger.info("Detected language %s in sample at %.0fs", detected, start)
+            return detected
+    return None
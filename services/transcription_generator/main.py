@@ -4,20 +4,37 @@ import os
 import json
 import base64
 import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 from flask import Flask, request
 
 # Speech-to-Text imports
-from google.api_core.client_options import ClientOptions
-from google.cloud.speech_v2 import SpeechClient
 from google.cloud.speech_v2.types import cloud_speech
-from google.api_core.exceptions import NotFound
 
 # Additional imports for GCS and ffmpeg
-from google.cloud import storage
+from google.cloud import firestore, storage
 import ffmpeg
 
 from common.media_asset_manager import MediaAssetManager
 from common.logging_config import configure_logger
+from common.result_cache import ResultCache, prompt_fingerprint
+from common.gcs_media import ffmpeg_gcs_to_gcs, ffmpeg_gcs_log, parse_gcs_uri, progress_seconds
+from common.audio_artifact import (
+    AUDIO_CONTENT_TYPE,
+    AUDIO_SAMPLE_RATE,
+    audio_artifact_metadata,
+    audio_artifact_name,
+    describe_audio_artifact,
+    is_current_audio_artifact,
+)
+from common.transcript_store import TranscriptWords, write_transcript_words, transcript_summary
+from common.captions import write_captions
+from .recognizers import get_speech_client, get_recognizer_name, warm_up
+from .chunking import parse_silencedetect, plan_chunks, format_offset
+from .result_parser import parse_recognition_results
+from .language import detect_language, match_language
 
 # Configure logger for the service
 configure_logger()
@@ -29,12 +46,465 @@ location = os.environ.get("GCP_REGION", "us-central1")
 asset_manager = MediaAssetManager(project_id=project_id)
 storage_client = storage.Client(project=project_id)
 llm_model = os.environ.get("LLM_MODEL", "chirp")
+# Default transcription language.
+language_code = os.environ.get("TRANSCRIPTION_LANGUAGE", "en-US")
+# Languages an asset may be transcribed in. With more than one, the spoken language
+# is identified on a short sample and picks the recognizer.
+transcription_languages = [
+    code.strip() for code in os.environ.get("TRANSCRIPTION_LANGUAGES", language_code).split(",") if code.strip()
+]
+language_detection = len(transcription_languages) > 1
+# Model of the recognizer with language "auto" used for identification.
+detection_model = os.environ.get("TRANSCRIPTION_DETECTION_MODEL", "chirp_2")
+# The sample skips the first seconds, which often hold music or a silent intro.
+language_sample_offset = float(os.environ.get("TRANSCRIPTION_LANGUAGE_SAMPLE_OFFSET", "30"))
+language_sample_seconds = float(os.environ.get("TRANSCRIPTION_LANGUAGE_SAMPLE_SECONDS", "10"))
+# Speaker diarization. Speaker turns are stored on the asset as run-length segments.
+diarization = os.environ.get("TRANSCRIPTION_DIARIZATION", "false").lower() == "true"
+min_speakers = int(os.environ.get("TRANSCRIPTION_MIN_SPEAKERS", "1"))
+max_speakers = int(os.environ.get("TRANSCRIPTION_MAX_SPEAKERS", "6"))
+# Recognizer models that accept a diarization config; the others reject the request.
+DIARIZATION_MODELS = {"chirp_3", "long", "telephony"}
+if diarization and llm_model not in DIARIZATION_MODELS:
+    logger.warning(
+        "TRANSCRIPTION_DIARIZATION is ignored: model '%s' does not support diarization (supported: %s)",
+        llm_model,
+        ", ".join(sorted(DIARIZATION_MODELS)),
+    )
+    diarization = False
+# "stream" lets ffmpeg read the video from GCS and streams the FLAC back to GCS;
+# "download" stages both files in /tmp, which is backed by instance memory.
+audio_extraction_mode = os.environ.get("TRANSCRIPTION_AUDIO_EXTRACTION", "stream").lower()
+
+# Long audio is split on silences and the chunks are transcribed in parallel.
+transcription_chunking = os.environ.get("TRANSCRIPTION_CHUNKING", "false").lower() == "true"
+# Audio shorter than this is transcribed as a single file.
+chunk_min_seconds = float(os.environ.get("TRANSCRIPTION_CHUNK_MIN_SECONDS", "1200"))
+chunk_seconds = float(os.environ.get("TRANSCRIPTION_CHUNK_SECONDS", "600"))
+# How far from the ideal cut point a silence may be to cut there instead.
+chunk_search_seconds = float(os.environ.get("TRANSCRIPTION_CHUNK_SEARCH_SECONDS", "60"))
+chunk_retries = int(os.environ.get("TRANSCRIPTION_CHUNK_RETRIES", "2"))
+# Parallel ffmpeg processes cutting chunks and parallel result downloads.
+chunk_workers = int(os.environ.get("TRANSCRIPTION_CHUNK_WORKERS", "4"))
+silence_noise_db = os.environ.get("TRANSCRIPTION_SILENCE_NOISE_DB", "-35")
+silence_min_seconds = float(os.environ.get("TRANSCRIPTION_SILENCE_MIN_SECONDS", "0.5"))
+# Upper bound of files in one batch_recognize request.
+MAX_FILES_PER_BATCH = 15
+# Size of the ranged reads while parsing result files.
+RESULT_READ_CHUNK_SIZE = 4 * 1024 * 1024
+
+# WebVTT and SRT captions are written next to the results.
+captions_enabled = os.environ.get("TRANSCRIPTION_CAPTIONS", "true").lower() == "true"
+caption_options = {
+    "max_line_chars": int(os.environ.get("CAPTION_MAX_LINE_CHARS", "42")),
+    "max_lines": int(os.environ.get("CAPTION_MAX_LINES", "2")),
+    "max_cue_ms": int(float(os.environ.get("CAPTION_MAX_CUE_SECONDS", "6")) * 1000),
+}
+
+# Submit batch_recognize and acknowledge the message instead of waiting for the
+# operation; POST /poll completes finished operations.
+transcription_async = os.environ.get("TRANSCRIPTION_ASYNC", "false").lower() == "true"
+# Assets read per page of a /poll call; every page is checked until none are left.
+poll_batch_size = int(os.environ.get("TRANSCRIPTION_POLL_BATCH_SIZE", "50"))
+# Just above the service's 1800s request timeout, so a delivery that died while
+# submitting does not hold the asset much longer than the request could have run.
+submit_lease_seconds = int(os.environ.get("TRANSCRIPTION_SUBMIT_LEASE_SECONDS", "1860"))
+
+# Optional content-hash keyed cache of results, so re-ingested media skips Speech-to-Text.
+result_cache = (
+    ResultCache(asset_manager.db, storage_client)
+    if os.environ.get("RESULT_CACHE", "false").lower() == "true"
+    else None
+)
+# Part of the result cache key. Bump when recognition features change.
+RECOGNITION_CONFIG_VERSION = "1"
+recognition_fingerprint = (
+    prompt_fingerprint(RECOGNITION_CONFIG_VERSION, "auto", *transcription_languages)
+    if language_detection
+    else prompt_fingerprint(RECOGNITION_CONFIG_VERSION, language_code)
+)
+if diarization:
+    # Results without speaker labels must not be reused once diarization is on.
+    recognition_fingerprint = prompt_fingerprint(
+        recognition_fingerprint, "diarization", min_speakers, max_speakers
+    )
+
+# Resolve the Speech-to-Text client and recognizer in the background at startup,
+# so the first request does not pay for the lookup or creation.
+def _warm_up_recognizers():
+    warm_up(project_id, location, transcription_languages, llm_model)
+    if language_detection:
+        warm_up(project_id, location, ["auto"], detection_model)
+
+
+if os.environ.get("TRANSCRIPTION_WARM_UP", "true").lower() == "true":
+    threading.Thread(target=_warm_up_recognizers, name="speech-warm-up", daemon=True).start()
 
 # Initialize Flask app
 app = Flask(__name__)
 
 
+def parse_transcript_result(result_uri: str) -> dict:
+    """
+    Reads a Speech-to-Text batch result file from GCS and formats it.
+
+    The file is parsed while it downloads, so memory stays bounded by the read
+    buffer and one result segment rather than the whole document.
+
+    Args:
+        result_uri (str): GCS URI of the JSON result written by batch_recognize.
+
+    Returns:
+        dict: The transcription text, word timings (TranscriptWords), speaker turns
+              (SpeakerTurns) and the result URI.
+    """
+    result_bucket_name, result_blob_name = result_uri.replace("gs://", "").split(
+        "/", 1
+    )
+
+    result_blob = storage_client.bucket(result_bucket_name).blob(result_blob_name)
+    with result_blob.open("rb", chunk_size=RESULT_READ_CHUNK_SIZE) as stream:
+        text, words, speaker_turns = parse_recognition_results(stream)
+
+    return {
+        "text": text,
+        "words": words,
+        "speaker_turns": speaker_turns,
+        "gcs_uri": result_uri,
+    }
+
+
+def _cache_key(content_hash: str) -> str:
+    return result_cache.make_key(
+        content_hash, "transcription", recognition_fingerprint, llm_model
+    )
+
+
+def submit_transcription(asset_id: str, video_gcs_uri: str) -> dict:
+    """
+    Starts the transcription of a video without waiting for Speech-to-Text.
+
+    A cached result is returned directly. Otherwise the operation is submitted and
+    its details are returned, including the content hash under which /poll caches
+    the result once the operation finishes.
+
+    Args:
+        asset_id (str): The ID of the asset.
+        video_gcs_uri (str): GCS URI of the video file.
+
+    Returns:
+        dict: Same contract as transcribe_video with wait=False.
+    """
+    content_hash = result_cache.content_hash(video_gcs_uri) if result_cache else None
+    if content_hash:
+        cached = result_cache.get(_cache_key(content_hash))
+        if cached and "gcs_uri" in cached:
+            try:
+                return {
+                    **parse_transcript_result(cached["gcs_uri"]),
+                    "language": cached.get("language", language_code),
+                }
+            except Exception:
+                logger.warning(
+                    "Cached transcription result %s is unreadable, transcribing again",
+                    cached.get("gcs_uri"),
+                    exc_info=True,
+                    extra={"extra_fields": {"asset_id": asset_id}},
+                )
+    submitted = transcribe_video(asset_id, video_gcs_uri, wait=False)
+    if "operation_name" in submitted:
+        submitted["content_hash"] = content_hash
+    return submitted
+
+
 def generate_transcription(asset_id: str, video_gcs_uri: str) -> dict:
+    """
+    Returns the transcription of a video, reusing the Speech-to-Text result of an
+    earlier ingest of the same media when the result cache is enabled.
+
+    Args:
+        asset_id (str): The ID of the asset.
+        video_gcs_uri (str): GCS URI of the video file.
+
+    Returns:
+        dict: Same contract as transcribe_video.
+    """
+    if not result_cache:
+        return transcribe_video(asset_id, video_gcs_uri)
+
+    transcribed = {}
+
+    def compute():
+        transcribed.update(transcribe_video(asset_id, video_gcs_uri))
+        # Only the result file location is cached; words are read back from it on a hit.
+        if "error" in transcribed:
+            return transcribed
+        return {"gcs_uri": transcribed["gcs_uri"], "language": transcribed["language"]}
+
+    cached = result_cache.get_or_compute(
+        result_cache.content_hash(video_gcs_uri),
+        "transcription",
+        recognition_fingerprint,
+        llm_model,
+        compute,
+        asset_id=asset_id,
+    )
+    if transcribed or "error" in cached:
+        return transcribed or cached
+    try:
+        return {**parse_transcript_result(cached["gcs_uri"]), "language": cached.get("language", language_code)}
+    except Exception:
+        logger.warning(
+            "Cached transcription result %s is unreadable, transcribing again",
+            cached.get("gcs_uri"),
+            exc_info=True,
+            extra={"extra_fields": {"asset_id": asset_id}},
+        )
+        return transcribe_video(asset_id, video_gcs_uri)
+
+
+def recognize_files(
+    speech_client, recognizer_name: str, config, audio_uris: list, results_gcs_path: str, files_per_request: int = MAX_FILES_PER_BATCH
+) -> dict:
+    """
+    Transcribes audio files in GCS with batch_recognize.
+
+    All requests are submitted before waiting on any of them, so Speech-to-Text
+    processes them in parallel.
+
+    Args:
+        speech_client: The shared SpeechClient.
+        recognizer_name (str): Recognizer resource name.
+        config: The RecognitionConfig applied to every file.
+        audio_uris (list): GCS URIs of the audio files.
+        results_gcs_path (str): GCS prefix for the result files.
+        files_per_request (int): Number of files per batch_recognize request.
+
+    Returns:
+        dict: Audio URI -> result file URI, or None for files that failed.
+    """
+    operations = []
+    for i in range(0, len(audio_uris), files_per_request):
+        group = audio_uris[i:i + files_per_request]
+        request = cloud_speech.BatchRecognizeRequest(
+            recognizer=recognizer_name,
+            recognition_output_config={"gcs_output_config": {"uri": results_gcs_path}},
+            files=[{"config": config, "uri": uri} for uri in group],
+        )
+        operations.append((group, speech_client.batch_recognize(request=request)))
+
+    results = {}
+    for group, operation in operations:
+        try:
+            response = operation.result()
+        except Exception:
+            logger.warning("batch_recognize failed for %d files", len(group), exc_info=True)
+            results.update({uri: None for uri in group})
+            continue
+        for uri in group:
+            file_result = response.results[uri] if uri in response.results else None
+            if file_result is None or file_result.error.code:
+                logger.warning(
+                    "Transcription of %s failed: %s",
+                    uri,
+                    file_result.error.message if file_result is not None else "no result",
+                )
+                results[uri] = None
+            else:
+                results[uri] = file_result.uri
+    return results
+
+
+def transcribe_in_chunks(
+    asset_id: str, audio_blob, speech_client, recognizer_name: str, config, results_gcs_path: str, log_extra: dict
+) -> Optional[dict]:
+    """
+    Transcribes long audio as parallel chunks cut on silences.
+
+    The audio is scanned with ffmpeg silencedetect, cut into chunks of about
+    TRANSCRIPTION_CHUNK_SECONDS in the middle of silences and the chunks are
+    submitted together. Chunks that fail are retried one file per request, and the
+    word timings of all chunks are moved onto the timeline of the whole audio. The
+    merged transcript is written in the Speech-to-Text result format, so it reads
+    back like a single-file result.
+
+    Args:
+        asset_id (str): The ID of the asset.
+        audio_blob: The extracted FLAC in GCS.
+        speech_client: The shared SpeechClient.
+        recognizer_name (str): Recognizer resource name.
+        config: The RecognitionConfig.
+        results_gcs_path (str): GCS prefix for the result files.
+        log_extra (dict): Logging context.
+
+    Returns:
+        Optional[dict]: Same contract as transcribe_video, or None if the audio is
+                        too short to be chunked.
+    """
+    lines = ffmpeg_gcs_log(
+        audio_blob,
+        lambda stream: stream.filter(
+            "silencedetect", noise=f"{silence_noise_db}dB", d=silence_min_seconds
+        ).output("-", format="null"),
+    )
+    duration, silences = parse_silencedetect(lines)
+    if not duration or duration < chunk_min_seconds:
+        return None
+
+    chunks = plan_chunks(duration, silences, chunk_seconds, chunk_search_seconds)
+    logger.info(
+        "Transcribing %.0fs of audio in %d chunks (%d silences found)",
+        duration,
+        len(chunks),
+        len(silences),
+        extra=log_extra,
+    )
+
+    bucket = audio_blob.bucket
+
+    def extract_chunk(index, start, end):
+        chunk_blob = bucket.blob(f"{asset_id}/audio_chunks/{index:04d}.flac")
+        ffmpeg_gcs_to_gcs(
+            audio_blob,
+            chunk_blob,
+            "audio/flac",
+            input_kwargs={"ss": start, "t": end - start},
+            format="flac",
+            acodec="flac",
+        )
+        return f"gs://{bucket.name}/{chunk_blob.name}"
+
+    with ThreadPoolExecutor(max_workers=chunk_workers) as pool:
+        chunk_uris = list(
+            pool.map(lambda args: extract_chunk(*args), [(i, s, e) for i, (s, e) in enumerate(chunks)])
+        )
+
+    results = recognize_files(speech_client, recognizer_name, config, chunk_uris, results_gcs_path)
+    for attempt in range(chunk_retries):
+        failed = [uri for uri in chunk_uris if results[uri] is None]
+        if not failed:
+            break
+        logger.warning(
+            "Retrying %d failed chunks (attempt %d)", len(failed), attempt + 1, extra=log_extra
+        )
+        # One file per request, so a failing chunk cannot fail the others again.
+        results.update(
+            recognize_files(speech_client, recognizer_name, config, failed, results_gcs_path, files_per_request=1)
+        )
+    failed = [uri for uri in chunk_uris if results[uri] is None]
+    if failed:
+        raise RuntimeError(f"{len(failed)} of {len(chunk_uris)} audio chunks could not be transcribed")
+
+    with ThreadPoolExecutor(max_workers=chunk_workers) as pool:
+        chunk_results = list(pool.map(parse_transcript_result, [results[uri] for uri in chunk_uris]))
+
+    shifts = [int(round(start * 1000)) for start, _ in chunks]
+    merged_results = []
+    for shift, chunk_result in zip(shifts, chunk_results):
+        chunk_words = chunk_result["words"]
+        merged_results.append(
+            {
+                "alternatives": [
+                    {
+                        "transcript": chunk_result["text"],
+                        "words": [
+                            {
+                                "word": word,
+                                "startOffset": format_offset(start_ms + shift),
+                                "endOffset": format_offset(end_ms + shift),
+                            }
+                            for word, start_ms, end_ms in zip(
+                                chunk_words.words, chunk_words.start_ms, chunk_words.end_ms
+                            )
+                        ],
+                    }
+                ]
+            }
+        )
+    words = TranscriptWords.concatenate([(r["words"], shift) for shift, r in zip(shifts, chunk_results)])
+
+    merged_blob_name = f"{asset_id}/transcription_results/merged.json"
+    bucket.blob(merged_blob_name).upload_from_string(
+        json.dumps({"results": merged_results}), content_type="application/json"
+    )
+    return {
+        "text": " ".join(r["text"] for r in chunk_results if r["text"]),
+        "words": words,
+        "gcs_uri": f"gs://{bucket.name}/{merged_blob_name}",
+    }
+
+
+def extract_audio(video_blob, audio_blob, local_video_path: str, local_audio_path: str, log_extra: dict):
+    """
+    Extracts the audio track of a video into the asset's audio artifact.
+
+    The audio is converted to FLAC format with a 16000Hz sample rate, as
+    recommended for Speech-to-Text. The artifact object records the source
+    generation and the audio duration in its metadata.
+
+    Args:
+        video_blob: The source Blob, with its generation loaded.
+        audio_blob: The artifact Blob to write.
+        local_video_path (str): Staging path of the video in "download" mode.
+        local_audio_path (str): Staging path of the audio in "download" mode.
+        log_extra (dict): Logging context.
+
+    Returns:
+        Blob: The written audio artifact, with its metadata loaded.
+    """
+    audio_gcs_uri = f"gs://{audio_blob.bucket.name}/{audio_blob.name}"
+    if audio_extraction_mode == "stream":
+        logger.info(
+            "Streaming audio from gs://%s/%s to %s",
+            video_blob.bucket.name,
+            video_blob.name,
+            audio_gcs_uri,
+            extra=log_extra,
+        )
+        audio_blob.metadata = audio_artifact_metadata(video_blob)
+        try:
+            transcoded = ffmpeg_gcs_to_gcs(
+                video_blob,
+                audio_blob,
+                AUDIO_CONTENT_TYPE,
+                format="flac",
+                acodec="flac",
+                ar=str(AUDIO_SAMPLE_RATE),
+                vn=None,
+            )
+        except ffmpeg.Error as e:
+            stderr = e.stderr.decode() if e.stderr else "No stderr"
+            logger.error("ffmpeg failed: %s", stderr, exc_info=True, extra=log_extra)
+            raise e
+        # The duration is only known once ffmpeg is done.
+        audio_blob.metadata = audio_artifact_metadata(video_blob, transcoded.duration_seconds)
+        audio_blob.patch()
+    else:
+        logger.info(
+            "Downloading video file: gs://%s/%s", video_blob.bucket.name, video_blob.name, extra=log_extra
+        )
+        video_blob.download_to_filename(local_video_path)
+
+        logger.info("Extracting audio from %s", local_video_path, extra=log_extra)
+        try:
+            _, stderr = ffmpeg.input(local_video_path).output(
+                local_audio_path, acodec="flac", ar=str(AUDIO_SAMPLE_RATE), vn=None
+            ).run(capture_stdout=True, capture_stderr=True, overwrite_output=True)
+        except ffmpeg.Error as e:
+            stderr = e.stderr.decode() if e.stderr else "No stderr"
+            logger.error("ffmpeg failed: %s", stderr, exc_info=True, extra=log_extra)
+            raise e
+
+        logger.info("Uploading extracted audio to %s", audio_gcs_uri, extra=log_extra)
+        audio_blob.metadata = audio_artifact_metadata(
+            video_blob, progress_seconds([stderr.decode(errors="replace")])
+        )
+        audio_blob.upload_from_filename(local_audio_path, content_type=AUDIO_CONTENT_TYPE)
+    audio_blob.reload()
+    return audio_blob
+
+
+def transcribe_video(asset_id: str, video_gcs_uri: str, wait: bool = True) -> dict:
     """
     Extracts audio from a video file in GCS, transcribes it using the
     Speech-to-Text API, and returns the result.
@@ -42,10 +512,14 @@ def generate_transcription(asset_id: str, video_gcs_uri: str) -> dict:
     Args:
         asset_id (str): The ID of the asset.
         video_gcs_uri (str): GCS URI of the video file.
+        wait (bool): Wait for the Speech-to-Text operation. When False the
+            operation is only submitted; chunked transcription is not used.
 
     Returns:
-        dict: A dictionary containing the transcription text and word timings,
-              or an error dictionary if generation fails.
+        dict: A dictionary containing the transcription text, word timings and
+              language, {"operation_name", "audio_gcs_uri", "language"} of the
+              submitted operation when not waiting, or an error dictionary if
+              generation fails.
     """
     log_extra = {"extra_fields": {"asset_id": asset_id, "file_location": video_gcs_uri}}
     logger.info(
@@ -69,85 +543,100 @@ def generate_transcription(asset_id: str, video_gcs_uri: str) -> dict:
         local_audio_path = f"/tmp/{asset_id}.flac"
 
         # Define GCS paths for the extracted audio and the transcription results.
-        audio_gcs_path = f"{asset_id}/audio.flac"
+        audio_gcs_path = audio_artifact_name(asset_id)
         audio_gcs_uri = f"gs://{bucket_name}/{audio_gcs_path}"
         results_gcs_path = f"gs://{bucket_name}/{asset_id}/transcription_results/"
 
-        # 2. Download video from GCS
-        logger.info("Downloading video file: %s", video_gcs_uri, extra=log_extra)
         bucket = storage_client.bucket(bucket_name)
-        video_blob = bucket.blob(blob_name)
-        video_blob.download_to_filename(local_video_path)
-
-        # 3. Extract audio using ffmpeg.
-        # The audio is converted to FLAC format with a 16000Hz sample rate,
-        # as recommended for Speech-to-Text.
-        logger.info("Extracting audio from %s", local_video_path, extra=log_extra)
-        try:
-            ffmpeg.input(local_video_path).output(
-                local_audio_path, acodec="flac", ar="16000", vn=None
-            ).run(capture_stdout=True, capture_stderr=True, overwrite_output=True)
-        except ffmpeg.Error as e:
-            stderr = e.stderr.decode() if e.stderr else "No stderr"
-            logger.error("ffmpeg failed: %s", stderr, exc_info=True, extra=log_extra)
-            raise e
-
-        # 4. Upload extracted audio to GCS
-        logger.info("Uploading extracted audio to %s", audio_gcs_uri, extra=log_extra)
-        audio_blob = bucket.blob(audio_gcs_path)
-        audio_blob.upload_from_filename(local_audio_path)
-
-        # 5. Transcribe using Speech-to-Text API
-        # Initialize the SpeechClient with the regional endpoint for better performance.
-        speech_client = SpeechClient(
-            client_options=ClientOptions(
-                api_endpoint=f"{location}-speech.googleapis.com"
+        # get_blob loads the generation, which identifies the audio extracted from it.
+        video_blob = bucket.get_blob(blob_name)
+        if video_blob is None:
+            raise FileNotFoundError(f"{video_gcs_uri} does not exist.")
+        audio_blob = bucket.get_blob(audio_gcs_path)
+
+        # 2-4. Extract the audio and upload it to GCS, unless a retry or reprocess
+        # already did for this generation of the source.
+        if is_current_audio_artifact(audio_blob, video_blob):
+            logger.info("Reusing extracted audio %s", audio_gcs_uri, extra=log_extra)
+        else:
+            audio_blob = extract_audio(
+                video_blob, bucket.blob(audio_gcs_path), local_video_path, local_audio_path, log_extra
             )
+        asset_manager.update_asset_metadata(
+            asset_id, "audio_artifact", describe_audio_artifact(audio_blob)
         )
 
-        language_code = "en-US"  # This could be made configurable
-        recognizer_id = f"chirp-long-form-{language_code.lower()}"
-        recognizer_name = (
-            f"projects/{project_id}/locations/{location}/recognizers/{recognizer_id}"
-        )
-
-        # Check if the required recognizer exists. If not, create it.
-        # This makes the service self-sufficient and avoids manual setup.
-        try:
-            recognizer = speech_client.get_recognizer(name=recognizer_name)
-        except NotFound:
-            logger.info(
-                "Recognizer '%s' not found, creating it.",
-                recognizer_id,
-                extra=log_extra,
-            )
-            recognizer_request = cloud_speech.CreateRecognizerRequest(
-                parent=f"projects/{project_id}/locations/{location}",
-                recognizer_id=recognizer_id,
-                recognizer=cloud_speech.Recognizer(
-                    language_codes=[language_code], model=llm_model
-                ),
-            )
-            recognizer = speech_client.create_recognizer(
-                request=recognizer_request
-            ).result()
+        # 5. Transcribe using Speech-to-Text API
+        # The client and recognizers are shared by all requests of this process.
+        speech_client = get_speech_client(location)
+        asset_language = language_code
+        if language_detection:
+            try:
+                detected = detect_language(
+                    speech_client,
+                    get_recognizer_name(project_id, location, "auto", detection_model),
+                    audio_blob,
+                    language_sample_offset,
+                    language_sample_seconds,
+                )
+                asset_language = match_language(detected, transcription_languages, language_code)
+                logger.info(
+                    "Transcribing asset %s in %s (detected: %s)",
+                    asset_id,
+                    asset_language,
+                    detected,
+                    extra=log_extra,
+                )
+            except Exception:
+                logger.warning(
+                    "Language identification failed, transcribing in %s",
+                    language_code,
+                    exc_info=True,
+                    extra=log_extra,
+                )
+        recognizer_name = get_recognizer_name(project_id, location, asset_language, llm_model)
 
         # Configure the recognition job with features like punctuation and word timings.
-        config = cloud_speech.RecognitionConfig(
-            features=cloud_speech.RecognitionFeatures(
-                enable_automatic_punctuation=True, enable_word_time_offsets=True
-            ),
-            auto_decoding_config={},
+        features = cloud_speech.RecognitionFeatures(
+            enable_automatic_punctuation=True, enable_word_time_offsets=True
         )
+        if diarization:
+            features.diarization_config = cloud_speech.SpeakerDiarizationConfig(
+                min_speaker_count=min_speakers, max_speaker_count=max_speakers
+            )
+        config = cloud_speech.RecognitionConfig(features=features, auto_decoding_config={})
+
+        # Speaker labels are assigned per recognized file and do not match across
+        # chunks, so diarized audio is always transcribed as a whole.
+        if transcription_chunking and wait and not diarization:
+            chunked_result = transcribe_in_chunks(
+                asset_id, audio_blob, speech_client, recognizer_name, config, results_gcs_path, log_extra
+            )
+            if chunked_result is not None:
+                logger.info(
+                    "Successfully generated chunked transcription for asset %s",
+                    asset_id,
+                    extra=log_extra,
+                )
+                return {**chunked_result, "language": asset_language}
 
         # Set up the batch recognition request, pointing to the audio file in GCS.
         batch_recognize_request = cloud_speech.BatchRecognizeRequest(
-            recognizer=recognizer.name,
+            recognizer=recognizer_name,
             recognition_output_config={"gcs_output_config": {"uri": results_gcs_path}},
             files=[{"config": config, "uri": audio_gcs_uri}],
         )
 
         operation = speech_client.batch_recognize(request=batch_recognize_request)
+        if not wait:
+            logger.info(
+                "Submitted transcription operation %s", operation.operation.name, extra=log_extra
+            )
+            return {
+                "operation_name": operation.operation.name,
+                "audio_gcs_uri": audio_gcs_uri,
+                "language": asset_language,
+            }
         logger.info(
             "Waiting for transcription operation to complete...", extra=log_extra
         )
@@ -156,33 +645,9 @@ def generate_transcription(asset_id: str, video_gcs_uri: str) -> dict:
         # 6. Process results from GCS.
         # The Speech-to-Text API writes the output to a new file in the specified GCS location.
         result_uri = response.results[audio_gcs_uri].uri
-        result_bucket_name, result_blob_name = result_uri.replace("gs://", "").split(
-            "/", 1
-        )
-
-        result_blob = storage_client.bucket(result_bucket_name).blob(result_blob_name)
-        transcript_data = json.loads(result_blob.download_as_text())
 
         # 7. Format the output into a structured dictionary.
-        full_transcript = ""
-        words = []
-        for result in transcript_data.get("results", []):
-            alternative = result.get("alternatives", [{}])[0]
-            full_transcript += alternative.get("transcript", "") + " "
-            for word_info in alternative.get("words", []):
-                words.append(
-                    {
-                        "word": word_info.get("word"),
-                        "start_time": word_info.get("startOffset"),
-                        "end_time": word_info.get("endOffset"),
-                    }
-                )
-
-        final_result = {
-            "text": full_transcript.strip(),
-            "words": words,
-            "gcs_uri": result_uri,
-        }
+        final_result = {**parse_transcript_result(result_uri), "language": asset_language}
         logger.info(
             "Successfully generated transcription for asset %s",
             asset_id,
@@ -211,6 +676,63 @@ def generate_transcription(asset_id: str, video_gcs_uri: str) -> dict:
                     )
 
 
+def store_transcription_result(asset_id: str, bucket_name: str, transcription_results: dict, log_extra: dict):
+    """
+    Writes a finished transcription, or its failure, to the asset.
+
+    Args:
+        asset_id (str): The ID of the asset.
+        bucket_name (str): Bucket of the asset's media, which receives the words sidecar.
+        transcription_results (dict): Result of transcribe_video.
+        log_extra (dict): Logging context.
+    """
+    # Handle the result: update Firestore with success or failure status.
+    if "error" in transcription_results:
+        error_msg = transcription_results["error"]
+        update_data = {"status": "failed", "error_message": error_msg}
+        asset_manager.update_asset_metadata(asset_id, "transcription", update_data)
+        logger.error(
+            "Transcription generation failed for asset %s: %s",
+            asset_id,
+            error_msg,
+            extra=log_extra,
+        )
+    else:
+        # Word timings go to a columnar sidecar; the document keeps a pointer.
+        words = transcription_results["words"]
+        speaker_turns = transcription_results.get("speaker_turns")
+        words_uri = f"gs://{bucket_name}/{asset_id}/transcription_results/words.json.gz"
+        write_transcript_words(storage_client, words_uri, words)
+        captions = None
+        if captions_enabled:
+            try:
+                captions = write_captions(
+                    storage_client, bucket_name, f"{asset_id}/transcription_results/", words, **caption_options
+                )
+            except Exception:
+                # Captions are a by-product; the transcription itself is still stored.
+                logger.warning("Failed to write captions for asset %s", asset_id, exc_info=True, extra=log_extra)
+        update_data = {
+            "status": "completed",
+            "text": transcription_results.get("text"),
+            # Clears the inline word list written by earlier versions.
+            "words": firestore.DELETE_FIELD,
+            "gcs_uri": transcription_results.get("gcs_uri"),
+            "language": transcription_results.get("language"),
+            "error_message": None,
+            "captions": captions,
+            "speaker_turns": speaker_turns.to_dict() if speaker_turns else None,
+            "speaker_count": speaker_turns.speaker_count if speaker_turns else None,
+            **transcript_summary(words, words_uri),
+        }
+        asset_manager.update_asset_metadata(asset_id, "transcription", update_data)
+        logger.info(
+            "Successfully completed transcription generation for asset: %s",
+            asset_id,
+            extra=log_extra,
+        )
+
+
 @app.route("/", methods=["POST"])
 def handle_message():
     """
@@ -271,40 +793,63 @@ def handle_message():
             )
             return "", 204
 
-        # Update the asset's status to 'processing' in Firestore.
-        asset_manager.update_asset_metadata(
-            asset_id, "transcription", {"status": "processing"}
-        )
-
-        # Trigger the core logic to generate the transcription.
-        transcription_results = generate_transcription(asset_id, file_location)
+        # A redelivered message must not submit a second operation. The lease also
+        # covers a redelivery that arrives while the first delivery is still submitting.
+        submit_owner = None
+        if transcription_async:
+            submit_owner = f"submit-{uuid.uuid4()}"
+            if not asset_manager.acquire_lease(
+                asset_id, "transcription_submit", submit_owner, ttl_seconds=submit_lease_seconds
+            ):
+                logger.info(
+                    "Transcription of asset %s is being submitted by another delivery",
+                    asset_id,
+                    extra=log_extra,
+                )
+                return "", 204
+        try:
+            if transcription_async:
+                transcription = (asset_manager.get_asset(asset_id) or {}).get("transcription") or {}
+                if transcription.get("status") == "transcribing" and transcription.get("operation_name"):
+                    logger.info(
+                        "Transcription operation %s already submitted for asset %s",
+                        transcription["operation_name"],
+                        asset_id,
+                        extra=log_extra,
+                    )
+                    return "", 204
 
-        # Handle the result: update Firestore with success or failure status.
-        if "error" in transcription_results:
-            error_msg = transcription_results["error"]
-            update_data = {"status": "failed", "error_message": error_msg}
-            asset_manager.update_asset_metadata(asset_id, "transcription", update_data)
-            logger.error(
-                "Transcription generation failed for asset %s: %s",
-                asset_id,
-                error_msg,
-                extra=log_extra,
-            )
-        else:
-            update_data = {
-                "status": "completed",
-                "text": transcription_results.get("text"),
-                "words": transcription_results.get("words", []),
-                "gcs_uri": transcription_results.get("gcs_uri"),
-                "error_message": None,
-            }
-            asset_manager.update_asset_metadata(asset_id, "transcription", update_data)
-            logger.info(
-                "Successfully completed transcription generation for asset: %s",
-                asset_id,
-                extra=log_extra,
+            # Update the asset's status to 'processing' in Firestore.
+            asset_manager.update_asset_metadata(
+                asset_id, "transcription", {"status": "processing"}
             )
 
+            # Trigger the core logic to generate the transcription.
+            if transcription_async:
+                transcription_results = submit_transcription(asset_id, file_location)
+                if "operation_name" in transcription_results:
+                    asset_manager.update_asset_metadata(
+                        asset_id,
+                        "transcription",
+                        {
+                            "status": "transcribing",
+                            "operation_name": transcription_results["operation_name"],
+                            "audio_gcs_uri": transcription_results["audio_gcs_uri"],
+                            "content_hash": transcription_results["content_hash"],
+                            "language": transcription_results["language"],
+                            "error_message": None,
+                        },
+                    )
+                    return "", 204
+            else:
+                transcription_results = generate_transcription(asset_id, file_location)
+        finally:
+            if submit_owner:
+                asset_manager.release_lease(asset_id, "transcription_submit", submit_owner)
+
+        bucket_name, _ = parse_gcs_uri(file_location)
+        store_transcription_result(asset_id, bucket_name, transcription_results, log_extra)
+
         return "", 204
     except Exception as e:
         # This is a critical failure block for any unhandled exceptions in the process.
@@ -327,3 +872,106 @@ def handle_message():
         # Return a 204 status to acknowledge the Pub/Sub message and prevent retries,
         # even though an error occurred. This is a common pattern for non-recoverable errors.
         return "Error processing message, but acknowledging to prevent retries.", 204
+
+
+def finish_async_transcription(asset_id: str, asset: dict) -> str:
+    """
+    Completes an asynchronous transcription if its Speech-to-Text operation is done.
+
+    A lease on the asset keeps concurrent polls from finishing it twice.
+
+    Args:
+        asset_id (str): The ID of the asset.
+        asset (dict): The asset document, with transcription.status "transcribing".
+
+    Returns:
+        str: "completed", "failed", "running" or "skipped" (leased by another poll).
+    """
+    transcription = asset.get("transcription") or {}
+    operation_name = transcription.get("operation_name")
+    audio_gcs_uri = transcription.get("audio_gcs_uri")
+    log_extra = {"extra_fields": {"asset_id": asset_id, "operation_name": operation_name}}
+
+    if not operation_name or not audio_gcs_uri:
+        asset_manager.update_asset_metadata(
+            asset_id,
+            "transcription",
+            {"status": "failed", "error_message": "Asynchronous transcription has no operation to poll"},
+        )
+        return "failed"
+
+    owner = f"poll-{uuid.uuid4()}"
+    if not asset_manager.acquire_lease(asset_id, "transcription_poll", owner, ttl_seconds=600):
+        return "skipped"
+    try:
+        operation = get_speech_client(location).get_operation(request={"name": operation_name})
+        if not operation.done:
+            return "running"
+
+        if operation.HasField("error"):
+            transcription_results = {"error": f"Failed to process transcription: {operation.error.message}"}
+        else:
+            response = cloud_speech.BatchRecognizeResponse.deserialize(operation.response.value)
+            file_result = response.results[audio_gcs_uri]
+            if file_result.error.code:
+                transcription_results = {"error": f"Failed to process transcription: {file_result.error.message}"}
+            else:
+                transcription_results = {
+                    **parse_transcript_result(file_result.uri),
+                    "language": transcription.get("language", language_code),
+                }
+                if result_cache and transcription.get("content_hash"):
+                    result_cache.put(
+                        _cache_key(transcription["content_hash"]),
+                        {"gcs_uri": transcription_results["gcs_uri"], "language": transcription_results["language"]},
+                        "transcription",
+                        recognition_fingerprint,
+                        llm_model,
+                        transcription["content_hash"],
+                    )
+
+        bucket_name, _ = parse_gcs_uri(audio_gcs_uri)
+        store_transcription_result(asset_id, bucket_name, transcription_results, log_extra)
+        asset_manager.update_asset_metadata(
+            asset_id, "transcription", {"operation_name": firestore.DELETE_FIELD}
+        )
+        return "failed" if "error" in transcription_results else "completed"
+    finally:
+        asset_manager.release_lease(asset_id, "transcription_poll", owner)
+
+
+@app.route("/poll", methods=["POST"])
+def poll_transcriptions():
+    """
+    Completes asynchronous transcriptions whose Speech-to-Text operation finished.
+
+    Invoked periodically (e.g., by Cloud Scheduler) when TRANSCRIPTION_ASYNC is enabled.
+    """
+    outcomes = {"completed": 0, "failed": 0, "running": 0, "skipped": 0, "errors": 0}
+    polled = 0
+    last_asset_id = None
+    # Page through every pending asset, so jobs still running do not hide finished ones.
+    while True:
+        pending = asset_manager.find_assets_by_status(
+            "transcription", "transcribing", limit=poll_batch_size, start_after=last_asset_id
+        )
+        for asset_id, asset in pending:
+            try:
+                outcomes[finish_async_transcription(asset_id, asset)] += 1
+            except Exception:
+                # Left in "transcribing"; the next poll tries again.
+                outcomes["errors"] += 1
+                logger.error(
+                    "Polling transcription of asset %s failed",
+                    asset_id,
+                    exc_info=True,
+                    extra={"extra_fields": {"asset_id": asset_id}},
+                )
+        polled += len(pending)
+        if len(pending) < poll_batch_size:
+            break
+        last_asset_id = pending[-1][0]
+    logger.info(
+        "Polled %d pending transcriptions", polled, extra={"extra_fields": outcomes}
+    )
+    return outcomes, 200
@@ -0,0 +1,118 @@
+"""Process-wide registry of Speech-to-Text clients and recognizers."""
+
+import logging
+import threading
+
+from google.api_core.client_options import ClientOptions
+from google.api_core.exceptions import AlreadyExists, NotFound
+from google.cloud.speech_v2 import SpeechClient
+from google.cloud.speech_v2.types import cloud_speech
+
+logger = logging.getLogger(__name__)
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+_recognizers = {}
+# One lock per recognizer key, so concurrent first requests wait for a single
+# lookup or creation instead of racing to create the same recognizer.
+_recognizer_locks = {}
+_recognizer_locks_guard = threading.Lock()
+
+
+def get_speech_client(location: str) -> SpeechClient:
+    """
+    Returns the shared SpeechClient for a regional endpoint.
+
+    Args:
+        location (str): Speech-to-Text location (e.g., "us-central1").
+
+    Returns:
+        SpeechClient: The shared client.
+    """
+    client = _clients.get(location)
+    if client is not None:
+        return client
+    with _clients_lock:
+        client = _clients.get(location)
+        if client is None:
+            # The regional endpoint keeps the audio and the recognizer in one region.
+            client = SpeechClient(
+                client_options=ClientOptions(api_endpoint=f"{location}-speech.googleapis.com")
+            )
+            _clients[location] = client
+            logger.info("Initialized shared SpeechClient for %s", location)
+    return client
+
+
+def recognizer_id(language_code: str, model: str) -> str:
+    """Returns the recognizer ID used for a language and model."""
+    return f"{model.replace('_', '-')}-long-form-{language_code.lower()}"
+
+
+def get_recognizer_name(project_id: str, location: str, language_code: str, model: str) -> str:
+    """
+    Returns the resource name of the recognizer for a language and model, creating
+    the recognizer on first use. The result is cached for the life of the process.
+
+    Args:
+        project_id (str): GCP project ID.
+        location (str): Speech-to-Text location.
+        language_code (str): BCP-47 language code (e.g., "en-US").
+        model (str): Speech-to-Text model (e.g., "chirp").
+
+    Returns:
+        str: The recognizer resource name.
+    """
+    key = (location, language_code, model)
+    name = _recognizers.get(key)
+    if name is not None:
+        return name
+
+    with _recognizer_locks_guard:
+        lock = _recognizer_locks.setdefault(key, threading.Lock())
+    with lock:
+        name = _recognizers.get(key)
+        if name is not None:
+            return name
+
+        client = get_speech_client(location)
+        parent = f"projects/{project_id}/locations/{location}"
+        rid = recognizer_id(language_code, model)
+        name = f"{parent}/recognizers/{rid}"
+        # Check if the required recognizer exists. If not, create it.
+        # This makes the service self-sufficient and avoids manual setup.
+        try:
+            client.get_recognizer(name=name)
+        except NotFound:
+            logger.info("Recognizer '%s' not found, creating it.", rid)
+            try:
+                client.create_recognizer(
+                    request=cloud_speech.CreateRecognizerRequest(
+                        parent=parent,
+                        recognizer_id=rid,
+                        recognizer=cloud_speech.Recognizer(
+                            language_codes=[language_code], model=model
+                        ),
+                    )
+                ).result()
+            except AlreadyExists:
+                # Another instance created it first.
+                logger.info("Recognizer '%s' was created concurrently.", rid)
+        _recognizers[key] = name
+        return name
+
+
+def warm_up(project_id: str, location: str, language_codes: list, model: str):
+    """
+    Resolves the client and recognizers ahead of the first request. Failures are
+    logged only; the request path resolves them again on demand.
+    """
+    for language_code in language_codes:
+        try:
+            get_recognizer_name(project_id, location, language_code, model)
+        except Exception:
+            logger.warning(
+                "Could not warm up recognizer for %s/%s", language_code, model, exc_info=True
+            )
+    logger.info("Warmed up Speech-to-Text recognizers for %s", language_codes)
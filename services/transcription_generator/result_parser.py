@@ -0,0 +1,68 @@
+"""Streaming parser for Speech-to-Text batch result files.
+
+A result file holds one entry per recognized segment, each with the transcript and
+the timing of every word. The file is read incrementally with ijson, so only one
+segment is materialized at a time, and the word timings go straight into columnar
+arrays with offsets converted to milliseconds once. Speaker labels, present when
+diarization is enabled, are folded into run-length speaker turns as they are read
+rather than kept per word. Without ijson the whole file is decoded with json.load
+instead.
+"""
+
+import json
+import logging
+from typing import Iterable, Tuple
+
+from common.transcript_store import SpeakerTurns, TranscriptWords, offset_to_ms
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+logger = logging.getLogger(__name__)
+
+
+def _iter_results(stream) -> Iterable[dict]:
+    if ijson is not None:
+        return ijson.items(stream, "results.item")
+    logger.info("ijson is not installed, decoding the whole result file at once")
+    return json.load(stream).get("results", [])
+
+
+def parse_recognition_results(stream) -> Tuple[str, TranscriptWords, SpeakerTurns]:
+    """
+    Parses a Speech-to-Text batch result file.
+
+    Args:
+        stream: Binary file-like object over the result JSON (e.g. a GCS BlobReader).
+
+    Returns:
+        tuple: (transcript text, TranscriptWords with millisecond offsets,
+            SpeakerTurns; empty unless the words carry speaker labels).
+    """
+    transcripts = []
+    words = []
+    start_ms = []
+    end_ms = []
+    turns = SpeakerTurns()
+    # Bound methods are looked up once; this loop runs once per spoken word.
+    add_word, add_start, add_end = words.append, start_ms.append, end_ms.append
+    for result in _iter_results(stream):
+        alternatives = result.get("alternatives")
+        if not alternatives:
+            continue
+        alternative = alternatives[0]
+        transcript = alternative.get("transcript")
+        if transcript:
+            transcripts.append(transcript.strip())
+        for word_info in alternative.get("words", ()):
+            word_start = offset_to_ms(word_info.get("startOffset"))
+            word_end = offset_to_ms(word_info.get("endOffset"))
+            add_word(word_info.get("word") or "")
+            add_start(word_start)
+            add_end(word_end)
+            speaker = word_info.get("speakerLabel")
+            if speaker:
+                turns.add(speaker, word_start, word_end)
+    return " ".join(transcripts), TranscriptWords(words, start_ms, end_ms), turns
@@ -101,6 +101,13 @@ resource "google_pubsub_topic" "previews_topic" {
   name    = "previews-generation-topic"
 }
 
+# Carries one message per highlight pipeline stage of the Previews Generator.
+resource "google_pubsub_topic" "highlights_stage_topic" {
+  count   = var.previews_generator_highlights ? 1 : 0
+  project = var.project_id
+  name    = "highlights-stage-topic"
+}
+
 # Dead-Letter Topic
 # This topic receives messages that fail processing after multiple retries from any of the main subscriptions.
 resource "google_pubsub_topic" "dead_letter_topic" {
@@ -114,8 +121,8 @@ resource "google_pubsub_topic" "dead_letter_topic" {
 
 # Separate Service Account for Batch Processor/Dispatcher
 # This follows the principle of least privilege. The dispatcher only needs permissions
-# to publish to Pub/Sub and write initial records to Firestore. It does not need
-# access to GCS objects or AI/ML APIs.
+# to publish to Pub/Sub, write initial records to Firestore and read uploaded objects
+# to probe their media properties. It does not need access to AI/ML APIs.
 resource "google_service_account" "batch_processor_sa" {
   project      = var.project_id
   account_id   = "batch-processor-sa"
@@ -154,6 +161,13 @@ resource "google_project_iam_member" "batch_processor_pubsub_publisher" {
   member  = "serviceAccount:${google_service_account.batch_processor_sa.email}"
 }
 
+# Read-only access to uploaded objects, for probing their media properties.
+resource "google_project_iam_member" "batch_processor_gcs_reader" {
+  project = var.project_id
+  role    = "roles/storage.objectViewer"
+  member  = "serviceAccount:${google_service_account.batch_processor_sa.email}"
+}
+
 resource "google_project_iam_member" "batch_processor_firestore_user" {
   project = var.project_id
   role    = "roles/datastore.user" # Firestore uses datastore roles for R/W
@@ -239,6 +253,22 @@ resource "google_service_account_iam_member" "metadata_generator_sa_token_creato
   member             = "serviceAccount:service-${data.google_project.project.number}@gcp-sa-pubsub.iam.gserviceaccount.com"
 }
 
+# Lets the metadata generator sign GCS read URLs through the IAM signBlob API, so
+# ffmpeg can read media directly from GCS instead of downloading it first.
+resource "google_service_account_iam_member" "metadata_generator_sa_self_signer" {
+  service_account_id = google_service_account.metadata_generator_sa.name
+  role               = "roles/iam.serviceAccountTokenCreator"
+  member             = "serviceAccount:${google_service_account.metadata_generator_sa.email}"
+}
+
+# Lets the dispatcher sign GCS read URLs, so ffprobe reads only the container
+# headers of an uploaded file with range requests.
+resource "google_service_account_iam_member" "batch_processor_sa_self_signer" {
+  service_account_id = google_service_account.batch_processor_sa.name
+  role               = "roles/iam.serviceAccountTokenCreator"
+  member             = "serviceAccount:${google_service_account.batch_processor_sa.email}"
+}
+
 # Pub/Sub Service Account to Cloud Run Invoker role for push subscriptions
 # These bindings grant the service accounts (impersonated by Pub/Sub) the
 # `run.invoker` role, allowing them to trigger their respective Cloud Run services.
@@ -361,6 +391,10 @@ resource "google_cloud_run_service" "summaries_generator" {
           name  = "LLM_MODEL"
           value = var.summaries_generator_llm_model
         }
+        env {
+          name  = "SUMMARY_MAX_CONCURRENT_CALLS"
+          value = var.summaries_generator_max_concurrent_llm_calls
+        }
       }
       container_concurrency = var.summaries_generator_concurrency
       timeout_seconds       = 600 # 10 minutes, can be adjusted for long tasks
@@ -391,6 +425,10 @@ resource "google_cloud_run_service" "transcription_generator" {
           name  = "LLM_MODEL"
           value = var.transcription_generator_llm_model
         }
+        env {
+          name  = "TRANSCRIPTION_ASYNC"
+          value = var.transcription_generator_async ? "true" : "false"
+        }
         env {
           name  = "GOOGLE_CLOUD_PROJECT"
           value = var.project_id
@@ -413,6 +451,26 @@ resource "google_cloud_run_service" "transcription_generator" {
   autogenerate_revision_name = true
 }
 
+# Completes asynchronous transcriptions whose Speech-to-Text operation finished.
+resource "google_cloud_scheduler_job" "transcription_poll" {
+  count     = var.transcription_generator_async ? 1 : 0
+  project   = var.project_id
+  region    = var.region
+  name      = "transcription-generator-poll"
+  schedule  = "* * * * *"
+  time_zone = "Etc/UTC"
+
+  http_target {
+    http_method = "POST"
+    uri         = "${google_cloud_run_service.transcription_generator.status[0].url}/poll"
+    oidc_token {
+      service_account_email = google_service_account.metadata_generator_sa.email
+    }
+  }
+
+  depends_on = [google_cloud_run_service_iam_member.transcription_generator_pubsub_invoker]
+}
+
 # Previews Generator Cloud Run Service
 resource "google_cloud_run_service" "previews_generator" {
   project  = var.project_id
@@ -439,6 +497,14 @@ resource "google_cloud_run_service" "previews_generator" {
           name  = "OUTPUT_BUCKET_NAME"
           value = var.output_bucket_name
         }
+        env {
+          name  = "HIGHLIGHTS_ENABLED"
+          value = var.previews_generator_highlights ? "true" : "false"
+        }
+        env {
+          name  = "HIGHLIGHTS_TOPIC"
+          value = "highlights-stage-topic"
+        }
         resources {
           limits = {
             cpu    = "8"
@@ -553,6 +619,42 @@ resource "google_pubsub_subscription" "previews_sub" {
 
 
 
+# Runs each highlight stage in its own request. A failed stage is redelivered with
+# backoff; the service marks the pipeline failed before the dead-letter limit.
+resource "google_pubsub_subscription" "highlights_stage_sub" {
+  count                = var.previews_generator_highlights ? 1 : 0
+  project              = var.project_id
+  name                 = "highlights-stage-sub"
+  topic                = google_pubsub_topic.highlights_stage_topic[0].name
+  ack_deadline_seconds = 600
+
+  retry_policy {
+    minimum_backoff = "30s"
+    maximum_backoff = "600s"
+  }
+
+  dead_letter_policy {
+    dead_letter_topic     = google_pubsub_topic.dead_letter_topic.id
+    max_delivery_attempts = 5
+  }
+
+  push_config {
+    push_endpoint = "${google_cloud_run_service.previews_generator.status[0].url}/highlights"
+    oidc_token {
+      service_account_email = google_service_account.metadata_generator_sa.email # Consolidated SA
+    }
+  }
+}
+
+# The Previews Generator publishes the message of the next stage when one completes.
+resource "google_pubsub_topic_iam_member" "metadata_generator_highlights_publisher" {
+  count   = var.previews_generator_highlights ? 1 : 0
+  project = var.project_id
+  topic   = google_pubsub_topic.highlights_stage_topic[0].name
+  role    = "roles/pubsub.publisher"
+  member  = "serviceAccount:${google_service_account.metadata_generator_sa.email}"
+}
+
 ################################################################################
 
 # Vertex AI Search
@@ -655,6 +757,13 @@ resource "google_pubsub_subscription_iam_member" "pubsub_sa_dead_letter_subscrib
   role         = "roles/pubsub.subscriber"
   member       = "serviceAccount:service-${data.google_project.project.number}@gcp-sa-pubsub.iam.gserviceaccount.com"
 }
+resource "google_pubsub_subscription_iam_member" "pubsub_sa_dead_letter_subscriber_highlights" {
+  count        = var.previews_generator_highlights ? 1 : 0
+  project      = var.project_id
+  subscription = google_pubsub_subscription.highlights_stage_sub[0].name
+  role         = "roles/pubsub.subscriber"
+  member       = "serviceAccount:service-${data.google_project.project.number}@gcp-sa-pubsub.iam.gserviceaccount.com"
+}
 resource "google_project_iam_member" "compute_sa_gcs_reader" {
   project = var.project_id
   role    = "roles/storage.objectViewer"
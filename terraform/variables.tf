@@ -103,18 +103,36 @@ variable "summaries_generator_concurrency" {
   default     = 80
 }
 
+variable "summaries_generator_max_concurrent_llm_calls" {
+  description = "The maximum number of in-flight Gemini calls per Summaries Generator instance."
+  type        = number
+  default     = 3
+}
+
 variable "transcription_generator_concurrency" {
   description = "The maximum number of concurrent requests for the Transcription Generator service."
   type        = number
   default     = 1
 }
 
+variable "transcription_generator_async" {
+  description = "Submit Speech-to-Text operations and acknowledge the message immediately; a Cloud Scheduler job polls for finished operations."
+  type        = bool
+  default     = false
+}
+
 variable "previews_generator_concurrency" {
   description = "The maximum number of concurrent requests for the Previews Generator service."
   type        = number
   default     = 80
 }
 
+variable "previews_generator_highlights" {
+  description = "Generate highlight reels in the Previews Generator as a staged pipeline driven by its own Pub/Sub topic."
+  type        = bool
+  default     = false
+}
+
 variable "vais_location" {
   description = "The location of the VAIS service."
   type        = string